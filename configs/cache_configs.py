@@ -0,0 +1,8 @@
+import os
+
+# Content-hash keyed analysis cache (stems, embeddings, metadata, final entry)
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "1") == "1"
+ANALYSIS_CACHE_MEMORY_MB = int(os.getenv("ANALYSIS_CACHE_MEMORY_MB", 256))
+ANALYSIS_CACHE_DISK_MB = int(os.getenv("ANALYSIS_CACHE_DISK_MB", 2048))
+# Part of every cache key; bump when a pipeline stage or model changes its output
+ANALYSIS_PIPELINE_VERSION = os.getenv("ANALYSIS_PIPELINE_VERSION", "2")
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -13,12 +14,45 @@ TTMR_INDEX = BASE_DIR / "data/tagging_index/embeddings/ttmr_index.faiss"
 TTMR_META = BASE_DIR / "data/tagging_index/metadata/ttmr_metadata.json"
 TTMR_ARTIST_INDEX = BASE_DIR / "data/tagging_index/embeddings/ttmr_artist_index.faiss"
 TTMR_ARTIST_META = BASE_DIR / "data/tagging_index/metadata/ttmr_artist_metadata.json"
+# Field stored in the indexed key column of each metadata file's SQLite store
+METADATA_KEY_FIELDS = {TAGGING_META: "id", TTMR_META: "track_id", TTMR_ARTIST_META: "artist_name"}
 
 INTERNAL_INDEX = BASE_DIR / "data/matching_index/embeddings/internal_index.faiss"
 INTERNAL_META = BASE_DIR / "data/matching_index/metadata/internal_metadata.json"
 INTERNAL_TEXT_INDEX = BASE_DIR / "data/matching_index/embeddings/internal_text_index.faiss"
 INTERNAL_TEXT_META = BASE_DIR / "data/matching_index/metadata/internal_text_metadata.json"
+# Online ingestion into INTERNAL_INDEX: write-ahead log of accepted tracks + committed segments
+INTERNAL_WAL_PATH = BASE_DIR / "data/matching_index/journal/internal_index.wal.jsonl"
+INTERNAL_JOURNAL_DIR = BASE_DIR / "data/matching_index/journal/internal_clap"
 
 UPLOAD_DIR = BASE_DIR / "uploads/full"
 UPLOADS_PREVIEW_DIR = BASE_DIR / "uploads/previews"
-SEPARATED_DIR = BASE_DIR / "uploads/stems"
\ No newline at end of file
+SEPARATED_DIR = BASE_DIR / "uploads/stems"
+ANALYSIS_CACHE_DIR = BASE_DIR / "uploads/cache"
+# Compressed stem files served by /semantic/artifacts/{id}
+ARTIFACT_DIR = BASE_DIR / "uploads/artifacts"
+
+# Cached recursive glob of TAGGING_AUDIO_DIR used by the offline index builders
+TAGGING_AUDIO_MANIFEST = BASE_DIR / "data/tagging_index/manifests/fma_audio.json"
+# FMA tracks.csv parsed once into typed columns (see services/fma_metadata.py)
+FMA_METADATA_CACHE = BASE_DIR / "data/tagging_index/fma/cache/tracks.parquet"
+# Append-only segment journals of in-progress builds, compacted into the files above
+BUILD_JOURNAL_DIR = BASE_DIR / "data/tagging_index/journal"
+
+# FAISS index-factory spec per index: "Flat", "HNSW32", "IVF1024,Flat", "IVF1024,PQ16", ...
+# Incremental builders stay flat and convert to this spec when they finish.
+INDEX_FACTORY_SPECS = {
+    "tagging_clap": os.getenv("TAGGING_CLAP_INDEX_SPEC", "Flat"),
+    "tagging_ttmr": os.getenv("TTMR_INDEX_SPEC", "Flat"),
+    "tagging_ttmr_artist": os.getenv("TTMR_ARTIST_INDEX_SPEC", "Flat"),
+    "internal_text": os.getenv("INTERNAL_TEXT_INDEX_SPEC", "Flat"),
+    "internal_clap": os.getenv("INTERNAL_CLAP_INDEX_SPEC", "Flat"),
+}
+# Search-time parameters applied after loading, e.g. "nprobe=16" or "efSearch=64"
+INDEX_SEARCH_PARAMS = {
+    "tagging_clap": os.getenv("TAGGING_CLAP_SEARCH_PARAMS", ""),
+    "tagging_ttmr": os.getenv("TTMR_SEARCH_PARAMS", ""),
+    "tagging_ttmr_artist": os.getenv("TTMR_ARTIST_SEARCH_PARAMS", ""),
+    "internal_text": os.getenv("INTERNAL_TEXT_SEARCH_PARAMS", ""),
+    "internal_clap": os.getenv("INTERNAL_CLAP_SEARCH_PARAMS", ""),
+}
@@ -0,0 +1,8 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Concurrent LLM tagging (full track + one call per stem)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 5))
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", 30))
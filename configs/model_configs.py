@@ -0,0 +1,12 @@
+import os
+
+# Opt-in int8 dynamic quantization of the Linear layers (CPU only)
+TTMR_QUANTIZE = os.getenv("TTMR_QUANTIZE", "0") == "1"
+CLAP_QUANTIZE = os.getenv("CLAP_QUANTIZE", "0") == "1"
+
+# Sentence-transformers model behind the text indexes (services/text_embedding_engine.py)
+TEXT_EMBEDDING_MODEL = os.getenv("TEXT_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+TEXT_EMBEDDING_DIM = int(os.getenv("TEXT_EMBEDDING_DIM", 384))
+TEXT_EMBEDDING_BATCH_SIZE = int(os.getenv("TEXT_EMBEDDING_BATCH_SIZE", 64))
+# Normalized text -> vector entries kept in memory (0 disables the cache)
+TEXT_EMBEDDING_CACHE_SIZE = int(os.getenv("TEXT_EMBEDDING_CACHE_SIZE", 4096))
@@ -0,0 +1,57 @@
+import os
+
+# Inference worker pool: CPU-bound analysis runs here instead of on the event loop
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+# Jobs allowed to wait for a free worker before new requests are rejected
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 4))
+# Retry-After hint used until the pool has timed a few jobs
+INFERENCE_RETRY_AFTER_SEC = int(os.getenv("INFERENCE_RETRY_AFTER_SEC", 30))
+
+# Uploads are streamed to disk in chunks and rejected past this size
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", 100))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+# Center window analyzed by the hybrid pipeline
+PREVIEW_DURATION_SEC = int(os.getenv("PREVIEW_DURATION_SEC", 20))
+
+# Pre-fork serving: >1 forks this many uvicorn workers from a parent that holds the models and indexes
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+# Load model weights in the parent so forked workers share them copy-on-write
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") == "1"
+# Open FAISS indexes read-only with IO_FLAG_MMAP (file-backed where the index type supports it)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") == "1"
+
+# Opt-in: load every model and run one dummy forward in the background after startup
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "0") == "1"
+WARMUP_MODEL_NAMES = [name.strip() for name in os.getenv("WARMUP_MODEL_NAMES", "clap,ttmr,demucs").split(",") if name.strip()]
+
+# Opt-in online ingestion of analyzed tracks into the internal matching index (services/internal_index.py);
+# writes a log, journal segments and a manifest under data/matching_index/journal at runtime
+INTERNAL_INGEST = os.getenv("INTERNAL_INGEST", "0") == "1"
+# The background writer flushes the log into a new segment at this interval, or sooner once this many records wait
+INTERNAL_FLUSH_INTERVAL_SEC = float(os.getenv("INTERNAL_FLUSH_INTERVAL_SEC", 5))
+INTERNAL_FLUSH_BATCH = int(os.getenv("INTERNAL_FLUSH_BATCH", 32))
+# fsync every log append (a request is durable once it returns); off trades that for latency
+INTERNAL_WAL_FSYNC = os.getenv("INTERNAL_WAL_FSYNC", "1") == "1"
+# Rewrite INTERNAL_INDEX / INTERNAL_META from the journal after this many new segments (and on shutdown)
+INTERNAL_COMPACT_EVERY = int(os.getenv("INTERNAL_COMPACT_EVERY", 20))
+# A trained INTERNAL_CLAP_INDEX_SPEC (IVF/PQ) replaces the flat index once this many vectors are in
+INTERNAL_TRAIN_MIN_VECTORS = int(os.getenv("INTERNAL_TRAIN_MIN_VECTORS", 10000))
+
+# /semantic/search/text: TTMR++ query embeddings cached by normalized text, concurrent misses encoded together
+TEXT_SEARCH_CACHE_SIZE = int(os.getenv("TEXT_SEARCH_CACHE_SIZE", 10000))
+TEXT_SEARCH_MAX_BATCH = int(os.getenv("TEXT_SEARCH_MAX_BATCH", 32))
+TEXT_SEARCH_MAX_WAIT_MS = float(os.getenv("TEXT_SEARCH_MAX_WAIT_MS", 3))
+TEXT_SEARCH_MAX_K = int(os.getenv("TEXT_SEARCH_MAX_K", 50))
+# L2 candidates re-ranked by cosine similarity (track vectors are not unit length)
+TEXT_SEARCH_CANDIDATES = int(os.getenv("TEXT_SEARCH_CANDIDATES", 200))
+
+# Audio embedding across concurrent requests; only useful when several analyses run at once
+AUDIO_BATCHING = os.getenv("AUDIO_BATCHING", "1" if INFERENCE_WORKERS > 1 else "0") == "1"
+# Longest a batch is held for a request that is still decoding its clips
+AUDIO_BATCH_MAX_WAIT_MS = float(os.getenv("AUDIO_BATCH_MAX_WAIT_MS", 10))
+AUDIO_BATCH_MAX_CLIPS = int(os.getenv("AUDIO_BATCH_MAX_CLIPS", 16))
+
+# Stems are stored as artifacts and fetched from /semantic/artifacts/{id}?format=flac|opus
+STEM_FORMAT = os.getenv("STEM_FORMAT", "flac")
+# Oldest artifacts are deleted once the directory grows past this
+ARTIFACT_DISK_MB = int(os.getenv("ARTIFACT_DISK_MB", 4096))
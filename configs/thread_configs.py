@@ -0,0 +1,18 @@
+import os
+from configs.serving_configs import WEB_WORKERS, INFERENCE_WORKERS
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Cores each concurrent inference job may use: the box split over web workers x inference workers
+DEFAULT_JOB_THREADS = max(1, CPU_COUNT // max(1, WEB_WORKERS * INFERENCE_WORKERS))
+
+# torch intra-op threads (default budget for every model) and inter-op threads
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", DEFAULT_JOB_THREADS))
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", 1))
+# FAISS OpenMP threads (searches are tiny batches; more threads mostly add spin-up cost)
+FAISS_THREADS = int(os.getenv("FAISS_THREADS", 1))
+# numba threads used by librosa's jitted kernels
+NUMBA_THREADS = int(os.getenv("NUMBA_THREADS", 1))
+# OpenBLAS/MKL threads behind numpy and scipy (librosa resampling, chroma, ...)
+BLAS_THREADS = int(os.getenv("BLAS_THREADS", DEFAULT_JOB_THREADS))
+
@@ -39,6 +39,8 @@ class MelEncoder(nn.Module):
         self.hop_length = hop_length
         self.n_mels = n_mels
         self.padding = padding
+        # built once and moved with the module; not part of checkpoints
+        self.register_buffer("window", torch.hann_window(n_fft), persistent=False)
 
     def forward(self, audio):
         device = audio.device
@@ -46,7 +48,7 @@ class MelEncoder(nn.Module):
             audio = torch.from_numpy(audio)
         if self.padding > 0:
             audio = F.pad(audio, (0, padding))
-        window = torch.hann_window(self.n_fft).to(device)
+        window = self.window if self.window.device == device else self.window.to(device)
         stft = torch.stft(audio, self.n_fft, self.hop_length, window=window, return_complex=True)
         magnitudes = stft[..., :-1].abs() ** 2
         filters = mel_filters(device, self.n_mels)
@@ -1,6 +1,5 @@
 import os
 import torch
-torch.set_num_threads(1)
 import torch.nn as nn
 import numpy as np
 import pandas as pd
@@ -7,8 +7,14 @@ import pandas as pd
 import numpy as np
 from tqdm import tqdm
 from sklearn.preprocessing import MultiLabelBinarizer
+from functools import lru_cache
 from sentence_transformers import SentenceTransformer, util
-model = SentenceTransformer('all-MiniLM-L6-v2')
+
+
+@lru_cache(maxsize=1)
+def get_model():
+    # Loaded on first use, not at import: only _generate_label_map needs it
+    return SentenceTransformer('all-MiniLM-L6-v2')
 
 flatten_list = lambda lst: [item for sublist in lst for item in sublist]
 
@@ -31,7 +37,7 @@ def _generate_label_map(label_list):
             label_map: Dict (original label: merge label)
     """
     with torch.no_grad():
-        embeddings = model.encode(label_list)
+        embeddings = get_model().encode(label_list)
     sim_matrix = util.cos_sim(embeddings, embeddings)
     label_map, pass_idx = {}, []
     for idx, instance in enumerate(sim_matrix):
@@ -2,50 +2,121 @@ from fastapi import FastAPI
 from routes.semantic import router as semantic_router
 # from routes.instruments import router as instruments_router
 import faiss
-from configs.index_configs import TAGGING_INDEX, TTMR_INDEX, TTMR_ARTIST_INDEX, TAGGING_META, TTMR_META, TTMR_ARTIST_META
-import json
+from configs.index_configs import TAGGING_INDEX, TTMR_INDEX, TTMR_ARTIST_INDEX, TAGGING_META, TTMR_META, TTMR_ARTIST_META, METADATA_KEY_FIELDS
+from configs.index_configs import INDEX_FACTORY_SPECS, INDEX_SEARCH_PARAMS
+from services.faiss_index_factory import convert_index, apply_search_params, is_flat_spec, index_description
+from services.inference_pool import InferencePool
+from services.model_warmup import get_model_warmup
+from services.thread_budget import apply_thread_budget
+from services.metadata_store import load_metadata
+from services.internal_index import InternalIndexIngestor
+from configs.serving_configs import WEB_WORKERS, PRELOAD_MODELS, FAISS_MMAP, INTERNAL_INGEST
 import os
-import subprocess
 
 app = FastAPI()
 
+@app.on_event("startup")
+def configure_threads():
+    # After every import, so nothing imported later can silently override the budget
+    apply_thread_budget()
+
 @app.on_event("startup")
 def load_faiss_indices():
-    def load_json(path):
-        try:
-            with open(path, "r") as f:
-                content = f.read().strip()
-                return json.loads(content) if content else []
-        except Exception as e:
-            print(f"[WARN] Failed to load metadata from {path}: {e}")
-            return []
+    # Already loaded by the pre-fork parent; workers share its copy
+    if hasattr(app.state, "faiss_variants"):
+        print("[FAISS INIT] Using indices preloaded before fork")
+        return
 
-    def load_index(path):
+    def load_index(path, variant):
         try:
             print(f"[FAISS] Loading index: {path}")
-            return faiss.read_index(str(path))
+            if FAISS_MMAP:
+                # Inverted lists stay file-backed; flat codes are shared with forked workers copy-on-write
+                try:
+                    index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError:
+                    index = faiss.read_index(str(path))
+            else:
+                index = faiss.read_index(str(path))
         except Exception as e:
             print(f"[ERROR] Failed to load FAISS index at {path}: {e}")
             return None
 
+        # A flat file on disk can still be served as the configured ANN type
+        spec = INDEX_FACTORY_SPECS.get(variant)
+        if not is_flat_spec(spec) and isinstance(index, faiss.IndexFlat):
+            print(f"[FAISS] Converting {variant} to '{spec}' in memory (build it offline to skip this)")
+            index = convert_index(index, spec)
+
+        apply_search_params(index, INDEX_SEARCH_PARAMS.get(variant))
+        print(f"[FAISS] {variant}: {index_description(index)} with {index.ntotal} vectors")
+        return index
+
     print("[FAISS INIT] Loading FAISS indices at startup...")
 
     app.state.faiss_variants = {
         "tagging_clap": {
-            "index": load_index(TAGGING_INDEX),
-            "metadata": load_json(TAGGING_META)
+            "index": load_index(TAGGING_INDEX, "tagging_clap"),
+            "metadata": load_metadata(TAGGING_META, METADATA_KEY_FIELDS[TAGGING_META])
         },
         "tagging_ttmr": {
-            "index": load_index(TTMR_INDEX),
-            "metadata": load_json(TTMR_META)
+            "index": load_index(TTMR_INDEX, "tagging_ttmr"),
+            "metadata": load_metadata(TTMR_META, METADATA_KEY_FIELDS[TTMR_META])
         },
         "tagging_ttmr_artist": {
-            "index": load_index(TTMR_ARTIST_INDEX),
-            "metadata": load_json(TTMR_ARTIST_META)
+            "index": load_index(TTMR_ARTIST_INDEX, "tagging_ttmr_artist"),
+            "metadata": load_metadata(TTMR_ARTIST_META, METADATA_KEY_FIELDS[TTMR_ARTIST_META])
         },
     }
     print("[FAISS INIT] All indices and metadata loaded successfully ✅")
 
+@app.on_event("startup")
+def start_inference_pool():
+    app.state.inference_pool = InferencePool()
+    print(f"[POOL] Inference pool ready ({app.state.inference_pool.max_workers} workers, queue {app.state.inference_pool.max_queue})")
+
+@app.on_event("startup")
+def start_model_warmup():
+    # Runs in the background; /semantic/ready reports 503 until it finishes
+    get_model_warmup().start()
+
+@app.on_event("startup")
+def start_internal_ingestor():
+    # Per worker (after fork): each one appends to the shared log, one of them commits
+    if not INTERNAL_INGEST:
+        return
+    ingestor = InternalIndexIngestor()
+    ingestor.start()
+    ingestor.on_snapshot(lambda snapshot: app.state.faiss_variants.__setitem__("internal_clap", snapshot))
+    app.state.internal_ingestor = ingestor
+
+@app.on_event("shutdown")
+def stop_inference_pool():
+    pool = getattr(app.state, "inference_pool", None)
+    if pool is not None:
+        pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_internal_ingestor():
+    ingestor = getattr(app.state, "internal_ingestor", None)
+    if ingestor is not None:
+        ingestor.stop()
+
+def preload_shared_state():
+    """Runs once in the pre-fork parent so every worker shares these pages copy-on-write"""
+    load_faiss_indices()
+    if PRELOAD_MODELS:
+        import torch
+        from services.clap_singleton import get_clap_model
+        from services.ttmrpp_singleton import get_ttmr_model
+        from services.demucs_singleton import get_demucs_model
+
+        # Keep the parent single-threaded: an OpenMP pool created before fork is unusable in the children
+        torch.set_num_threads(1)
+        get_clap_model()
+        get_ttmr_model()
+        get_demucs_model()
+
 # Model downloading moved to singleton files for lazy loading
 # @app.on_event("startup")
 # def prepare_models():
@@ -69,6 +140,22 @@ if __name__ == "__main__":
     import uvicorn
 
     port = int(os.environ.get("PORT", 8000))
+
+    if WEB_WORKERS > 1:
+        from services.prefork_server import serve_prefork
+
+        # Multi-core boxes: one parent holds models + indexes, workers fork from it
+        serve_prefork(
+            app,
+            host="0.0.0.0",
+            port=port,
+            workers=WEB_WORKERS,
+            preload=preload_shared_state,
+            loop="asyncio",
+            access_log=False,
+            timeout_keep_alive=5,
+        )
+        raise SystemExit(0)
     
     # Production configuration optimized for Railway
     uvicorn.run(
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import JSONResponse
-import shutil
-import os, shutil, uuid, tempfile, time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, FileResponse
+import os, time
 from services.audio_multi_processor import process_audio_hybrid
-from configs.index_configs import UPLOAD_DIR, UPLOADS_PREVIEW_DIR
-from utils.audio_utils import extract_preview_segment
 from fastapi import Request 
+from fastapi.concurrency import run_in_threadpool
 from services.stem_separator import classify_track_type
+from services.inference_pool import InferenceQueueFull
+from services.analysis_cache import get_analysis_cache, analysis_key
+from services.upload_stream import receive_upload, UploadRejected
+from services.model_warmup import get_model_warmup
+from services.thread_budget import thread_report
+from services.text_embedding_engine import get_text_embedding_engine
+from services.text_search import get_ttmr_text_encoder, search_tracks
+from services.micro_batcher import BatchQueueFull
+from services.embedding_scheduler import get_audio_embedding_scheduler
+from services.artifact_store import get_artifact_store, AUDIO_FORMATS
+from configs.serving_configs import PREVIEW_DURATION_SEC, TEXT_SEARCH_MAX_K, STEM_FORMAT
 
 router = APIRouter()
 
@@ -19,37 +28,131 @@ async def health_check():
         "service": "bridge-ml-api"
     }
 
-@router.post("/analyze/hybrid")
-async def analyze_song_hybrid(request: Request, file: UploadFile = File(...)):
-    if file.content_type not in ["audio/mpeg", "audio/wav", "audio/x-wav"]:
-        return JSONResponse(status_code=400, content={"error": "Only MP3 or WAV files are supported."})
+@router.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness for load balancers: 503 until indices are loaded and warm-up has finished"""
+    status = get_model_warmup().status()
+    status["indices_loaded"] = hasattr(request.app.state, "faiss_variants")
+    status["ready"] = status["ready"] and status["indices_loaded"]
+    status["timestamp"] = time.time()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
-    # Extract extension based on the filename (real suffix)
-    ext = os.path.splitext(file.filename)[-1].lower()
+@router.get("/metrics")
+async def metrics(request: Request):
+    """Inference queue depth and wait times; never loads models"""
+    pool = getattr(request.app.state, "inference_pool", None)
+    ingestor = getattr(request.app.state, "internal_ingestor", None)
+    return {
+        "timestamp": time.time(),
+        "inference_pool": pool.stats() if pool is not None else None,
+        "analysis_cache": get_analysis_cache().stats() if get_analysis_cache() is not None else None,
+        "internal_index": ingestor.status() if ingestor is not None else None,
+        "text_embeddings": get_text_embedding_engine().stats(),
+        "text_search": get_ttmr_text_encoder().stats(),
+        "audio_batching": get_audio_embedding_scheduler().stats(),
+        "threads": thread_report()
+    }
 
-    # Save uploaded file to a temp location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as full_temp:
-        contents = await file.read()
-        full_temp.write(contents)
-        full_temp.flush()
-        file_path = full_temp.name
+@router.get("/search/text")
+async def search_text(request: Request, q: str, k: int = 10):
+    """Text-to-music retrieval: TTMR++ query embedding against the tagging_ttmr track index"""
+    query = q.strip()
+    if not query:
+        return JSONResponse(status_code=400, content={"error": "Query text is empty."})
+    k = max(1, min(k, TEXT_SEARCH_MAX_K))
+
+    variant = getattr(request.app.state, "faiss_variants", {}).get("tagging_ttmr")
+    if not variant or variant.get("index") is None:
+        return JSONResponse(status_code=503, content={"error": "TTMR++ track index is not loaded."})
+
+    start = time.perf_counter()
+    try:
+        query_vector, cached = await get_ttmr_text_encoder().encode(query)
+    except BatchQueueFull:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Search is busy. Please retry shortly."},
+            headers={"Retry-After": "1"}
+        )
+    # FAISS search, cosine rerank and metadata lookup block; keep them off the event loop
+    results = await run_in_threadpool(search_tracks, variant, query_vector, k)
+    return {
+        "query": query,
+        "k": k,
+        "cached": cached,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        "results": results
+    }
 
-    # Create a separate temp file for preview output
-    preview_temp = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-    preview_path = preview_temp.name
-    preview_temp.close()
+@router.post("/analyze/hybrid")
+async def analyze_song_hybrid(request: Request):
+    # Multipart "file" field, parsed as it streams in (no spooled copy, early 413)
+    try:
+        upload = await receive_upload(request, field="file")
+    except UploadRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"error": e.message})
+    file_path = upload.path
 
     try:
-        extract_preview_segment(file_path, preview_path, segment_duration_sec=20)
-        result = process_audio_hybrid(request, preview_path, file_path)
+        # Re-submitted tracks are answered straight from the content-hash cache
+        content_hash = upload.content_hash
+        cache = get_analysis_cache()
+        cached_entry = cache.get(analysis_key(content_hash, PREVIEW_DURATION_SEC), "entry") if cache is not None else None
+        # Stem artifacts can be evicted before the cached entry (and older entries inlined base64 stems);
+        # either way re-analyze, which reuses the cached stages
+        if cached_entry is not None and all(
+            isinstance(stem, dict) and get_artifact_store().retain(stem["artifact_id"])
+            for stem in cached_entry.get("stems", {}).values()
+        ):
+            print(f"[CACHE] Returning cached analysis for {content_hash}")
+            return {
+                "status": "analyzed",
+                "result": cached_entry
+            }
+
+        result = await process_audio_hybrid(request, file_path, preview_duration_sec=PREVIEW_DURATION_SEC, content_hash=content_hash)
 
         return {
             "status": "analyzed",
             "result": result
         }
+    except InferenceQueueFull as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server is busy analyzing other tracks. Please retry shortly."},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except BatchQueueFull:
+        # Audio embedding schedulers are saturated (AUDIO_BATCHING)
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server is busy analyzing other tracks. Please retry shortly."},
+            headers={"Retry-After": "1"}
+        )
     finally:
         os.remove(file_path)
-        os.remove(preview_path)
+
+@router.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, format: str = STEM_FORMAT):
+    """Streams a stored stem (FLAC or Opus); Range requests are answered with 206 partial content"""
+    if format not in AUDIO_FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"Unsupported format '{format}'. Use one of: {', '.join(AUDIO_FORMATS)}."})
+    store = get_artifact_store()
+    try:
+        # First request for a non-FLAC format transcodes from the master
+        path = await run_in_threadpool(store.get_file, artifact_id, format)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Invalid artifact id."})
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "Artifact not found."})
+    return FileResponse(
+        path,
+        media_type=store.media_type(format),
+        filename=f"{artifact_id}{path.suffix}",
+        content_disposition_type="inline",
+        # Ids are content-addressed, so the bytes behind a URL never change
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
 
 @router.post("/test-energy")
 async def test_energy():
@@ -0,0 +1,74 @@
+import argparse
+import faiss
+import numpy as np
+from time import perf_counter
+
+from configs.index_configs import TTMR_INDEX
+from services.faiss_index_factory import build_index, reconstruct_all, apply_search_params
+
+# "<factory spec>|<search params>" pairs; sized for the current FMA-scale ttmr_index.faiss
+DEFAULT_CONFIGS = [
+    "HNSW32|efSearch=16",
+    "HNSW32|efSearch=64",
+    "IVF64,Flat|nprobe=4",
+    "IVF64,Flat|nprobe=16",
+    "IVF64,PQ16|nprobe=16",
+]
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+def time_queries(index, queries: np.ndarray, k: int):
+    # Single-query latency (what the API does per neighbor lookup) and batched throughput
+    start = perf_counter()
+    for q in queries:
+        index.search(q.reshape(1, -1), k)
+    single_ms = (perf_counter() - start) / len(queries) * 1000
+
+    start = perf_counter()
+    _, found = index.search(queries, k)
+    batch_ms = (perf_counter() - start) / len(queries) * 1000
+    return found, single_ms, batch_ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and latency of ANN index types against the flat baseline")
+    parser.add_argument("--index", default=str(TTMR_INDEX), help="Flat index whose vectors are benchmarked")
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS, help='e.g. "HNSW32|efSearch=64" "IVF1024,Flat|nprobe=16"')
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = reconstruct_all(faiss.read_index(args.index)).astype("float32")
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(vectors))
+    num_queries = min(args.num_queries, len(vectors) // 10)
+
+    # Held-out queries so no query finds itself
+    queries = np.ascontiguousarray(vectors[order[:num_queries]])
+    base = np.ascontiguousarray(vectors[order[num_queries:]])
+    print(f"📦 {len(base)} base vectors, {len(queries)} queries, d={base.shape[1]}, k={args.k}\n")
+
+    flat = build_index(base, "Flat")
+    truth, flat_single_ms, flat_batch_ms = time_queries(flat, queries, args.k)
+
+    rows = [("Flat", "", 0.0, 1.0, flat_single_ms, flat_batch_ms)]
+    built = {}
+    for config in args.configs:
+        spec, _, params = config.partition("|")
+        if spec not in built:
+            start = perf_counter()
+            built[spec] = (build_index(base, spec), perf_counter() - start)
+        index, build_sec = built[spec]
+        apply_search_params(index, params)
+        found, single_ms, batch_ms = time_queries(index, queries, args.k)
+        rows.append((spec, params, build_sec, recall_at_k(found, truth), single_ms, batch_ms))
+
+    print(f"\n{'spec':<16} {'params':<14} {'build s':>8} {'recall@' + str(args.k):>10} {'ms/query':>9} {'ms/q batch':>11}")
+    for spec, params, build_sec, recall, single_ms, batch_ms in rows:
+        print(f"{spec:<16} {params:<14} {build_sec:>8.2f} {recall:>10.3f} {single_ms:>9.3f} {batch_ms:>11.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import random
+import resource
+import tempfile
+from glob import glob
+from time import perf_counter
+
+import faiss
+import numpy as np
+import torch
+
+from configs.index_configs import TAGGING_AUDIO_DIR, TTMR_INDEX, TAGGING_INDEX
+from configs.serving_configs import PREVIEW_DURATION_SEC
+from utils.audio_utils import load_preview_segment
+
+DEFAULT_INDEX = {"ttmr": TTMR_INDEX, "clap": TAGGING_INDEX}
+
+def model_size_mb(model) -> float:
+    # Serialized state_dict size; packed int8 weights don't show up in parameters()
+    with tempfile.NamedTemporaryFile(suffix=".pt") as f:
+        torch.save(model.state_dict(), f.name)
+        return os.path.getsize(f.name) / (1024 * 1024)
+
+def load_embedder(model_name: str):
+    """Returns (fp32 wrapper, int8 wrapper) backed by the shared fp32 and int8 model instances."""
+    if model_name == "ttmr":
+        from services.ttmrpp_wrapper import TTMRPPWrapper as wrapper_cls
+    else:
+        from services.clap_wrapper import CLAPWrapper as wrapper_cls
+    fp32, int8 = wrapper_cls(read_only=True, quantize=False), wrapper_cls(read_only=True, quantize=True)
+    if str(int8.device) != "cpu":
+        raise SystemExit("int8 dynamic quantization is CPU only; run with CUDA_VISIBLE_DEVICES=''")
+    return fp32, int8
+
+def embed(wrapper, model_name: str, clip) -> np.ndarray:
+    if model_name == "ttmr":
+        return wrapper.get_audio_embedding(clip).numpy()
+    return np.asarray(wrapper.get_embedding(clip), dtype="float32")
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding fidelity and latency of int8 dynamic quantization vs fp32")
+    parser.add_argument("--model", choices=["ttmr", "clap"], default="ttmr")
+    parser.add_argument("--audio-dir", default=str(TAGGING_AUDIO_DIR))
+    parser.add_argument("--index", default=None, help="Index used for neighbor overlap (defaults to the model's tagging index)")
+    parser.add_argument("--num-tracks", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = sorted(glob(f"{args.audio_dir}/**/*.mp3", recursive=True))
+    if not paths:
+        raise SystemExit(f"No .mp3 files under {args.audio_dir}")
+    random.Random(args.seed).shuffle(paths)
+    paths = paths[:args.num_tracks]
+
+    fp32, int8 = load_embedder(args.model)
+    print(f"📦 {args.model}: fp32 {model_size_mb(fp32.model):.1f} MB, int8 {model_size_mb(int8.model):.1f} MB")
+
+    fp32_embs, int8_embs = [], []
+    fp32_sec, int8_sec = 0.0, 0.0
+    for path in paths:
+        clip = load_preview_segment(path, segment_duration_sec=PREVIEW_DURATION_SEC)
+        try:
+            clip.load()
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+
+        start = perf_counter()
+        fp32_embs.append(embed(fp32, args.model, clip))
+        fp32_sec += perf_counter() - start
+
+        start = perf_counter()
+        int8_embs.append(embed(int8, args.model, clip))
+        int8_sec += perf_counter() - start
+
+    n = len(fp32_embs)
+    if n == 0:
+        raise SystemExit("No track could be decoded.")
+    fp32_embs = np.stack(fp32_embs).astype("float32")
+    int8_embs = np.stack(int8_embs).astype("float32")
+
+    drift = 1.0 - cosine(fp32_embs, int8_embs)
+    print(f"\n🎧 {n} tracks, {PREVIEW_DURATION_SEC}s previews")
+    print(f"⏱️ fp32 {fp32_sec / n * 1000:.0f} ms/clip, int8 {int8_sec / n * 1000:.0f} ms/clip ({fp32_sec / max(int8_sec, 1e-9):.2f}x)")
+    print(f"📐 cosine drift (1 - cos): mean {drift.mean():.5f}, p95 {np.percentile(drift, 95):.5f}, max {drift.max():.5f}")
+
+    index = faiss.read_index(str(args.index or DEFAULT_INDEX[args.model]))
+    if index.d != fp32_embs.shape[1]:
+        raise SystemExit(f"Index dimension {index.d} does not match {args.model} embeddings ({fp32_embs.shape[1]})")
+    _, fp32_ids = index.search(fp32_embs, args.k)
+    _, int8_ids = index.search(int8_embs, args.k)
+    overlap = np.array([len(set(a) & set(b)) / args.k for a, b in zip(fp32_ids, int8_ids)])
+    top1 = (fp32_ids[:, 0] == int8_ids[:, 0]).mean()
+    print(f"🔍 neighbor overlap@{args.k}: mean {overlap.mean():.3f}, min {overlap.min():.3f}; top-1 agreement {top1:.3f}")
+
+    # Linux reports KiB
+    print(f"💾 peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB (both models resident)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from time import perf_counter
+
+import numpy as np
+
+from configs.index_configs import TAGGING_AUDIO_DIR, TTMR_INDEX
+from configs.serving_configs import PREVIEW_DURATION_SEC
+
+# "key=value,..." thread budgets; keys map to the env vars read by configs/thread_configs.py
+BUDGET_ENV = {
+    "torch": "TORCH_THREADS",
+    "interop": "TORCH_INTEROP_THREADS",
+    "faiss": "FAISS_THREADS",
+    "numba": "NUMBA_THREADS",
+    "blas": "BLAS_THREADS",
+}
+
+def default_configs() -> list[str]:
+    cores = os.cpu_count() or 1
+    configs = []
+    for concurrency in sorted({1, 2, max(1, cores // 2)}):
+        for torch_threads in sorted({1, max(1, cores // (2 * concurrency)), max(1, cores // concurrency)}):
+            configs.append(f"torch={torch_threads},interop=1,faiss=1,numba=1,blas={torch_threads},concurrency={concurrency}")
+    # Library defaults, i.e. every pool sized to all cores
+    configs.append(f"torch={cores},interop={cores},faiss={cores},numba={cores},blas={cores},concurrency=2")
+    return configs
+
+def parse_config(config: str) -> dict:
+    return {key.strip(): int(value) for key, _, value in (item.partition("=") for item in config.split(","))}
+
+# ----------- Child: one budget, one process -----------
+def run_child(audio_path: str, requests: int, concurrency: int):
+    from services.thread_budget import apply_thread_budget
+    from services.stem_separator import separate_stems
+    from services.clap_wrapper import CLAPWrapper
+    from services.ttmrpp_wrapper import TTMRPPWrapper
+    from services.metadata_extractor import extract_metadata
+    from utils.audio_utils import load_preview_segment
+    import faiss
+
+    report = apply_thread_budget()
+    clap = CLAPWrapper(read_only=True)
+    ttmr = TTMRPPWrapper(read_only=True)
+    index = faiss.read_index(str(TTMR_INDEX))
+    lock = threading.Lock()
+    stage_times = {"decode": [], "demucs": [], "clap": [], "ttmr": [], "faiss": [], "librosa": []}
+
+    def job():
+        timings = {}
+        start = perf_counter()
+        preview = load_preview_segment(audio_path, segment_duration_sec=PREVIEW_DURATION_SEC)
+        preview.load()
+        timings["decode"] = perf_counter() - start
+
+        t = perf_counter()
+        stems = separate_stems(preview)
+        timings["demucs"] = perf_counter() - t
+        clips = [preview] + list(stems.values())
+
+        t = perf_counter()
+        clap.get_embeddings_batch(clips)
+        timings["clap"] = perf_counter() - t
+
+        t = perf_counter()
+        ttmr_embeddings = np.stack([e.numpy() for e in ttmr.get_audio_embeddings_batch(clips)]).astype("float32")
+        timings["ttmr"] = perf_counter() - t
+
+        t = perf_counter()
+        index.search(ttmr_embeddings, 3)
+        timings["faiss"] = perf_counter() - t
+
+        t = perf_counter()
+        extract_metadata(preview)
+        timings["librosa"] = perf_counter() - t
+
+        with lock:
+            for stage, seconds in timings.items():
+                stage_times[stage].append(seconds)
+        return perf_counter() - start
+
+    # Warm-up: model loading and first-call allocations stay out of the numbers
+    job()
+    for times in stage_times.values():
+        times.clear()
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: job(), range(requests)))
+    wall = perf_counter() - start
+
+    print(json.dumps({
+        "throughput_per_min": requests / wall * 60,
+        "p50_sec": float(np.percentile(latencies, 50)),
+        "p95_sec": float(np.percentile(latencies, 95)),
+        "stages_sec": {stage: float(np.mean(times)) for stage, times in stage_times.items()},
+        "threads": report["summary"],
+    }))
+
+# ----------- Parent: sweep -----------
+def main():
+    parser = argparse.ArgumentParser(description="Sweep CPU thread budgets over the analysis pipeline")
+    parser.add_argument("--audio", default=None, help="Track to analyze (defaults to the first FMA mp3)")
+    parser.add_argument("--configs", nargs="+", default=None, help='e.g. "torch=4,interop=1,faiss=1,numba=1,blas=4,concurrency=2"')
+    parser.add_argument("--requests", type=int, default=8, help="Analyses per configuration")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--concurrency", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    audio = args.audio or next(iter(sorted(glob(f"{TAGGING_AUDIO_DIR}/**/*.mp3", recursive=True))), None)
+    if audio is None:
+        raise SystemExit("No audio file given and none found under the FMA audio dir.")
+
+    if args.child:
+        run_child(audio, args.requests, args.concurrency)
+        return
+
+    rows = []
+    for config in args.configs or default_configs():
+        budget = parse_config(config)
+        env = dict(os.environ)
+        for key, var in BUDGET_ENV.items():
+            if key in budget:
+                env[var] = str(budget[key])
+        concurrency = budget.get("concurrency", 1)
+
+        # Inter-op threads are fixed once per process, so every budget gets a fresh interpreter
+        print(f"🧪 {config}")
+        proc = subprocess.run(
+            [sys.executable, "-m", "scripts.benchmark_thread_budget", "--child", "--audio", audio,
+             "--requests", str(args.requests), "--concurrency", str(concurrency)],
+            env=env, capture_output=True, text=True,
+        )
+        result_line = next((line for line in reversed(proc.stdout.splitlines()) if line.startswith("{")), None)
+        if proc.returncode != 0 or result_line is None:
+            print(f"❌ {config} failed:\n{proc.stderr[-2000:]}")
+            continue
+        rows.append((config, json.loads(result_line)))
+
+    print(f"\n{'config':<62} {'tracks/min':>10} {'p50 s':>7} {'p95 s':>7}  stage means (s)")
+    for config, result in sorted(rows, key=lambda row: -row[1]["throughput_per_min"]):
+        stages = " ".join(f"{stage}={sec:.2f}" for stage, sec in result["stages_sec"].items())
+        print(f"{config:<62} {result['throughput_per_min']:>10.2f} {result['p50_sec']:>7.2f} {result['p95_sec']:>7.2f}  {stages}")
+
+if __name__ == "__main__":
+    main()
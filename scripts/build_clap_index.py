@@ -1,119 +1,102 @@
-import os
-import json
-from tqdm import tqdm
-import pandas as pd
-from time import time
-from bs4 import BeautifulSoup
+import argparse
+import numpy as np
 
 from utils.audio_utils import get_audio_path
-from configs.index_configs import TAGGING_AUDIO_DIR, TRACKS_PATH, GENRE_MAP_PATH, TAGGING_INDEX, TAGGING_META
-from services.clap_manager import get_clap
-
-def clean_html(text, max_len=500):
-    """Strip HTML and truncate long strings."""
-    if not text or not isinstance(text, str):
-        return ""
-    clean = BeautifulSoup(text, "html.parser").get_text(separator=" ", strip=True)
-    return clean[:max_len]
-
-def safe_eval(val):
-    """Safely eval list-like string fields."""
-    try:
-        return eval(val) if isinstance(val, str) else []
-    except:
-        return []
-
-def load_genre_map(genre_csv_path):
-    df = pd.read_csv(genre_csv_path)
-    return {row["genre_id"]: row["title"] for _, row in df.iterrows()}
+from configs.index_configs import TAGGING_AUDIO_DIR, TAGGING_AUDIO_MANIFEST, TAGGING_INDEX, TAGGING_META, INDEX_FACTORY_SPECS, BUILD_JOURNAL_DIR
+from services.build_journal import BuildJournal
+from services.clap_wrapper import CLAPWrapper, CLAP_SR
+from services.fma_metadata import load_fma_tracks, fma_entries
+from services.indexing_pipeline import IndexingPipeline, load_audio_manifest
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the CLAP tagging index")
+    parser.add_argument("--index-spec", default=INDEX_FACTORY_SPECS["tagging_clap"],
+                        help='FAISS index-factory spec for the final index, e.g. "Flat", "HNSW32", "IVF1024,Flat"')
+    parser.add_argument("--decoders", type=int, default=None, help="Decoder processes (default: cores - 1)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Tracks per CLAP forward")
+    parser.add_argument("--checkpoint-every", type=int, default=300, help="Tracks between index/metadata checkpoints")
+    parser.add_argument("--refresh-manifest", action="store_true", help="Re-scan the audio directory")
+    parser.add_argument("--refresh-metadata", action="store_true", help="Re-parse the FMA CSVs instead of using the cache")
+    parser.add_argument("--compact-only", action="store_true", help="Only compact the journal into the serving index")
+    args = parser.parse_args()
+
+    # Resume state comes from the journal manifest; a pre-journal build is imported once
+    journal = BuildJournal(BUILD_JOURNAL_DIR / "clap", key_field="id")
+    journal.import_existing(TAGGING_INDEX, TAGGING_META)
+    if args.compact_only:
+        journal.compact(TAGGING_INDEX, TAGGING_META, index_spec=args.index_spec)
+        return
+
     print("🔄 Initializing CLAP model and loading metadata...")
-    clap = get_clap(TAGGING_INDEX, TAGGING_META, read_only=False)
+    # Only the model is needed; vectors go to the journal
+    clap = CLAPWrapper(read_only=True)
 
-    metadata = pd.read_csv(TRACKS_PATH, index_col=0, header=[0, 1])
-    genre_map = load_genre_map(GENRE_MAP_PATH)
+    # Parsed once into a cached Parquet file: no CSV parsing, eval or BeautifulSoup per run
+    metadata = fma_entries(load_fma_tracks(refresh=args.refresh_metadata))
 
-    # Load previously processed metadata if available
-    if TAGGING_META.exists():
-        with open(TAGGING_META, "r") as f:
-            output_meta = json.load(f)
-        existing_ids = set(entry["id"] for entry in output_meta)
-        print(f"⚠️ Found existing metadata: skipping {len(existing_ids)} already processed tracks.")
-    else:
-        output_meta = []
-        existing_ids = set()
+    existing_ids = {int(key) for key in journal.processed_keys()}
+    if existing_ids:
+        print(f"⚠️ Found existing journal: skipping {len(existing_ids)} already processed tracks.")
 
     # Subset to only tracks we need to process
-    track_ids_to_process = [tid for tid in metadata.index if int(tid) not in existing_ids]
+    track_ids_to_process = [tid for tid in metadata if tid not in existing_ids]
     total = len(track_ids_to_process)
 
     print(f"\n📦 Dataset: {TAGGING_AUDIO_DIR.name}")
     print(f"🎯 Attempting to process {total} new tracks...\n")
 
-    processed = 0
-    skipped_missing = 0
-    skipped_existing = 0
-    skipped_invalid = 0
-
-    start_time = time()
-
-    try:
-        for i, track_id in enumerate(tqdm(track_ids_to_process, desc="🎧 Processing tracks")):
-            path = get_audio_path(TAGGING_AUDIO_DIR, track_id)
-            if not os.path.exists(path):
-                skipped_missing += 1
+    # One cached directory listing instead of an exists() call per track
+    available = set(load_audio_manifest(TAGGING_AUDIO_DIR, TAGGING_AUDIO_MANIFEST, refresh=args.refresh_manifest))
+    skipped = {"missing": 0, "invalid": 0}
+    pending_vectors = []
+    pending_meta = []
+
+    def pending_tracks():
+        for track_id in track_ids_to_process:
+            path = str(get_audio_path(TAGGING_AUDIO_DIR, track_id))
+            if path not in available:
+                skipped["missing"] += 1
                 continue
+            yield track_id, path, track_id
 
-            try:
-                emb = clap.process_and_index(path)
-                if not isinstance(emb, list) or len(emb) != 512:
-                    skipped_invalid += 1
-                    continue
-            except Exception as e:
-                print(f"[CLAP crash] {track_id} - {e}")
+    def add_batch(track_ids, _, embeddings):
+        vectors, entries = [], []
+        for track_id, emb in zip(track_ids, embeddings):
+            if not isinstance(emb, list) or len(emb) != 512:
+                skipped["invalid"] += 1
                 continue
-
-            # Process metadata
-            row = metadata.loc[track_id]
-            genre_ids = eval(row.get(("track", "genres_all"), "[]"))
-            genre_names = [genre_map.get(gid) for gid in genre_ids if gid in genre_map]
-
-            output_meta.append({
-                    "id": int(track_id),
-                    "title": str(row.get(("track", "title"), "")),
-                    "artist": str(row.get(("artist", "name"), "")),
-                    "album": str(row.get(("album", "title"), "")),
-                    "genre": str(row.get(("track", "genre_top")) or "").lower(),
-                    "genre_names": [str(g).lower() for g in genre_names if g],
-                    "duration": float(row.get(("track", "duration"))) if pd.notnull(row.get(("track", "duration"))) else None,
-                    "tags": [str(t).lower() for t in safe_eval(row.get(("track", "tags")))],
-                    "artist_bio": clean_html(row.get(("artist", "bio"), ""), max_len=400),
-                    "artist_projects": clean_html(row.get(("artist", "related_projects"), ""), max_len=300),
-                    "artist_website": str(row.get(("artist", "website"), "")),
-                    "album_description": clean_html(row.get(("album", "information"), ""), max_len=400),
-                    "album_engineer": str(row.get(("album", "engineer"), "")),
-                    "license": str(row.get(("track", "license"), "")),
-                    "location": str(row.get(("artist", "location"), "")),
-            })
-
-            processed += 1
-            if processed <= 10 or processed % 25 == 0:
-                print(f"✅ [{processed}] Processed track {track_id} ({i+1}/{total})")
-
-    finally:
-        duration = time() - start_time
-        print("\n💾 Saving FAISS index and metadata...")
-        os.makedirs(os.path.dirname(TAGGING_META), exist_ok=True)
-        clap.save_index()
-        with open(TAGGING_META, "w") as f:
-            json.dump(output_meta, f, indent=2)
-
-        print(f"\n🎉 Done in {duration:.1f}s")
-        print(f"✔️  New tracks processed: {processed}")
-        print(f"↪️  Skipped existing (preloaded): {len(existing_ids)}")
-        print(f"🚫 Skipped missing files: {skipped_missing}")
-        print(f"⚠️  Skipped invalid embeddings: {skipped_invalid}")
+            vectors.append(emb)
+            entries.append(metadata[track_id])
+        pending_vectors.extend(vectors)
+        pending_meta.extend(entries)
+
+    def checkpoint():
+        # Vectors and metadata are committed as one segment so a resumed run sees matching rows
+        if not pending_meta:
+            return
+        segment = journal.append(np.array(pending_vectors, dtype="float32"), pending_meta)
+        print(f"💾 Checkpoint: committed {len(pending_meta)} new tracks as {segment}")
+        pending_vectors.clear()
+        pending_meta.clear()
+
+    pipeline = IndexingPipeline(
+        embed_batch=clap.get_embeddings_batch,
+        decode_sr=CLAP_SR,
+        num_decoders=args.decoders,
+        batch_size=args.batch_size,
+        checkpoint_every=args.checkpoint_every,
+        on_checkpoint=checkpoint,
+    )
+    stats = pipeline.run(pending_tracks(), on_batch=add_batch)
+
+    journal.compact(TAGGING_INDEX, TAGGING_META, index_spec=args.index_spec)
+
+    print(f"\n🎉 Done in {stats['elapsed_sec']:.1f}s ({stats['tracks_per_sec']:.2f} tracks/sec)")
+    print(f"✔️  New tracks processed: {stats['embedded'] - skipped['invalid']}")
+    print(f"↪️  Skipped existing (preloaded): {len(existing_ids)}")
+    print(f"🚫 Skipped missing files: {skipped['missing']}")
+    print(f"⚠️  Skipped invalid embeddings: {skipped['invalid']}")
+    print(f"💥 Failed to decode/embed: {stats['failed'] + stats['decode_failed']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+import argparse
+import faiss
+from time import time
+
+from services.faiss_index_factory import convert_index, index_description
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild an existing FAISS index as another index-factory type")
+    parser.add_argument("--input", required=True, help="Existing index, e.g. data/tagging_index/embeddings/ttmr_index.faiss")
+    parser.add_argument("--output", required=True, help="Where to write the converted index")
+    parser.add_argument("--spec", required=True, help='Target spec, e.g. "HNSW32", "IVF1024,Flat", "IVF1024,PQ16"')
+    args = parser.parse_args()
+
+    index = faiss.read_index(args.input)
+    print(f"📦 Loaded {index_description(index)} with {index.ntotal} vectors (d={index.d})")
+
+    start = time()
+    converted = convert_index(index, args.spec)
+    faiss.write_index(converted, args.output)
+    print(f"✅ Wrote {index_description(converted)} to {args.output} in {time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
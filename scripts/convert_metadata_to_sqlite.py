@@ -0,0 +1,31 @@
+import argparse
+import json
+from time import time
+
+from configs.index_configs import METADATA_KEY_FIELDS
+from services.metadata_store import write_metadata_store, metadata_store_path
+
+def convert(json_path, key_field=None):
+    db_path = metadata_store_path(json_path)
+    start = time()
+    with open(json_path, "r") as f:
+        entries = json.load(f)
+    count = write_metadata_store(entries, db_path, key_field=key_field, source_path=json_path)
+    print(f"✅ {json_path} -> {db_path} ({count} rows, {time() - start:.1f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert metadata JSON lists into row-id keyed SQLite stores")
+    parser.add_argument("paths", nargs="*", help="Metadata JSON files (default: every tagging metadata file that exists)")
+    parser.add_argument("--key-field", default=None, help="Field stored in the indexed key column")
+    args = parser.parse_args()
+
+    if args.paths:
+        sources = {path: args.key_field for path in args.paths}
+    else:
+        sources = {path: key for path, key in METADATA_KEY_FIELDS.items() if path.exists()}
+
+    for path, key_field in sources.items():
+        convert(path, key_field)
+
+if __name__ == "__main__":
+    main()
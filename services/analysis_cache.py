@@ -0,0 +1,157 @@
+import os
+import pickle
+import threading
+import xxhash
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+from configs.index_configs import ANALYSIS_CACHE_DIR
+from configs.cache_configs import (
+    ANALYSIS_CACHE_ENABLED, ANALYSIS_CACHE_MEMORY_MB, ANALYSIS_CACHE_DISK_MB, ANALYSIS_PIPELINE_VERSION,
+)
+from configs.model_configs import CLAP_QUANTIZE, TTMR_QUANTIZE
+from services.disk_budget import enforce_disk_budget
+
+
+def hash_content(data: bytes) -> str:
+    """Content hash used as the cache key for an uploaded file."""
+    return xxhash.xxh3_128_hexdigest(data)
+
+
+def new_content_hasher():
+    """Incremental version of hash_content for uploads read in chunks."""
+    return xxhash.xxh3_128()
+
+
+def analysis_key(content_hash: str, preview_duration_sec) -> str:
+    """
+    Cache key for one analysis of an upload. The same file analyzed over a
+    different preview window, pipeline version or model precision gets its own
+    entries (and stem artifacts) instead of the earlier results.
+    """
+    setup = f"{preview_duration_sec}|v{ANALYSIS_PIPELINE_VERSION}|clap_int8={int(CLAP_QUANTIZE)}|ttmr_int8={int(TTMR_QUANTIZE)}"
+    return xxhash.xxh3_128_hexdigest(f"{content_hash}|{setup}".encode("utf-8"))
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis artifacts keyed by (analysis key, artifact name).
+
+    Artifacts are pickled once on `put`. The memory tier keeps the pickled bytes
+    in an LRU bounded by `max_memory_bytes`; the disk tier keeps one file per
+    artifact under `cache_dir/<hash[:2]>/<hash>/` and evicts least recently used
+    files (by mtime, refreshed on every hit) once the directory grows past
+    `max_disk_bytes`. The disk total is read from the directory on each write,
+    so pre-fork workers sharing it stay within one budget.
+    """
+
+    def __init__(
+        self,
+        cache_dir=ANALYSIS_CACHE_DIR,
+        max_memory_bytes: int = ANALYSIS_CACHE_MEMORY_MB * 1024 * 1024,
+        max_disk_bytes: int = ANALYSIS_CACHE_DISK_MB * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # As of the last budget check (includes other workers' files)
+        self._disk_entries = 0
+        self._disk_bytes = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._enforce_disk()
+        print(f"[CACHE] Found {self._disk_entries} cached artifacts ({self._disk_bytes / 1e6:.1f} MB) in {self.cache_dir}")
+
+    def _enforce_disk(self, keep=()):
+        entries, total, removed = enforce_disk_budget(self.cache_dir, ("*/*/*.pkl",), self.max_disk_bytes, keep)
+        for path in removed:
+            try:
+                os.rmdir(os.path.dirname(path))  # only succeeds once the entry dir is empty
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_entries, self._disk_bytes = entries, total
+
+    def _path(self, content_hash: str, artifact: str) -> Path:
+        return self.cache_dir / content_hash[:2] / content_hash / f"{artifact}.pkl"
+
+    def get(self, content_hash: str, artifact: str) -> Optional[Any]:
+        key = (content_hash, artifact)
+        path = str(self._path(content_hash, artifact))
+
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return pickle.loads(data)
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits["disk"] += 1
+            self._remember(key, data)
+        return pickle.loads(data)
+
+    def put(self, content_hash: str, artifact: str, value: Any):
+        key = (content_hash, artifact)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        path = self._path(content_hash, artifact)
+
+        try:
+            os.makedirs(path.parent, exist_ok=True)
+            tmp_path = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[CACHE] Failed to write {path}: {e}")
+            path = None
+
+        with self._lock:
+            self._remember(key, data)
+        if path is not None:
+            self._enforce_disk(keep=[path])
+
+    def _remember(self, key, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory_bytes -= len(self._memory.pop(key, b""))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": self._disk_entries,
+                "disk_bytes": self._disk_bytes,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Process-wide cache, or None when ANALYSIS_CACHE_ENABLED=0"""
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+    return AnalysisCache()
@@ -0,0 +1,133 @@
+import io
+import os
+import re
+import threading
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+from configs.index_configs import ARTIFACT_DIR
+from configs.serving_configs import STEM_FORMAT, ARTIFACT_DISK_MB
+from services.disk_budget import enforce_disk_budget
+from utils.audio_buffer import AudioBuffer
+
+# format -> (file suffix, media type, soundfile format, subtype)
+AUDIO_FORMATS = {
+    "flac": (".flac", "audio/flac", "FLAC", "PCM_16"),
+    "opus": (".ogg", "audio/ogg", "OGG", "OPUS"),
+}
+# libopus only takes these rates; anything else is resampled to 48 kHz
+OPUS_RATES = {8000, 12000, 16000, 24000, 48000}
+ARTIFACT_ID = re.compile(r"^[0-9a-f]{8,64}-[a-z0-9_]{1,32}$")
+
+
+def _encode(y: np.ndarray, sr: int, fmt: str) -> bytes:
+    _, _, sf_format, subtype = AUDIO_FORMATS[fmt]
+    out = io.BytesIO()
+    sf.write(out, np.clip(y, -1.0, 1.0).T, sr, format=sf_format, subtype=subtype)
+    return out.getvalue()
+
+
+class ArtifactStore:
+    """
+    Stem audio stored on disk and served by id instead of inlined in responses.
+
+    `put_audio` writes a lossless FLAC master once per id (ids derived from the
+    upload's content hash are stable, so re-analysis reuses the file). Other
+    formats are transcoded from the master on first request and kept next to
+    it. The directory is bounded by `max_disk_bytes`, least recently used
+    files first: serving, reusing or `retain`ing a file refreshes its mtime.
+    The total and the order are read from the directory (services/disk_budget.py),
+    so pre-fork workers sharing it enforce one budget.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR, max_disk_bytes: int = ARTIFACT_DISK_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.max_disk_bytes = max_disk_bytes
+        self._patterns = tuple(f"*/*{suffix}" for suffix, _, _, _ in AUDIO_FORMATS.values())
+        os.makedirs(self.root, exist_ok=True)
+        self._enforce_disk()
+
+    @staticmethod
+    def new_id(key: Optional[str], name: str) -> str:
+        return f"{key or uuid.uuid4().hex}-{name}"
+
+    def path(self, artifact_id: str, fmt: str = "flac") -> Path:
+        if not ARTIFACT_ID.match(artifact_id) or fmt not in AUDIO_FORMATS:
+            raise ValueError(f"Invalid artifact '{artifact_id}' ({fmt})")
+        return self.root / artifact_id[:2] / f"{artifact_id}{AUDIO_FORMATS[fmt][0]}"
+
+    def _write(self, path: Path, data: bytes):
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._enforce_disk(keep=[path])
+
+    def _enforce_disk(self, keep=()):
+        # Temp files of in-flight writes don't match the patterns, so they are never evicted
+        return enforce_disk_budget(self.root, self._patterns, self.max_disk_bytes, keep)
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """Marks a file as just used for every worker's LRU order; False if it is gone."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put_audio(self, artifact_id: str, audio: AudioBuffer) -> dict:
+        """Stores the FLAC master (if not already there) and returns the reference for responses."""
+        path = self.path(artifact_id, "flac")
+        if not self._touch(path):
+            self._write(path, _encode(audio.load(mono=False), audio.native_sr, "flac"))
+        return self.reference(artifact_id, duration_sec=round(audio.duration, 3), sample_rate=audio.native_sr)
+
+    @staticmethod
+    def reference(artifact_id: str, **info) -> dict:
+        return {
+            "artifact_id": artifact_id,
+            **info,
+            "url": f"/semantic/artifacts/{artifact_id}?format={STEM_FORMAT}",
+            "formats": {fmt: f"/semantic/artifacts/{artifact_id}?format={fmt}" for fmt in AUDIO_FORMATS},
+        }
+
+    def retain(self, artifact_id: str) -> bool:
+        """Marks the FLAC master as used (so a cached entry pointing at it keeps it); False if evicted."""
+        try:
+            return self._touch(self.path(artifact_id, "flac"))
+        except ValueError:
+            return False
+
+    def get_file(self, artifact_id: str, fmt: str = STEM_FORMAT) -> Optional[Path]:
+        """Path of the artifact in `fmt`, transcoding from the FLAC master on first use; None if unknown."""
+        path = self.path(artifact_id, fmt)
+        master = self.path(artifact_id, "flac")
+        if self._touch(path):
+            if fmt != "flac":
+                # Transcodes are rebuilt from the master, so keep it alongside
+                self._touch(master)
+            return path
+        if not self._touch(master):
+            return None
+
+        y, sr = sf.read(master, dtype="float32", always_2d=True)
+        audio = AudioBuffer.from_array(y.T, sr)
+        target_sr = sr if fmt != "opus" or sr in OPUS_RATES else 48000
+        self._write(path, _encode(audio.load(target_sr, mono=False), target_sr, fmt))
+        print(f"[ARTIFACT] Transcoded {artifact_id} to {fmt}")
+        return path
+
+    def media_type(self, fmt: str) -> str:
+        return AUDIO_FORMATS[fmt][1]
+
+
+@lru_cache(maxsize=1)
+def get_artifact_store() -> ArtifactStore:
+    return ArtifactStore()
@@ -0,0 +1,105 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+def group_sums(vectors: np.ndarray, labels: np.ndarray) -> tuple:
+    """Vectorized group-by: (unique labels, per-label vector sums, per-label counts)."""
+    unique, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    sums = np.add.reduceat(vectors[order].astype(np.float64), starts, axis=0)
+    return unique, sums, counts
+
+
+class ArtistCentroids:
+    """
+    Running per-artist sums of TTMR++ track vectors.
+
+    Track vectors are folded in once (`fold`), so when new tracks land only
+    their rows are added to the affected artists' sums; the centroids are
+    sums / counts. The state (sums, counts, folded track ids and cached OLGA
+    similar-artist names) is saved as `.npz` + `.json` next to each other.
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim
+        self.names = []
+        self._rows = {}
+        self.sums = np.zeros((0, dim or 0), dtype=np.float64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.track_ids = {}
+        self.sim_names = {}
+
+    @property
+    def folded_tracks(self) -> set:
+        return {track_id for ids in self.track_ids.values() for track_id in ids}
+
+    def fold(self, track_ids: list, artists: list, vectors: np.ndarray) -> set:
+        """Adds new track vectors to their artists; returns the artists whose centroid changed."""
+        if len(track_ids) == 0:
+            return set()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self.sums = np.zeros((0, self.dim), dtype=np.float64)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Track vectors have dim {vectors.shape[1]}, centroids have {self.dim}")
+
+        unique, sums, counts = group_sums(vectors, np.asarray(artists, dtype=object))
+        new_names = [name for name in unique if name not in self._rows]
+        if new_names:
+            for name in new_names:
+                self._rows[name] = len(self.names)
+                self.names.append(name)
+            self.sums = np.vstack([self.sums, np.zeros((len(new_names), self.dim))])
+            self.counts = np.concatenate([self.counts, np.zeros(len(new_names), dtype=np.int64)])
+
+        rows = np.array([self._rows[name] for name in unique])
+        self.sums[rows] += sums
+        self.counts[rows] += counts
+        for track_id, artist in zip(track_ids, artists):
+            self.track_ids.setdefault(artist, []).append(track_id)
+        return set(unique)
+
+    def centroids(self, min_tracks: int = 1) -> tuple:
+        """(artist names, float32 centroid matrix) for artists with at least `min_tracks` tracks."""
+        keep = np.flatnonzero(self.counts >= min_tracks)
+        names = [self.names[i] for i in keep]
+        return names, (self.sums[keep] / self.counts[keep, None]).astype("float32")
+
+    def save(self, path):
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_npz = path.with_suffix(".tmp.npz")
+        np.savez(tmp_npz, sums=self.sums, counts=self.counts)
+        tmp_json = path.with_suffix(".json.tmp")
+        with open(tmp_json, "w") as f:
+            json.dump({"dim": self.dim, "names": self.names, "track_ids": self.track_ids, "sim_names": self.sim_names}, f)
+        os.replace(tmp_npz, path.with_suffix(".npz"))
+        os.replace(tmp_json, path.with_suffix(".json"))
+
+    @classmethod
+    def load(cls, path) -> "ArtistCentroids":
+        path = Path(path)
+        state = cls()
+        if not path.with_suffix(".npz").exists() or not path.with_suffix(".json").exists():
+            return state
+        with open(path.with_suffix(".json"), "r") as f:
+            info = json.load(f)
+        with np.load(path.with_suffix(".npz")) as arrays:
+            sums, counts = arrays["sums"], arrays["counts"]
+        # The two files are replaced one after the other; a crash in between shows up as a count mismatch
+        if len(info["names"]) != len(counts) or int(counts.sum()) != sum(len(ids) for ids in info["track_ids"].values()):
+            print(f"⚠️ Centroid state at {path} is inconsistent; starting over")
+            return state
+        state.dim = info["dim"]
+        state.names = info["names"]
+        state._rows = {name: i for i, name in enumerate(state.names)}
+        state.sums, state.counts = sums, counts
+        state.track_ids = info["track_ids"]
+        state.sim_names = info.get("sim_names", {})
+        return state
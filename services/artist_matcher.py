@@ -0,0 +1,121 @@
+import heapq
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+try:
+    # Same WRatio scorer, C++ implementation
+    from rapidfuzz import fuzz
+except ImportError:
+    from fuzzywuzzy import fuzz
+
+_NON_ALNUM = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, accent-folded, punctuation collapsed to single spaces (fuzzywuzzy's full_process plus accent folding)."""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", name.lower()).strip()
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ArtistNameIndex:
+    """
+    Fuzzy artist-name lookup that avoids scoring every known name.
+
+    A query is resolved by (1) exact match on the normalized name, then
+    (2) candidate names with the highest trigram overlap (Dice, so a name of
+    similar length beats a longer one sharing as many trigrams), then (3)
+    WRatio on those candidates only. Scores are on fuzzywuzzy's 0-100 scale, so
+    `process.extractOne` cut-offs carry over.
+    """
+
+    def __init__(self, names: Iterable[str], max_candidates: int = 50, max_posting_fraction: float = 0.05):
+        self.names = list(dict.fromkeys(names))
+        self.normalized = [normalize_name(name) for name in self.names]
+        self.max_candidates = max_candidates
+
+        self._exact = {}
+        self._gram_counts = []
+        postings = defaultdict(list)
+        for name_id, normalized in enumerate(self.normalized):
+            self._exact.setdefault(normalized, name_id)
+            grams = _trigrams(normalized)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(name_id)
+
+        # Trigrams shared by a large share of names ("the", "and") rank nothing; skip them when rarer ones exist
+        self._max_posting = max(1000, int(len(self.names) * max_posting_fraction))
+        self._postings = dict(postings)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def candidates(self, normalized: str) -> list:
+        query_grams = _trigrams(normalized)
+        grams = [gram for gram in query_grams if gram in self._postings]
+        selective = [gram for gram in grams if len(self._postings[gram]) <= self._max_posting]
+        counts = Counter()
+        for gram in selective or grams:
+            counts.update(self._postings[gram])
+        top = heapq.nlargest(
+            self.max_candidates, counts.items(),
+            key=lambda item: item[1] / (len(query_grams) + self._gram_counts[item[0]]),
+        )
+        return [name_id for name_id, _ in top]
+
+    def match(self, query: str, score_cutoff: float = 0) -> Optional[tuple]:
+        """Best (name, score) for `query`, or None if nothing reaches `score_cutoff`."""
+        normalized = normalize_name(query)
+        if not normalized:
+            return None
+
+        name_id = self._exact.get(normalized)
+        if name_id is not None:
+            return self.names[name_id], 100
+
+        best_id, best_score = None, -1
+        for name_id in self.candidates(normalized):
+            score = fuzz.WRatio(normalized, self.normalized[name_id])
+            if score > best_score:
+                best_id, best_score = name_id, score
+        if best_id is None or best_score < score_cutoff:
+            return None
+        return self.names[best_id], best_score
+
+    def match_many(self, queries: Iterable[str], score_cutoff: float = 0) -> dict:
+        """Resolves every query in one pass; repeated (normalized) queries are scored once."""
+        resolved = {}
+        by_normalized = {}
+        for query in queries:
+            if query in resolved:
+                continue
+            normalized = normalize_name(query)
+            if normalized not in by_normalized:
+                by_normalized[normalized] = self.match(query, score_cutoff)
+            resolved[query] = by_normalized[normalized]
+        return resolved
+
+
+def build_olga_similarity_map(sim_artist_texts: Iterable[str]) -> dict:
+    """
+    {lowercased artist name: Counter of co-listed similar artists} from OLGA's
+    "[SEP]"-joined `sim_artist_text` column.
+    """
+    sim_map = defaultdict(Counter)
+    for sim_text in sim_artist_texts:
+        if not sim_text:
+            continue
+        names = [n.strip() for n in sim_text.split("[SEP]") if n.strip()]
+        for name in names:
+            sim_map[name.lower()].update(names)
+    return sim_map
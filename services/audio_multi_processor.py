@@ -1,4 +1,5 @@
-from services.llm_tagger import generate_tags_and_summary_hybrid
+import asyncio
+from services.llm_tagger import generate_tags_and_summaries_concurrently
 from services.metadata_extractor import extract_metadata
 from configs.index_configs import (
     TAGGING_INDEX, TAGGING_META, 
@@ -12,93 +13,194 @@ from services.text_embedder import TextEmbeddingIndex
 # from services.ttmrpp_manager import get_ttmr      
 from services.clap_wrapper import CLAPWrapper
 from services.ttmrpp_wrapper import TTMRPPWrapper
-from utils.audio_utils import encode_audio_base64
+from services.neighbor_search import NeighborSearchService
+from services.artifact_store import ArtifactStore, get_artifact_store
+from utils.audio_utils import load_preview_segment, probe_audio
+from configs.serving_configs import PREVIEW_DURATION_SEC, AUDIO_BATCHING
+from services.embedding_scheduler import get_audio_embedding_scheduler
+from services.analysis_cache import get_analysis_cache, analysis_key
+from services.spectral_features import METADATA_SR, analyze_clips
 from fastapi import Request
+from typing import Optional
+
+
+def _cached(cache_key: Optional[str], artifact: str, compute):
+    """Returns the cached artifact for this analysis (see `analysis_key`), computing and storing it on a miss."""
+    cache = get_analysis_cache() if cache_key else None
+    if cache is None:
+        return compute()
+    value = cache.get(cache_key, artifact)
+    if value is None:
+        value = compute()
+        cache.put(cache_key, artifact, value)
+    else:
+        print(f"[CACHE] Reusing '{artifact}' for {cache_key}")
+    return value
+
+
+def analyze_audio_features(request: Request, full_path: str, preview_duration_sec: int = PREVIEW_DURATION_SEC, content_hash: Optional[str] = None) -> dict:
+    """
+    CPU-bound half of the hybrid pipeline: stems, embeddings, neighbors and
+    metadata. Returns the partial entry plus the LLM prompts still to send.
+    Runs on the inference pool, never on the event loop. With a `content_hash`,
+    stems, track_info, embeddings and metadata are read from / written to the
+    analysis cache under `analysis_key(content_hash, preview_duration_sec)`.
+    """
+    cache_key = analysis_key(content_hash, preview_duration_sec) if content_hash else None
+    # Only the preview window is decoded, once; every stage below reads cached views of it.
+    # Track length and sample rate come from the file headers.
+    track_probe = probe_audio(full_path)
+    preview_audio = load_preview_segment(full_path, segment_duration_sec=preview_duration_sec, duration_sec=track_probe["duration_sec"])
+
+    # 1. Separate stems (in memory, resident Demucs model)
+    def separate():
+        return separate_stems(preview_audio)
+
+    stem_audio = _cached(cache_key, "stems", separate)
+    # Stems go out as FLAC artifacts fetched from /semantic/artifacts/{id}, not inlined in the response
+    artifact_store = get_artifact_store()
+    stem_artifacts = {
+        stem_name: artifact_store.put_audio(ArtifactStore.new_id(cache_key, stem_name), buffer)
+        for stem_name, buffer in stem_audio.items()
+    }
 
+    # One batched STFT over the four stems feeds both the energy breakdown and the ignorable checks
+    stem_features = {}
 
-def process_audio_hybrid(request: Request, preview_path: str, full_path: str):
-    # 1. Separate stems
-    stems = separate_stems(preview_path)
-    encoded_stems = {
-        stem_name: encode_audio_base64(path)
-        for stem_name, path in stems.items()
-    }
+    def get_stem_features():
+        if not stem_features:
+            stem_features.update(analyze_clips(stem_audio))
+        return stem_features
 
     # 2. Classify track type
-    track_info = classify_track_type(stems)
-
-    # 3. Get CLAP embedding
-    tagging_clap = CLAPWrapper(app=request.app, variant="tagging_clap", read_only=True)
-    clap_embedding = tagging_clap.get_embedding(preview_path)
-
-    # 4. Get TTMR embedding and neighbors
-    ttmr_embedder = TTMRPPWrapper(app=request.app, variant="tagging_ttmr", read_only=True)
-    ttmr_embedding = ttmr_embedder.get_audio_embedding(preview_path)
-    overall_ttmr_neighbors = ttmr_embedder.query_neighbors_with_metadata(ttmr_embedding, k=3)
-    # 4. Get TTMR artist embedding and neighbors
-    ttmr_artist_embedder = TTMRPPWrapper(app=request.app, variant="tagging_ttmr_artist", read_only=True)
-    overall_ttmr_artist_neighbors = ttmr_artist_embedder.query_neighbors_with_metadata(ttmr_embedding, k=3)
-
-    # 5. Extract metadata
-    overall_metadata = extract_metadata(full_path)
-    overall_metadata["track_info"] = track_info
+    track_info = _cached(cache_key, "track_info", lambda: classify_track_type(stem_audio, features=get_stem_features()))
+
+    # 3. Embed the preview and every non-ignorable stem in one batch per model
+    ignored_stems = [
+        stem_name for stem_name in stem_audio
+        if track_info["stem_is_ignorable"].get(stem_name, 0) == 1
+    ]
+    active_stems = [stem_name for stem_name in stem_audio if stem_name not in ignored_stems]
+    clips = [preview_audio] + [stem_audio[stem_name] for stem_name in active_stems]
+
+    def embed_clips():
+        if AUDIO_BATCHING:
+            # Batched with the clips of every other in-flight request
+            return get_audio_embedding_scheduler().embed(clips)
+
+        tagging_clap = CLAPWrapper(app=request.app, variant="tagging_clap", read_only=True)
+        ttmr_embedder = TTMRPPWrapper(app=request.app, variant="tagging_ttmr", read_only=True)
+        clap_embeddings = tagging_clap.get_embeddings_batch(clips)
+        ttmr_embeddings = [e.numpy() for e in ttmr_embedder.get_audio_embeddings_batch(clips)]
+        return {"clap": clap_embeddings, "ttmr": ttmr_embeddings}
+
+    embeddings = _cached(cache_key, "embeddings", embed_clips)
+    clap_embedding = embeddings["clap"][0]
+
+    # 4. Neighbors for every clip: one vectorized search per index
+    neighbor_search = NeighborSearchService.from_app(request.app)
+    clap_neighbors = neighbor_search.search_metadata(embeddings["clap"], ["tagging_clap"], k=3)["tagging_clap"]
+    ttmr_neighbors = neighbor_search.search_metadata(embeddings["ttmr"], ["tagging_ttmr", "tagging_ttmr_artist"], k=3)
+    ttmr_track_neighbors = ttmr_neighbors["tagging_ttmr"]
+    ttmr_artist_neighbors = ttmr_neighbors["tagging_ttmr_artist"]
+    overall_ttmr_neighbors = ttmr_track_neighbors[0]
+    overall_ttmr_artist_neighbors = ttmr_artist_neighbors[0]
+
+    # 5. Extract metadata (track + active stems); tempo and chroma of the track come from its preview window
+    def extract_all_metadata():
+        track_metadata = extract_metadata(preview_audio)
+        track_metadata["duration_sec"] = round(track_probe["duration_sec"], 2)
+        # Metadata stays at METADATA_SR: one more batched STFT, over the active stems only
+        stem_metadata_features = analyze_clips({stem_name: stem_audio[stem_name] for stem_name in active_stems}, sr=METADATA_SR)
+        return {
+            "track": track_metadata,
+            "stems": {
+                stem_name: extract_metadata(stem_audio[stem_name], features=stem_metadata_features[stem_name])
+                for stem_name in active_stems
+            },
+        }
+
+    metadata = _cached(cache_key, "metadata", extract_all_metadata)
+    overall_metadata = {**metadata["track"], "track_info": track_info}
     
 
     # 6. Combine neighbors
-    overall_clap_neighbors = tagging_clap.query_neighbors_with_tagging_metadata(clap_embedding, k=3)
+    overall_clap_neighbors = clap_neighbors[0]
     overall_hybrid_neighbors = overall_clap_neighbors + overall_ttmr_neighbors
 
 
-    # 7. Generate tags and summary
-    tags, summary = generate_tags_and_summary_hybrid(overall_metadata, overall_hybrid_neighbors, overall_ttmr_artist_neighbors)
-
-    # 8. Stem-level tagging
-    stem_tags = {}  
-    stem_summaries = {}
-
-    for stem_name, stem_path in stems.items():
-        # ignore stems that are too quiet or have no audio content
-        if track_info["stem_is_ignorable"].get(stem_name, 0) == 1:
-            print(f"Ignoring stem: {stem_name}")
-            stem_tags[stem_name] = []
-            stem_summaries[stem_name] = f"We detected that the {stem_name} is ignorable and does not contain meaningful audio content."
-            continue
+    # 7. Collect the full-track and stem-level tagging prompts
+    llm_jobs = {
+        "track": (overall_metadata, overall_hybrid_neighbors, overall_ttmr_artist_neighbors)
+    }
 
-        stem_metadata = extract_metadata(stem_path)
-        stem_embedding = tagging_clap.get_embedding(stem_path)
-        clap_neighbors = tagging_clap.query_neighbors_with_tagging_metadata(stem_embedding, k=3)
-        ttmr_embedding = ttmr_embedder.get_audio_embedding(stem_path)
-        ttmr_neighbors = ttmr_embedder.query_neighbors_with_metadata(ttmr_embedding, k=3)
-        ttmr_artist_neighbors = ttmr_artist_embedder.query_neighbors_with_metadata(ttmr_embedding, k=3)
+    for i, stem_name in enumerate(active_stems, start=1):
+        stem_metadata = metadata["stems"][stem_name]
         stem_meta = {
             **overall_metadata,
             "stem_chroma_vector": stem_metadata.get("chroma_vector", []),
             "stem_type": stem_name
         }
-        hybrid_neighbors = clap_neighbors + ttmr_neighbors
+        hybrid_neighbors = clap_neighbors[i] + ttmr_track_neighbors[i]
+        llm_jobs[stem_name] = (stem_meta, hybrid_neighbors, ttmr_artist_neighbors[i])
+
+    return {
+        "stem_names": list(stem_audio),
+        "ignored_stems": ignored_stems,
+        "clap_embedding": clap_embedding,
+        "llm_jobs": llm_jobs,
+        "entry": {
+            "metadata": overall_metadata,
+            "clap_neighbors": overall_clap_neighbors,
+            "ttmr_neighbors": overall_ttmr_neighbors,
+            "similar_artists": overall_ttmr_artist_neighbors,
+            "stems": stem_artifacts
+        }
+    }
+
+
+async def process_audio_hybrid(request: Request, full_path: str, preview_duration_sec: int = PREVIEW_DURATION_SEC, content_hash: Optional[str] = None):
+    # Raises InferenceQueueFull when the worker queue is saturated
+    analysis = await request.app.state.inference_pool.run(
+        analyze_audio_features, request, full_path, preview_duration_sec, content_hash
+    )
+    entry = analysis["entry"]
 
-        t, s = generate_tags_and_summary_hybrid(stem_meta, hybrid_neighbors, ttmr_artist_neighbors)
-        stem_tags[stem_name] = t
-        stem_summaries[stem_name] = s
+    # 8. Generate track and stem tags/summaries concurrently
+    llm_results, llm_failures = await generate_tags_and_summaries_concurrently(analysis["llm_jobs"])
+    tags, summary = llm_results["track"]
+
+    stem_tags = {}
+    stem_summaries = {}
+    for stem_name in analysis["stem_names"]:
+        # ignore stems that are too quiet or have no audio content
+        if stem_name in analysis["ignored_stems"]:
+            print(f"Ignoring stem: {stem_name}")
+            stem_tags[stem_name] = []
+            stem_summaries[stem_name] = f"We detected that the {stem_name} is ignorable and does not contain meaningful audio content."
+            continue
+        stem_tags[stem_name], stem_summaries[stem_name] = llm_results[stem_name]
 
     # 9. Add to CLAP index
-    # internal_clap = CLAPWrapper(faiss_path=INTERNAL_INDEX, metadata_path=INTERNAL_META)
     internal_metadata_entry = {
-        "metadata": overall_metadata,
-        "clap_neighbors": overall_clap_neighbors,
-        "ttmr_neighbors": overall_ttmr_neighbors,
+        "metadata": entry["metadata"],
+        "clap_neighbors": entry["clap_neighbors"],
+        "ttmr_neighbors": entry["ttmr_neighbors"],
         "tags": tags,
         "summary": summary,
         "stem_tags": stem_tags,
         "stem_summaries": stem_summaries,
-        "similar_artists": overall_ttmr_artist_neighbors,
-        "stems": encoded_stems
+        "similar_artists": entry["similar_artists"],
+        "stems": entry["stems"]
     }
 
-    # print(internal_metadata_entry)
-
-    # internal_clap.add_embedding_to_index(clap_embedding, internal_metadata_entry)
-    # internal_clap.save_index()
+    # Logged durably now, searchable after the next background flush (services/internal_index.py)
+    ingestor = getattr(request.app.state, "internal_ingestor", None)
+    if ingestor is not None:
+        try:
+            await asyncio.to_thread(ingestor.add, analysis["clap_embedding"], internal_metadata_entry, content_hash)
+        except Exception as e:
+            print(f"[INGEST] ❌ Could not log track for the internal index: {e}")
 
     # 10. Add to text search index
     # text_index = TextEmbeddingIndex(faiss_path=INTERNAL_TEXT_INDEX, metadata_path=INTERNAL_TEXT_META)
@@ -108,4 +210,9 @@ def process_audio_hybrid(request: Request, preview_path: str, full_path: str):
     # text_index.add_entry(text_blob, internal_metadata_entry)
     # text_index.save()
 
+    # Only complete results are cached; a partial LLM fallback is retried next time
+    cache = get_analysis_cache()
+    if content_hash and cache is not None and not llm_failures:
+        cache.put(analysis_key(content_hash, preview_duration_sec), "entry", internal_metadata_entry)
+
     return internal_metadata_entry
@@ -0,0 +1,207 @@
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+import faiss
+import numpy as np
+
+from services.faiss_index_factory import build_index, reconstruct_all, DEFAULT_INDEX_SPEC
+from services.metadata_store import write_metadata_store, metadata_store_path
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _fsync_write(path: Path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_serving_artifacts(
+    vectors: np.ndarray,
+    rows: list,
+    index_path,
+    metadata_path,
+    index_spec: str = DEFAULT_INDEX_SPEC,
+    key_field: Optional[str] = None,
+    metadata_store: bool = True,
+) -> tuple:
+    """
+    Writes the serving index (built as `index_spec`), the metadata JSON list
+    and optionally its SQLite store, each through a temp file and rename so
+    readers never see a partial file.
+    """
+    index_path, metadata_path = Path(index_path), Path(metadata_path)
+    index = build_index(vectors, index_spec)
+
+    os.makedirs(index_path.parent, exist_ok=True)
+    tmp_index = index_path.with_suffix(index_path.suffix + ".tmp")
+    faiss.write_index(index, str(tmp_index))
+    os.replace(tmp_index, index_path)
+
+    os.makedirs(metadata_path.parent, exist_ok=True)
+    tmp_meta = metadata_path.with_suffix(metadata_path.suffix + ".tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump(rows, f, indent=2)
+    os.replace(tmp_meta, metadata_path)
+
+    if metadata_store:
+        write_metadata_store(rows, metadata_store_path(metadata_path), key_field=key_field, source_path=metadata_path)
+
+    print(f"✅ Wrote {index_path} ({index.ntotal} vectors) and {metadata_path} ({len(rows)} rows)")
+    return index.ntotal, len(rows)
+
+
+class BuildJournal:
+    """
+    Append-only persistence for an index build.
+
+    Each flush writes one segment (vectors `.npy`, metadata `.jsonl`, keys
+    `.keys.json`) and then commits it by atomically replacing `manifest.json`.
+    Files of a flush that never reached the manifest are ignored and
+    overwritten, so a crash at any point leaves the last committed state.
+    Flush cost depends only on the batch, not on the catalog size; the serving
+    index and metadata files are produced once by `compact`.
+    """
+
+    def __init__(self, journal_dir, key_field: str):
+        self.dir = Path(journal_dir)
+        self.key_field = key_field
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.dir / MANIFEST_NAME
+
+    def _read_manifest(self) -> dict:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        return {"version": 1, "key_field": self.key_field, "dim": None, "segments": []}
+
+    def _commit_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        _fsync_write(tmp_path, json.dumps(self.manifest, indent=2).encode("utf-8"))
+        os.replace(tmp_path, self.manifest_path)
+        # Make the rename itself durable
+        dir_fd = os.open(self.dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def reload(self) -> int:
+        """Re-reads the manifest (another process may have committed); returns the segment count."""
+        self.manifest = self._read_manifest()
+        return len(self.segments)
+
+    @property
+    def segments(self) -> list:
+        return self.manifest["segments"]
+
+    @property
+    def num_vectors(self) -> int:
+        return sum(segment["vectors"] for segment in self.segments)
+
+    @property
+    def num_rows(self) -> int:
+        return sum(segment["rows"] for segment in self.segments)
+
+    def processed_keys(self) -> set:
+        """Keys of every committed row, read from the per-segment key files listed in the manifest."""
+        keys = set()
+        for segment in self.segments:
+            with open(self.dir / f"{segment['name']}.keys.json", "r") as f:
+                keys.update(json.load(f))
+        return keys
+
+    def append(self, vectors: np.ndarray, rows: list) -> Optional[str]:
+        """Writes and commits one segment; returns its name."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if len(vectors) == 0 and not rows:
+            return None
+        if len(vectors):
+            vectors = vectors.reshape(len(vectors), -1)
+            if self.manifest["dim"] is None:
+                self.manifest["dim"] = int(vectors.shape[1])
+            elif vectors.shape[1] != self.manifest["dim"]:
+                raise ValueError(f"Segment dim {vectors.shape[1]} does not match journal dim {self.manifest['dim']}")
+
+        name = f"seg-{len(self.segments) + 1:06d}"
+        with open(self.dir / f"{name}.npy", "wb") as f:
+            np.save(f, vectors)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_write(
+            self.dir / f"{name}.jsonl",
+            "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows).encode("utf-8"),
+        )
+        keys = [str(row.get(self.key_field)) for row in rows if row.get(self.key_field) is not None]
+        _fsync_write(self.dir / f"{name}.keys.json", json.dumps(keys).encode("utf-8"))
+
+        self.segments.append({"name": name, "vectors": int(len(vectors)), "rows": len(rows)})
+        self._commit_manifest()
+        return name
+
+    def import_existing(self, index_path, metadata_path) -> bool:
+        """
+        Seeds an empty journal with a previously built index + metadata JSON so
+        the first journaled build resumes instead of starting over. Both are
+        kept whole, even if their row counts differ, so compaction reproduces
+        the old append-to-existing layout exactly.
+        """
+        if self.segments:
+            return False
+        index_path, metadata_path = Path(index_path), Path(metadata_path)
+        if not index_path.exists() and not metadata_path.exists():
+            return False
+
+        vectors = np.zeros((0, 0), dtype="float32")
+        if index_path.exists():
+            vectors = reconstruct_all(faiss.read_index(str(index_path)))
+        rows = []
+        if metadata_path.exists():
+            with open(metadata_path, "r") as f:
+                content = f.read().strip()
+                rows = json.loads(content) if content else []
+
+        if len(vectors) != len(rows):
+            print(f"⚠️ Imported {index_path.name} has {len(vectors)} vectors but {metadata_path.name} has {len(rows)} rows; kept as-is")
+        if len(vectors) == 0 and not rows:
+            return False
+        self.append(vectors, rows)
+        print(f"📥 Imported existing build into journal: {len(vectors)} vectors, {len(rows)} rows")
+        return True
+
+    def iter_segments(self, start: int = 0) -> Iterable[tuple]:
+        """Yields (vectors, rows) for every committed segment from `start`, in order."""
+        for segment in self.segments[start:]:
+            vectors = np.load(self.dir / f"{segment['name']}.npy")
+            with open(self.dir / f"{segment['name']}.jsonl", "r") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            yield vectors, rows
+
+    def compact(self, index_path, metadata_path, index_spec: str = DEFAULT_INDEX_SPEC, metadata_store: bool = True) -> tuple:
+        """
+        Builds the serving artifacts from every committed segment: the FAISS
+        index as `index_spec`, the metadata JSON list, and (optionally) its
+        SQLite store. Each output is written to a temp file and renamed.
+        """
+        all_vectors, all_rows = [], []
+        for vectors, rows in self.iter_segments():
+            if len(vectors):
+                all_vectors.append(vectors)
+            all_rows.extend(rows)
+        if not all_vectors:
+            print("⚠️ Journal has no vectors; nothing to compact")
+            return 0, len(all_rows)
+
+        vectors = np.concatenate(all_vectors)
+        print(f"🗜️ Compacting {len(self.segments)} segments: {len(vectors)} vectors, {len(all_rows)} rows -> '{index_spec}'")
+        return write_serving_artifacts(
+            vectors, all_rows, index_path, metadata_path,
+            index_spec=index_spec, key_field=self.key_field, metadata_store=metadata_store,
+        )
@@ -4,4 +4,4 @@ from services.clap_wrapper import CLAPWrapper
 
 @lru_cache(maxsize=8)
 def get_clap(index_path: str, metadata_path: str, read_only: bool = False) -> CLAPWrapper:
-    return CLAPWrapper(index_path, metadata_path, read_only)
\ No newline at end of file
+    return CLAPWrapper(faiss_path=index_path, metadata_path=metadata_path, read_only=read_only)
\ No newline at end of file
@@ -2,6 +2,9 @@ import os
 import torch
 import laion_clap
 from functools import lru_cache
+from typing import Optional
+from configs.model_configs import CLAP_QUANTIZE
+from services.model_quantization import quantize_for_cpu
 
 CKPT_PATH = "checkpoints/music_speech_audioset_epoch_15_esc_89.98.pt"
 
@@ -14,21 +17,31 @@ if not os.path.exists(CKPT_PATH):
     except Exception as e:
         print(f"[CLAP Model] Failed to download checkpoint: {e}")
 
-@lru_cache(maxsize=1)
-def get_clap_model():
-    """Lazy load CLAP model only when first needed"""
-    print("[CLAP Model] Loading model on demand...")
+def load_clap_model(quantize: bool = False):
+    """Builds a fresh CLAP model; `quantize` swaps its Linear layers for int8 (CPU only)"""
     device = "cuda" if torch.cuda.is_available() else "cpu"
     model = laion_clap.CLAP_Module(enable_fusion=False, amodel="HTSAT-base")
     model.load_ckpt(CKPT_PATH)
+    if quantize and device == "cpu":
+        model = quantize_for_cpu(model, "CLAP", inplace=True)
+    return model, device
+
+@lru_cache(maxsize=2)
+def _shared_clap_model(quantize: bool):
+    print("[CLAP Model] Loading model on demand...")
+    model, device = load_clap_model(quantize=quantize)
     print("[CLAP Model] Model loaded successfully.")
     return model, device
 
+def get_clap_model(quantize: Optional[bool] = None):
+    """Lazy load CLAP model only when first needed; one shared instance per `quantize` (default CLAP_QUANTIZE)"""
+    return _shared_clap_model(CLAP_QUANTIZE if quantize is None else quantize)
+
 # Lazy loading - models only loaded when first accessed
-def get_clap_device():
-    _, device = get_clap_model()
+def get_clap_device(quantize: Optional[bool] = None):
+    _, device = get_clap_model(quantize)
     return device
 
-def get_clap_model_instance():
-    model, _ = get_clap_model()
+def get_clap_model_instance(quantize: Optional[bool] = None):
+    model, _ = get_clap_model(quantize)
     return model
\ No newline at end of file
@@ -1,12 +1,15 @@
 import torch
 # torch.set_num_threads(1)  # Removed to enable concurrent processing
-import librosa
 import numpy as np
 import os
 import faiss
 import ujson as json
-from typing import Optional
+from typing import Optional, Union
 from services.clap_singleton import get_clap_model_instance, get_clap_device
+from utils.audio_buffer import AudioBuffer, as_audio_buffer
+from services.faiss_index_factory import create_index, DEFAULT_INDEX_SPEC
+
+CLAP_SR = 48000
 
 def int16_to_float32(x):
     return (x / 32767.0).astype(np.float32)
@@ -16,10 +19,12 @@ def float32_to_int16(x):
     return (x * 32767.).astype(np.int16)
 
 class CLAPWrapper:
-    def __init__(self, app=None, variant: Optional[str] = None, faiss_path=None, metadata_path=None, read_only: bool = False):
+    def __init__(self, app=None, variant: Optional[str] = None, faiss_path=None, metadata_path=None, read_only: bool = False, index_spec: str = DEFAULT_INDEX_SPEC, quantize: Optional[bool] = None):
         # Lazy loading - models loaded on first use
         self._model = None
         self._device = None
+        # Which shared model instance to use (None: CLAP_QUANTIZE)
+        self.quantize = quantize
 
         self.index = None
         self.metadata = []
@@ -54,7 +59,7 @@ class CLAPWrapper:
                     self.index = faiss.read_index(str(faiss_path))
             else:
                 print(f"[faiss] Creating new FAISS index at {faiss_path}")
-                self.index = faiss.IndexFlatL2(512)
+                self.index = create_index(512, index_spec)
 
         if metadata_path:
             if os.path.exists(metadata_path):
@@ -72,30 +77,39 @@ class CLAPWrapper:
     def model(self):
         """Lazy load CLAP model on first access"""
         if self._model is None:
-            self._model = get_clap_model_instance()
+            self._model = get_clap_model_instance(self.quantize)
         return self._model
 
     @property
     def device(self):
         """Lazy load device on first access"""
         if self._device is None:
-            self._device = get_clap_device()
+            self._device = get_clap_device(self.quantize)
         return self._device
 
-    def get_embedding(self, file_path: str) -> list[float]:
-        audio_data, _ = librosa.load(file_path, sr=48000)
-        audio_data = audio_data.reshape(1, -1)
-        audio_data = float32_to_int16(audio_data)
-        audio_data = int16_to_float32(audio_data)
-        audio_tensor = torch.from_numpy(audio_data).float().to(self.device)
+    def get_embedding(self, source: Union[str, AudioBuffer]) -> list[float]:
+        return self.get_embeddings_batch([source])[0]
+
+    def get_embeddings_batch(self, sources: list[Union[str, AudioBuffer]]) -> list[list[float]]:
+        """Embeds several clips with a single CLAP audio forward and splits the results back out."""
+        if not sources:
+            return []
+        return self.embed_prepared([self.prepare_clip(source) for source in sources])
 
+    def prepare_clip(self, source: Union[str, AudioBuffer]) -> torch.Tensor:
+        """Decoded, resampled and int16-quantized clip as a CPU tensor, ready for `embed_prepared`."""
+        audio_data = as_audio_buffer(source).load(CLAP_SR)
         if audio_data is None or len(audio_data) == 0:
             raise ValueError("Empty or unreadable audio file.")
+        audio_data = int16_to_float32(float32_to_int16(audio_data))
+        return torch.from_numpy(audio_data).float()
 
+    def embed_prepared(self, clips: list[torch.Tensor]) -> list[list[float]]:
+        # CLAP featurizes each clip separately, so clips of different lengths can share a batch
         with torch.no_grad():
-            embedding = self.model.get_audio_embedding_from_data(audio_tensor, use_tensor=True)
+            embeddings = self.model.get_audio_embedding_from_data([clip.to(self.device) for clip in clips], use_tensor=True)
 
-        return embedding.squeeze().cpu().numpy().tolist()
+        return [embedding.cpu().numpy().tolist() for embedding in embeddings]
 
     def add_embedding_to_index(self, embedding: list[float], metadata: Optional[dict] = None):
         if self.read_only:
@@ -130,4 +144,4 @@ class CLAPWrapper:
         if self.metadata is None:
             raise ValueError("No metadata loaded. Pass `metadata_path` to the constructor.")
         neighbor_info = self.query_neighbors(embedding, k)
-        return [self.metadata[i] for i, _ in neighbor_info if i < len(self.metadata)]
+        return [self.metadata[i] for i, _ in neighbor_info if 0 <= i < len(self.metadata)]
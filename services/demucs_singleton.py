@@ -0,0 +1,23 @@
+import torch
+from functools import lru_cache
+from demucs.pretrained import get_model
+
+DEFAULT_DEMUCS_MODEL = "htdemucs"
+
+@lru_cache(maxsize=2)
+def get_demucs_model(name: str = DEFAULT_DEMUCS_MODEL):
+    """Lazy load Demucs once and keep it resident for every separation"""
+    print(f"[Demucs] Loading model '{name}' on demand...")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = get_model(name)
+    model.cpu().eval()
+    print("[Demucs] Model loaded successfully.")
+    return model, device
+
+def get_demucs_device(name: str = DEFAULT_DEMUCS_MODEL):
+    _, device = get_demucs_model(name)
+    return device
+
+def get_demucs_model_instance(name: str = DEFAULT_DEMUCS_MODEL):
+    model, _ = get_demucs_model(name)
+    return model
@@ -0,0 +1,51 @@
+import fcntl
+import os
+from pathlib import Path
+
+LOCK_NAME = ".budget.lock"
+
+
+def scan_files(root, patterns) -> list:
+    """(mtime, path, size) of the files under `root` matching any of `patterns`, least recently used first."""
+    files = []
+    for pattern in patterns:
+        for path in Path(root).glob(pattern):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # removed by another worker mid-scan
+            files.append((stat.st_mtime, str(path), stat.st_size))
+    files.sort()
+    return files
+
+
+def enforce_disk_budget(root, patterns, max_bytes: int, keep=()) -> tuple:
+    """
+    Shrinks the matching files under `root` to `max_bytes`, oldest mtime
+    first (readers refresh mtime on use, so this is LRU). Sizes and order come
+    from the directory itself, so every pre-fork worker sharing it enforces
+    one budget; an flock on `root/.budget.lock` keeps two workers from evicting
+    at once. Paths in `keep` are never removed.
+
+    Returns (files left, bytes left, removed paths).
+    """
+    keep = {str(path) for path in keep}
+    with open(Path(root) / LOCK_NAME, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        files = scan_files(root, patterns)
+        total = sum(size for _, _, size in files)
+        removed = []
+        for _, path, size in files:
+            if total <= max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+            removed.append(path)
+    return len(files) - len(removed), total, removed
@@ -0,0 +1,68 @@
+from functools import lru_cache
+
+import numpy as np
+
+from configs.serving_configs import AUDIO_BATCH_MAX_WAIT_MS, AUDIO_BATCH_MAX_CLIPS
+from services.clap_wrapper import CLAPWrapper
+from services.micro_batcher import MicroBatchScheduler
+from services.ttmrpp_wrapper import TTMRPPWrapper
+
+
+class AudioEmbeddingScheduler:
+    """
+    Clip embedding shared by every in-flight request. Callers decode and
+    resample their clips in their own thread, then hand the prepared tensors
+    to one scheduler per model; each batch of clips (from any number of
+    requests) runs as a single CLAP or TTMR++ forward on the scheduler thread.
+    """
+
+    def __init__(self, max_batch_clips: int = AUDIO_BATCH_MAX_CLIPS, max_wait_ms: float = AUDIO_BATCH_MAX_WAIT_MS):
+        self.clap = CLAPWrapper()
+        self.ttmr = TTMRPPWrapper()
+        self.schedulers = {
+            "clap": MicroBatchScheduler("clap-audio", self._embed_clap, max_batch_clips, max_wait_ms),
+            "ttmr": MicroBatchScheduler("ttmr-audio", self._embed_ttmr, max_batch_clips, max_wait_ms),
+        }
+
+    def _embed_clap(self, clips: list) -> list:
+        return self.clap.embed_prepared(clips)
+
+    def _embed_ttmr(self, chunks: list) -> list:
+        return [z.numpy() for z in self.ttmr.embed_chunks(chunks)]
+
+    def embed(self, sources: list) -> dict:
+        """
+        {"clap": CLAP embeddings (lists of floats), "ttmr": TTMR++ float32 arrays}
+        in source order. Both models' clips are submitted before waiting on
+        either, and the reservations let each scheduler hold its batch only
+        while this caller is still decoding. If the TTMR++ side fails (full
+        queue, unreadable clip) the queued CLAP clips are cancelled.
+        """
+        clap, ttmr = self.schedulers["clap"], self.schedulers["ttmr"]
+        clap.reserve()
+        ttmr.reserve()
+        clap_futures = ttmr_futures = None
+        try:
+            clap_futures = clap.submit_many([self.clap.prepare_clip(source) for source in sources], reserved=True)
+            ttmr_futures = ttmr.submit_many([self.ttmr.prepare_clip(source) for source in sources], reserved=True)
+        except Exception:
+            for future in clap_futures or []:
+                future.cancel()
+            raise
+        finally:
+            if clap_futures is None:
+                clap.release()
+            if ttmr_futures is None:
+                ttmr.release()
+        return {
+            "clap": [future.result() for future in clap_futures],
+            "ttmr": [np.asarray(future.result(), dtype=np.float32) for future in ttmr_futures],
+        }
+
+    def stats(self) -> dict:
+        return {name: scheduler.stats() for name, scheduler in self.schedulers.items()}
+
+
+@lru_cache(maxsize=1)
+def get_audio_embedding_scheduler() -> AudioEmbeddingScheduler:
+    return AudioEmbeddingScheduler()
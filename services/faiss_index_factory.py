@@ -0,0 +1,70 @@
+import faiss
+import numpy as np
+from typing import Optional
+
+DEFAULT_INDEX_SPEC = "Flat"
+
+
+def is_flat_spec(spec: Optional[str]) -> bool:
+    return not spec or spec.strip() == DEFAULT_INDEX_SPEC
+
+
+def create_index(dim: int, spec: str = DEFAULT_INDEX_SPEC, metric: int = faiss.METRIC_L2) -> faiss.Index:
+    """
+    Empty index for incremental adds. Specs that need training (IVF, PQ) can't
+    take vectors before `train`, so those fall back to flat here and are meant
+    to be produced with `build_index` / `convert_index` once the data exists.
+    """
+    if is_flat_spec(spec):
+        return faiss.IndexFlatL2(dim) if metric == faiss.METRIC_L2 else faiss.IndexFlatIP(dim)
+
+    index = faiss.index_factory(dim, spec, metric)
+    if not index.is_trained:
+        print(f"[faiss] Spec '{spec}' needs training; starting flat, convert once the data is in")
+        return create_index(dim, DEFAULT_INDEX_SPEC, metric)
+    return index
+
+
+def build_index(vectors: np.ndarray, spec: str = DEFAULT_INDEX_SPEC, metric: int = faiss.METRIC_L2) -> faiss.Index:
+    """Builds (trains if needed, then fills) an index of the given factory spec."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    dim = vectors.shape[1]
+    if is_flat_spec(spec):
+        index = create_index(dim, DEFAULT_INDEX_SPEC, metric)
+    else:
+        index = faiss.index_factory(dim, spec, metric)
+    if not index.is_trained:
+        print(f"[faiss] Training '{spec}' on {len(vectors)} vectors...")
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """Returns every stored vector (exact for flat/HNSW, decoded for PQ)."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.make_direct_map()
+    except RuntimeError:
+        pass  # not an IVF index
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def convert_index(index: faiss.Index, spec: str, metric: int = faiss.METRIC_L2) -> faiss.Index:
+    """Rebuilds an existing index (usually the flat build output) as `spec`, keeping row order."""
+    return build_index(reconstruct_all(index), spec, metric)
+
+
+def apply_search_params(index: faiss.Index, params: Optional[str]):
+    """Applies "nprobe=16,efSearch=64"-style search parameters to a loaded index."""
+    if params:
+        faiss.ParameterSpace().set_index_parameters(index, params)
+        print(f"[faiss] Search params set: {params}")
+
+
+def index_description(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexFlat):
+        return "Flat"
+    return type(index).__name__
@@ -0,0 +1,126 @@
+import ast
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from configs.index_configs import TRACKS_PATH, GENRE_MAP_PATH, FMA_METADATA_CACHE
+
+# Text columns copied as str(value), exactly like the per-row builder did (missing values become "nan")
+_TEXT_COLUMNS = {
+    "title": ("track", "title"),
+    "artist": ("artist", "name"),
+    "album": ("album", "title"),
+    "artist_website": ("artist", "website"),
+    "album_engineer": ("album", "engineer"),
+    "license": ("track", "license"),
+    "location": ("artist", "location"),
+}
+# HTML columns and the length they are truncated to once cleaned
+_HTML_COLUMNS = {
+    "artist_bio": (("artist", "bio"), 400),
+    "artist_projects": (("artist", "related_projects"), 300),
+    "album_description": (("album", "information"), 400),
+}
+ENTRY_FIELDS = [
+    "id", "title", "artist", "album", "genre", "genre_names", "duration", "tags",
+    "artist_bio", "artist_projects", "artist_website", "album_description",
+    "album_engineer", "license", "location",
+]
+
+
+def clean_html(text, max_len=500):
+    """Strip HTML and truncate long strings."""
+    if not text or not isinstance(text, str):
+        return ""
+    if "<" not in text and "&" not in text:
+        # Plain text: BeautifulSoup would only strip it
+        return text.strip()[:max_len]
+    from bs4 import BeautifulSoup
+    clean = BeautifulSoup(text, "html.parser").get_text(separator=" ", strip=True)
+    return clean[:max_len]
+
+
+def parse_list(value) -> list:
+    """Parses list-like CSV fields ("[1, 2]", "['rock']") without eval."""
+    if not isinstance(value, str):
+        return []
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return list(parsed) if isinstance(parsed, (list, tuple)) else []
+
+
+def _source_signature(*paths) -> dict:
+    return {str(p): [os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths}
+
+
+def _clean_column(series: pd.Series, max_len: int) -> pd.Series:
+    # Repeated bios/descriptions (one per track of an artist/album) are cleaned once
+    cleaned = {value: clean_html(value, max_len) for value in series.dropna().unique()}
+    return series.map(cleaned).fillna("")
+
+
+def parse_fma_tracks(tracks_csv=TRACKS_PATH, genres_csv=GENRE_MAP_PATH) -> pd.DataFrame:
+    """Parses FMA's multi-header tracks.csv into one typed row per track (the CLAP metadata fields)."""
+    raw = pd.read_csv(tracks_csv, index_col=0, header=[0, 1], low_memory=False)
+    genres = pd.read_csv(genres_csv)
+    genre_map = dict(zip(genres["genre_id"], genres["title"]))
+
+    df = pd.DataFrame(index=raw.index.astype("int64"))
+    df["id"] = df.index
+    for name, column in _TEXT_COLUMNS.items():
+        df[name] = raw[column].astype(str).values
+    df["genre"] = raw[("track", "genre_top")].astype(str).str.lower().values
+    df["duration"] = pd.to_numeric(raw[("track", "duration")], errors="coerce").astype("float64").values
+    df["genre_names"] = [
+        [str(genre_map[gid]).lower() for gid in parse_list(value) if gid in genre_map and genre_map[gid]]
+        for value in raw[("track", "genres_all")].values
+    ]
+    df["tags"] = [[str(t).lower() for t in parse_list(value)] for value in raw[("track", "tags")].values]
+    for name, (column, max_len) in _HTML_COLUMNS.items():
+        df[name] = _clean_column(raw[column], max_len).values
+    return df[ENTRY_FIELDS]
+
+
+def load_fma_tracks(tracks_csv=TRACKS_PATH, genres_csv=GENRE_MAP_PATH, cache_path=FMA_METADATA_CACHE, refresh: bool = False) -> pd.DataFrame:
+    """
+    Parsed FMA track metadata, cached as Parquet next to a signature of the
+    source CSVs. Re-parses only when a CSV changed (or `refresh`).
+    """
+    cache_path = Path(cache_path)
+    signature_path = cache_path.with_suffix(".json")
+    signature = _source_signature(tracks_csv, genres_csv)
+
+    if not refresh and cache_path.exists() and signature_path.exists():
+        with open(signature_path, "r") as f:
+            if json.load(f) == signature:
+                print(f"📒 Using cached FMA metadata: {cache_path}")
+                return pd.read_parquet(cache_path)
+
+    print(f"🧾 Parsing {Path(tracks_csv).name} (cached after this run)...")
+    df = parse_fma_tracks(tracks_csv, genres_csv)
+
+    os.makedirs(cache_path.parent, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path, engine="pyarrow")
+    os.replace(tmp_path, cache_path)
+    with open(signature_path, "w") as f:
+        json.dump(signature, f)
+    print(f"📒 Cached {len(df)} tracks to {cache_path}")
+    return df
+
+
+def fma_entries(df: pd.DataFrame) -> dict:
+    """{track_id: CLAP metadata entry} with plain Python types, ready for JSON."""
+    entries = {}
+    for record in df.to_dict("records"):
+        duration = record["duration"]
+        record["id"] = int(record["id"])
+        record["duration"] = None if pd.isna(duration) else float(duration)
+        record["genre_names"] = [str(g) for g in record["genre_names"]]
+        record["tags"] = [str(t) for t in record["tags"]]
+        entries[record["id"]] = record
+    return entries
@@ -0,0 +1,209 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from utils.audio_buffer import AudioBuffer
+
+_DONE = object()
+
+
+def _dir_signature(audio_dir: Path) -> dict:
+    # mtimes of the audio dir and its immediate subdirs (FMA: 000/ ... 155/) change whenever a file is added or removed
+    dirs = [audio_dir] + sorted(p for p in audio_dir.iterdir() if p.is_dir())
+    return {str(d.relative_to(audio_dir)): d.stat().st_mtime_ns for d in dirs}
+
+
+def load_audio_manifest(audio_dir, manifest_path, pattern: str = "**/*.mp3", refresh: bool = False) -> list:
+    """
+    Recursive glob of `audio_dir`, cached as a JSON manifest. The cache is
+    reused while the directory signature is unchanged, so re-runs skip walking
+    hundreds of thousands of files.
+    """
+    audio_dir, manifest_path = Path(audio_dir), Path(manifest_path)
+    signature = _dir_signature(audio_dir)
+
+    if not refresh and manifest_path.exists():
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("pattern") == pattern and manifest.get("signature") == signature:
+                print(f"📒 Using cached manifest ({len(manifest['paths'])} files): {manifest_path}")
+                return [str(audio_dir / p) for p in manifest["paths"]]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable manifest {manifest_path}: {e}")
+
+    print(f"📁 Scanning {audio_dir} ...")
+    paths = sorted(glob(str(audio_dir / pattern), recursive=True))
+    manifest = {
+        "pattern": pattern,
+        "signature": signature,
+        "paths": [os.path.relpath(p, audio_dir) for p in paths],
+    }
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    print(f"📒 Manifest written ({len(paths)} files): {manifest_path}")
+    return paths
+
+
+def decode_audio(path: str, sr: int) -> np.ndarray:
+    """Decoder process entry point: full track, mono float32 at `sr`."""
+    import librosa
+
+    y, _ = librosa.load(path, sr=sr, mono=True)
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+class IndexingPipeline:
+    """
+    Producer/consumer pipeline for the offline index builders.
+
+    A pool of decoder processes decodes and resamples tracks into a bounded
+    queue while the main process embeds them in batches, so neither side sits
+    idle. `on_batch(keys, payloads, vectors)` receives every embedded batch and
+    `on_checkpoint()` runs every `checkpoint_every` tracks and once at the end.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list], list],
+        decode_sr: int,
+        num_decoders: Optional[int] = None,
+        batch_size: int = 16,
+        queue_size: int = 64,
+        checkpoint_every: int = 300,
+        on_checkpoint: Optional[Callable[[], None]] = None,
+        report_every_sec: float = 30.0,
+    ):
+        self.embed_batch = embed_batch
+        self.decode_sr = decode_sr
+        self.num_decoders = num_decoders or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(self.batch_size, queue_size)
+        self.checkpoint_every = checkpoint_every
+        self.on_checkpoint = on_checkpoint
+        self.report_every_sec = report_every_sec
+
+        self.embedded = 0
+        self.failed = 0
+        self.decode_failed = 0
+
+    def run(self, items: Iterable[tuple], on_batch: Callable[[list, list, list], None]) -> dict:
+        """`items` yields (key, path, payload); returns throughput stats."""
+        results = queue.Queue()
+        # Bounds decoded-but-not-embedded tracks (plus in-flight decodes) so memory stays flat
+        slots = threading.BoundedSemaphore(self.queue_size)
+        stop = threading.Event()
+
+        def produce():
+            # spawn: decoders must not inherit the parent's torch/OpenMP state or the producer thread
+            ctx = multiprocessing.get_context("spawn")
+            try:
+                with ProcessPoolExecutor(max_workers=self.num_decoders, mp_context=ctx) as pool:
+                    for key, path, payload in items:
+                        slots.acquire()
+                        if stop.is_set():
+                            break
+                        future = pool.submit(decode_audio, path, self.decode_sr)
+                        future.add_done_callback(lambda f, key=key, payload=payload: results.put((key, payload, f)))
+            finally:
+                results.put(_DONE)
+
+        producer = threading.Thread(target=produce, name="index-decoders", daemon=True)
+        start = perf_counter()
+        self._last_report = start
+        self._since_checkpoint = 0
+        producer.start()
+
+        batch = []
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                slots.release()
+                key, payload, future = item
+                try:
+                    waveform = future.result()
+                    if waveform.size == 0:
+                        raise ValueError("empty audio")
+                except Exception as e:
+                    print(f"[DECODE ERROR] {key}: {e}")
+                    self.decode_failed += 1
+                    continue
+
+                batch.append((key, payload, AudioBuffer.from_array(waveform, self.decode_sr)))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, on_batch, start)
+                    batch = []
+
+            if batch:
+                self._flush(batch, on_batch, start)
+        finally:
+            stop.set()
+            # Unblock the producer if it is waiting for a slot
+            try:
+                slots.release()
+            except ValueError:
+                pass
+            if self.on_checkpoint is not None:
+                self.on_checkpoint()
+
+        elapsed = perf_counter() - start
+        stats = {
+            "embedded": self.embedded,
+            "failed": self.failed,
+            "decode_failed": self.decode_failed,
+            "elapsed_sec": elapsed,
+            "tracks_per_sec": self.embedded / elapsed if elapsed > 0 else 0.0,
+        }
+        print(f"🏁 {stats['embedded']} tracks in {elapsed:.1f}s ({stats['tracks_per_sec']:.2f} tracks/sec), "
+              f"{self.failed} embed failures, {self.decode_failed} decode failures")
+        return stats
+
+    def _flush(self, batch: list, on_batch, start: float):
+        keys = [key for key, _, _ in batch]
+        payloads = [payload for _, payload, _ in batch]
+        buffers = [buffer for _, _, buffer in batch]
+
+        try:
+            vectors = self.embed_batch(buffers)
+        except Exception as e:
+            # Isolate the bad track(s) instead of dropping the whole batch
+            print(f"[EMBED ERROR] batch of {len(batch)} failed ({e}); retrying one by one")
+            kept_keys, kept_payloads, vectors = [], [], []
+            for key, payload, buffer in batch:
+                try:
+                    vectors.extend(self.embed_batch([buffer]))
+                    kept_keys.append(key)
+                    kept_payloads.append(payload)
+                except Exception as item_error:
+                    print(f"[EMBED ERROR] {key}: {item_error}")
+                    self.failed += 1
+            keys, payloads = kept_keys, kept_payloads
+
+        if keys:
+            on_batch(keys, payloads, vectors)
+            self.embedded += len(keys)
+            self._since_checkpoint += len(keys)
+
+        if self.on_checkpoint is not None and self._since_checkpoint >= self.checkpoint_every:
+            self.on_checkpoint()
+            self._since_checkpoint = 0
+
+        now = perf_counter()
+        if now - self._last_report >= self.report_every_sec:
+            rate = self.embedded / (now - start)
+            print(f"⚡ {self.embedded} tracks embedded, {rate:.2f} tracks/sec")
+            self._last_report = now
@@ -0,0 +1,112 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from configs.serving_configs import INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_RETRY_AFTER_SEC
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference queue is at capacity; carries a Retry-After hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    Dedicated thread pool for CPU-bound analysis with a bounded wait queue.
+
+    Jobs run off the event loop (torch, librosa and FAISS release the GIL), so
+    /semantic/health and other routes keep answering while tracks are analyzed.
+    Once `max_queue` jobs are already waiting for a worker, `run` fails fast
+    with InferenceQueueFull instead of piling more work up.
+    """
+
+    def __init__(self, max_workers: int = INFERENCE_WORKERS, max_queue: int = INFERENCE_QUEUE_SIZE):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_sec = 0.0
+        self._max_wait_sec = 0.0
+        self._last_wait_sec = 0.0
+        self._avg_run_sec = None
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise InferenceQueueFull(self._retry_after())
+            self._queued += 1
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            wait_sec = started_at - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait_sec += wait_sec
+                self._max_wait_sec = max(self._max_wait_sec, wait_sec)
+                self._last_wait_sec = wait_sec
+
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                run_sec = time.perf_counter() - started_at
+                with self._lock:
+                    self._running -= 1
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                    # Exponential moving average feeds the Retry-After estimate
+                    self._avg_run_sec = run_sec if self._avg_run_sec is None else 0.8 * self._avg_run_sec + 0.2 * run_sec
+
+        future = self._executor.submit(job)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future):
+        # A job cancelled before it started never ran `job`, so release its queue slot here
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _retry_after(self) -> int:
+        if self._avg_run_sec is None:
+            return INFERENCE_RETRY_AFTER_SEC
+        backlog = self._queued + self._running
+        return max(1, math.ceil(self._avg_run_sec * backlog / self.max_workers))
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._failed + self._running
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_sec": round(self._total_wait_sec / started, 4) if started else 0.0,
+                "max_wait_sec": round(self._max_wait_sec, 4),
+                "last_wait_sec": round(self._last_wait_sec, 4),
+                "avg_run_sec": round(self._avg_run_sec, 4) if self._avg_run_sec is not None else None,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
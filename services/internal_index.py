@@ -0,0 +1,343 @@
+import fcntl
+import json
+import os
+import threading
+import traceback
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+
+from configs.index_configs import (
+    INTERNAL_INDEX, INTERNAL_META, INTERNAL_WAL_PATH, INTERNAL_JOURNAL_DIR,
+    INDEX_FACTORY_SPECS, INDEX_SEARCH_PARAMS,
+)
+from configs.serving_configs import (
+    INTERNAL_FLUSH_INTERVAL_SEC, INTERNAL_FLUSH_BATCH, INTERNAL_WAL_FSYNC, INTERNAL_COMPACT_EVERY,
+    INTERNAL_TRAIN_MIN_VECTORS,
+)
+from services.build_journal import BuildJournal
+from services.faiss_index_factory import (
+    build_index, create_index, apply_search_params, reconstruct_all, is_flat_spec, DEFAULT_INDEX_SPEC,
+)
+
+CLAP_DIM = 512
+INGEST_KEY = "ingest_id"
+
+
+class InternalIndexIngestor:
+    """
+    Online ingestion into the internal CLAP matching index.
+
+    `add` appends one JSON line to a write-ahead log (fsynced) and returns; a
+    background thread folds the log into a new `BuildJournal` segment every
+    few seconds and then truncates it. Committed segments are appended in
+    place to one index and metadata list (cost per flush depends only on the
+    batch); `snapshot` hands out {"index", "metadata", "lock"} and searches
+    hold the lock so they never run during an add. The index starts flat; in
+    the writer process only, a trained `index_spec` (IVF/PQ) replaces it once
+    `train_min_vectors` are in. Other workers keep searching flat.
+
+    Several processes (pre-fork workers) can share the same log: appends are
+    serialized with flock, and only the process holding the journal's writer
+    lock commits segments. Every process picks up new segments from the
+    manifest. A crash before a commit is recovered by the next flush, which
+    replays the log; records already committed are skipped by `ingest_id`.
+    """
+
+    def __init__(
+        self,
+        wal_path=INTERNAL_WAL_PATH,
+        journal_dir=INTERNAL_JOURNAL_DIR,
+        index_path=INTERNAL_INDEX,
+        metadata_path=INTERNAL_META,
+        index_spec: str = INDEX_FACTORY_SPECS["internal_clap"],
+        flush_interval_sec: float = INTERNAL_FLUSH_INTERVAL_SEC,
+        flush_batch: int = INTERNAL_FLUSH_BATCH,
+        fsync: bool = INTERNAL_WAL_FSYNC,
+        compact_every: int = INTERNAL_COMPACT_EVERY,
+        train_min_vectors: int = INTERNAL_TRAIN_MIN_VECTORS,
+    ):
+        self.wal_path = Path(wal_path)
+        self.index_path = Path(index_path)
+        self.metadata_path = Path(metadata_path)
+        self.index_spec = index_spec
+        self.flush_interval_sec = flush_interval_sec
+        self.flush_batch = flush_batch
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self.train_min_vectors = train_min_vectors
+
+        self.journal = BuildJournal(journal_dir, key_field=INGEST_KEY)
+        os.makedirs(self.wal_path.parent, exist_ok=True)
+        self._wal = open(self.wal_path, "ab")
+        self._wal_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        # Held by searches and by in-place adds; never around a training run
+        self._index_lock = threading.Lock()
+        self._writer_lock_file = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+        self._snapshot = {"index": create_index(CLAP_DIM), "metadata": [], "lock": self._index_lock}
+        self._training_failed = False
+        self._loaded_segments = 0
+        self._compacted_segments = 0
+        self._committed_ids = set()
+        self._known_hashes = set()
+        self._appended_since_flush = 0
+        self.stats = {"appended": 0, "flushed": 0, "already_committed": 0, "duplicates": 0, "flush_failures": 0}
+
+    # ---------- Readers ----------
+
+    @property
+    def snapshot(self) -> dict:
+        """The current {"index", "metadata", "lock"}; search with the lock held and skip ids past the metadata."""
+        return self._snapshot
+
+    def on_snapshot(self, listener: Callable[[dict], None]):
+        """Calls `listener(snapshot)` now and whenever the index object is replaced (e.g. to update app.state.faiss_variants)."""
+        self._listeners.append(listener)
+        listener(self._snapshot)
+
+    def search(self, embedding, k: int = 5) -> list:
+        snapshot = self._snapshot
+        index, metadata = snapshot["index"], snapshot["metadata"]
+        query = np.asarray(embedding, dtype="float32").reshape(1, -1)
+        with snapshot["lock"]:
+            if index.ntotal == 0:
+                return []
+            distances, ids = index.search(query, min(k, index.ntotal))
+            total = len(metadata)
+        return [
+            {"distance": float(d), "metadata": metadata[i]}
+            for d, i in zip(distances[0], ids[0]) if 0 <= i < total
+        ]
+
+    # ---------- Writers ----------
+
+    def add(self, embedding, entry: dict, content_hash: Optional[str] = None) -> Optional[str]:
+        """
+        Durably logs one track for the index and returns its ingest id, or
+        None when this upload (by content hash) is already indexed or queued.
+        """
+        vector = np.asarray(embedding, dtype="float32").reshape(-1)
+        if vector.shape[0] != CLAP_DIM:
+            raise ValueError(f"Expected a {CLAP_DIM}-d CLAP embedding, got {vector.shape[0]}")
+
+        ingest_id = uuid.uuid4().hex
+        row = dict(entry, **{INGEST_KEY: ingest_id, "content_hash": content_hash})
+        line = json.dumps({"vector": vector.tolist(), "row": row}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+        with self._wal_lock:
+            if content_hash and content_hash in self._known_hashes:
+                self.stats["duplicates"] += 1
+                return None
+            fcntl.flock(self._wal, fcntl.LOCK_EX)
+            try:
+                self._wal.write(line.encode("utf-8"))
+                self._wal.flush()
+                if self.fsync:
+                    os.fsync(self._wal.fileno())
+            finally:
+                fcntl.flock(self._wal, fcntl.LOCK_UN)
+            if content_hash:
+                self._known_hashes.add(content_hash)
+            self.stats["appended"] += 1
+            self._appended_since_flush += 1
+            if self._appended_since_flush >= self.flush_batch:
+                self._wake.set()
+        return ingest_id
+
+    def _read_wal(self) -> list:
+        records = []
+        self._wal.flush()
+        with open(self.wal_path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn last line of a crashed append: never acknowledged, safe to drop
+                    print(f"[INGEST] ⚠️ Skipping unreadable log line in {self.wal_path.name}")
+        return records
+
+    def flush(self) -> int:
+        """Commits every logged record not yet in the journal as one segment; writer process only."""
+        if not self._is_writer():
+            return 0
+        self.refresh()
+        with self._wal_lock:
+            fcntl.flock(self._wal, fcntl.LOCK_EX)
+            try:
+                records = self._read_wal()
+                pending = [r for r in records if r["row"].get(INGEST_KEY) not in self._committed_ids]
+                if pending:
+                    self.journal.append(
+                        np.array([r["vector"] for r in pending], dtype="float32"),
+                        [r["row"] for r in pending],
+                    )
+                # Left behind by a crash between a commit and the truncate below
+                self.stats["already_committed"] += len(records) - len(pending)
+                # Everything in the log is now in a committed segment
+                if os.path.getsize(self.wal_path):
+                    self._wal.truncate(0)
+                    self._wal.flush()
+                    os.fsync(self._wal.fileno())
+                self._appended_since_flush = 0
+            finally:
+                fcntl.flock(self._wal, fcntl.LOCK_UN)
+
+        if pending:
+            self.stats["flushed"] += len(pending)
+            print(f"[INGEST] Committed {len(pending)} tracks to the internal index journal")
+            self.refresh()
+        if len(self.journal.segments) - self._compacted_segments >= self.compact_every:
+            self.compact()
+        return len(pending)
+
+    def refresh(self) -> bool:
+        """Appends segments committed since the last call to the live index and metadata."""
+        with self._snapshot_lock:
+            total = self.journal.reload()
+            if total <= self._loaded_segments:
+                return False
+
+            new_vectors, new_rows = [], []
+            for vectors, rows in self.journal.iter_segments(self._loaded_segments):
+                if len(vectors) != len(rows):
+                    # Only an imported legacy build can be misaligned; keep the shared prefix
+                    print(f"[INGEST] ⚠️ Segment with {len(vectors)} vectors and {len(rows)} rows; using the first {min(len(vectors), len(rows))}")
+                    aligned = min(len(vectors), len(rows))
+                    vectors, rows = vectors[:aligned], rows[:aligned]
+                if len(vectors):
+                    new_vectors.append(vectors)
+                new_rows.extend(rows)
+
+            snapshot = self._snapshot
+            index, metadata = snapshot["index"], snapshot["metadata"]
+            trained = None
+            if new_vectors:
+                vectors = np.concatenate(new_vectors)
+                if self._wants_trained_index(index, index.ntotal + len(vectors)):
+                    trained = self._train_index(np.concatenate([reconstruct_all(index), vectors]))
+                with self._index_lock:
+                    if trained is None:
+                        index.add(vectors)
+                    metadata.extend(new_rows)
+            if trained is not None:
+                # Searches already holding the old snapshot keep the flat index; its ids stay valid
+                snapshot = {"index": trained, "metadata": metadata, "lock": self._index_lock}
+                self._snapshot = snapshot
+
+            for row in new_rows:
+                if row.get(INGEST_KEY):
+                    self._committed_ids.add(row[INGEST_KEY])
+                if row.get("content_hash"):
+                    self._known_hashes.add(row["content_hash"])
+            self._loaded_segments = total
+
+        if trained is not None:
+            for listener in self._listeners:
+                listener(snapshot)
+        return True
+
+    def _wants_trained_index(self, index, total: int) -> bool:
+        # One training run per deployment: readers in other workers stay exact (flat)
+        return (
+            self._writer_lock_file is not None
+            and not is_flat_spec(self.index_spec)
+            and not self._training_failed
+            and isinstance(index, faiss.IndexFlat)
+            and total >= self.train_min_vectors
+        )
+
+    def _train_index(self, vectors: np.ndarray):
+        """The `index_spec` index over `vectors`, or None (stay flat) if training fails."""
+        try:
+            index = build_index(vectors, self.index_spec)
+        except RuntimeError as e:
+            self._training_failed = True
+            print(f"[INGEST] ⚠️ Could not train '{self.index_spec}' on {len(vectors)} vectors, staying flat: {e}")
+            return None
+        apply_search_params(index, INDEX_SEARCH_PARAMS.get("internal_clap"))
+        print(f"[INGEST] Switched the internal index to '{self.index_spec}' at {len(vectors)} tracks")
+        return index
+
+    def compact(self):
+        """Rewrites INTERNAL_INDEX / INTERNAL_META from the journal; writer process only."""
+        if not self._is_writer() or not self.journal.segments:
+            return
+        # Too few vectors to train the configured spec: write a flat index until there are
+        spec = self.index_spec if self.journal.num_vectors >= self.train_min_vectors else DEFAULT_INDEX_SPEC
+        self.journal.compact(self.index_path, self.metadata_path, index_spec=spec)
+        self._compacted_segments = len(self.journal.segments)
+
+    def _is_writer(self) -> bool:
+        if self._writer_lock_file is not None:
+            return True
+        lock_file = open(self.journal.dir / "writer.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._writer_lock_file = lock_file
+        print(f"[INGEST] PID {os.getpid()} is the internal index writer")
+        return True
+
+    # ---------- Lifecycle ----------
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self._is_writer():
+            self.journal.import_existing(self.index_path, self.metadata_path)
+            self._compacted_segments = len(self.journal.segments)
+        self.refresh()
+        # Recover what a crashed process logged but never committed
+        self._run_flush()
+        print(f"[INGEST] Internal index ready with {self._snapshot['index'].ntotal} tracks")
+        self._thread = threading.Thread(target=self._run, name="internal-index-ingest", daemon=True)
+        self._thread.start()
+
+    def _run_flush(self):
+        try:
+            self.flush()
+            self.refresh()
+        except Exception as e:
+            traceback.print_exc()
+            self.stats["flush_failures"] += 1
+            print(f"[INGEST] ❌ Flush failed, records stay in the log: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_sec)
+            self._wake.clear()
+            self._run_flush()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self._run_flush()
+        if self._is_writer() and len(self.journal.segments) > self._compacted_segments:
+            self.compact()
+        self._wal.close()
+        if self._writer_lock_file is not None:
+            self._writer_lock_file.close()
+            self._writer_lock_file = None
+
+    def status(self) -> dict:
+        return {
+            "tracks": self._snapshot["index"].ntotal,
+            "segments": self._loaded_segments,
+            "writer": self._writer_lock_file is not None,
+            **self.stats,
+        }
@@ -1,11 +1,16 @@
 import os
 import json
-from together import Together
+import asyncio
+from together import Together, AsyncTogether
 from dotenv import load_dotenv
 import re
+from configs.llm_configs import LLM_MAX_CONCURRENCY, LLM_TIMEOUT_SEC
 
 load_dotenv()
 client = Together()
+async_client = AsyncTogether()
+
+LLM_FALLBACK_SUMMARY = "Unable to generate summary."
 
 def generate_tags_and_summary(metadata: dict, neighbors: list[dict]) -> tuple[list[str], str]:
     chroma = metadata.get("chroma_vector", [])
@@ -136,7 +141,7 @@ def generate_tags_and_summary(metadata: dict, neighbors: list[dict]) -> tuple[li
         
         return tags, summary
 
-def generate_tags_and_summary_hybrid(metadata: dict, hybrid_neighbors: list[dict], ttmr_artist_neighbors: list[dict]) -> tuple[list[str], str]:
+def build_hybrid_messages(metadata: dict, hybrid_neighbors: list[dict], ttmr_artist_neighbors: list[dict]) -> list[dict]:
     chroma = metadata.get("chroma_vector", [])
     stem_chroma = metadata.get("stem_chroma_vector", [])
     tempo = metadata.get("tempo_bpm")
@@ -239,17 +244,12 @@ def generate_tags_and_summary_hybrid(metadata: dict, hybrid_neighbors: list[dict
     2. "summary": 1-3 sentences describing the track or stem's vibe, style, and instrumentation.
     """
 
-    response = client.chat.completions.create(
-        model=os.getenv("TOGETHER_MODEL"),
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg}
-        ],
-        temperature=0.7,
-    )
-
-    content = response.choices[0].message.content
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg}
+    ]
 
+def parse_hybrid_llm_output(content: str) -> tuple[list[str], str]:
     try:
         cleaned = content.strip()
         if not cleaned.startswith('{'):
@@ -272,8 +272,59 @@ def generate_tags_and_summary_hybrid(metadata: dict, hybrid_neighbors: list[dict
             tags_str = tags_match.group(1)
             tags = [tag.strip(' "\'') for tag in tags_str.split(',')]
 
-        summary = "Unable to generate summary."
+        summary = LLM_FALLBACK_SUMMARY
         if summary_match:
             summary = summary_match.group(1)
 
         return tags, summary
+
+def generate_tags_and_summary_hybrid(metadata: dict, hybrid_neighbors: list[dict], ttmr_artist_neighbors: list[dict]) -> tuple[list[str], str]:
+    response = client.chat.completions.create(
+        model=os.getenv("TOGETHER_MODEL"),
+        messages=build_hybrid_messages(metadata, hybrid_neighbors, ttmr_artist_neighbors),
+        temperature=0.7,
+    )
+
+    return parse_hybrid_llm_output(response.choices[0].message.content)
+
+async def generate_tags_and_summary_hybrid_async(metadata: dict, hybrid_neighbors: list[dict], ttmr_artist_neighbors: list[dict]) -> tuple[list[str], str]:
+    response = await async_client.chat.completions.create(
+        model=os.getenv("TOGETHER_MODEL"),
+        messages=build_hybrid_messages(metadata, hybrid_neighbors, ttmr_artist_neighbors),
+        temperature=0.7,
+    )
+
+    return parse_hybrid_llm_output(response.choices[0].message.content)
+
+async def generate_tags_and_summaries_concurrently(
+    jobs: dict,
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    timeout_sec: float = LLM_TIMEOUT_SEC,
+) -> tuple[dict, list]:
+    """
+    Sends every hybrid tagging prompt at once, at most `max_concurrency` in flight.
+
+    `jobs` maps a key (e.g. "track", "vocals") to the
+    (metadata, hybrid_neighbors, ttmr_artist_neighbors) arguments of
+    generate_tags_and_summary_hybrid. Returns ({key: (tags, summary)}, failed_keys);
+    a call that times out or errors falls back to empty tags and the default summary
+    so one slow stem never sinks the whole response.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(key, args):
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(generate_tags_and_summary_hybrid_async(*args), timeout=timeout_sec)
+                return key, result, False
+            except asyncio.TimeoutError:
+                print(f"⚠️ LLM tagging timed out after {timeout_sec}s for: {key}")
+            except Exception as e:
+                print(f"⚠️ LLM tagging failed for {key}: {e}")
+            return key, ([], LLM_FALLBACK_SUMMARY), True
+
+    outcomes = await asyncio.gather(*(run(key, args) for key, args in jobs.items()))
+
+    results = {key: result for key, result, _ in outcomes}
+    failed = [key for key, _, did_fail in outcomes if did_fail]
+    return results, failed
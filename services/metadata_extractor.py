@@ -1,15 +1,15 @@
-import librosa
+from typing import Optional, Union
+from utils.audio_buffer import AudioBuffer
+from services.spectral_features import METADATA_SR, analyze_clip
 
-def extract_metadata(file_path: str):
-    y, sr = librosa.load(file_path, sr=16000)
-    duration = float(librosa.get_duration(y=y, sr=sr))
-    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-    chroma = librosa.feature.chroma_stft(y=y, sr=sr).mean(axis=1)
+def extract_metadata(source: Union[str, AudioBuffer], features: Optional[dict] = None):
+    # Pass `features` from analyze_clips(..., sr=METADATA_SR) to reuse an STFT that was already computed
+    features = features or analyze_clip(source, sr=METADATA_SR)
 
     metadata = {
-        "duration_sec": round(duration, 2),
-        "tempo_bpm": round(float(tempo), 2),
-        "chroma_vector": [round(float(c), 4) for c in chroma]
+        "duration_sec": round(features["duration_sec"], 2),
+        "tempo_bpm": round(features["tempo_bpm"], 2),
+        "chroma_vector": [round(float(c), 4) for c in features["chroma"]]
     }
 
-    return metadata
\ No newline at end of file
+    return metadata
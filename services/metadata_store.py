@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Pages of the store are memory-mapped up to this size, shared by every reader
+METADATA_STORE_MMAP_BYTES = 256 * 1024 * 1024
+
+
+def metadata_store_path(json_path) -> Path:
+    """The SQLite store that sits next to a metadata JSON file."""
+    return Path(json_path).with_suffix(".sqlite")
+
+
+def _source_signature(source_path) -> dict:
+    stat = os.stat(source_path)
+    return {"source_size": str(stat.st_size), "source_mtime_ns": str(stat.st_mtime_ns)}
+
+
+def write_metadata_store(entries: Iterable[dict], db_path, key_field: Optional[str] = None, source_path=None) -> int:
+    """
+    Writes metadata rows keyed by FAISS row id (their position in `entries`)
+    to a fresh SQLite file, atomically replacing any existing store.
+    `key_field` (e.g. "track_id") is also stored in an indexed column, and the
+    size and mtime of `source_path` are recorded so stale stores can be detected.
+    """
+    db_path = Path(db_path)
+    os.makedirs(db_path.parent, exist_ok=True)
+    # Per process: pre-fork workers may rebuild the same store at once
+    tmp_path = db_path.with_suffix(f".sqlite.tmp{os.getpid()}")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE metadata (row_id INTEGER PRIMARY KEY, key TEXT, data TEXT NOT NULL)")
+        rows = (
+            (row_id, str(entry.get(key_field)) if key_field and entry.get(key_field) is not None else None,
+             json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+            for row_id, entry in enumerate(entries)
+        )
+        conn.executemany("INSERT INTO metadata (row_id, key, data) VALUES (?, ?, ?)", rows)
+        conn.execute("CREATE INDEX metadata_key ON metadata (key)")
+        conn.execute("CREATE TABLE store_info (name TEXT PRIMARY KEY, value TEXT)")
+        if source_path is not None and os.path.exists(source_path):
+            conn.executemany("INSERT INTO store_info VALUES (?, ?)", _source_signature(source_path).items())
+        count = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return count
+
+
+class MetadataStore:
+    """
+    Read-only metadata keyed by FAISS row id, backed by a memory-mapped SQLite
+    file. Rows stay on disk (shared page cache across workers) and are only
+    parsed into dicts when looked up, so per-process memory no longer grows with
+    the catalog. Behaves like the old list for `len()`, `store[i]` and iteration.
+    """
+
+    def __init__(self, db_path, mmap_bytes: int = METADATA_STORE_MMAP_BYTES):
+        self.db_path = str(db_path)
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._len = self._conn().execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread, and must not cross a fork (pre-fork workers)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def info(self, name: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM store_info WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, row_id: int) -> dict:
+        row_id = int(row_id)
+        if row_id < 0:
+            row_id += self._len
+        row = self._conn().execute("SELECT data FROM metadata WHERE row_id = ?", (row_id,)).fetchone()
+        if row is None:
+            raise IndexError(f"metadata row {row_id} out of range")
+        return json.loads(row[0])
+
+    def __iter__(self):
+        for (data,) in self._conn().execute("SELECT data FROM metadata ORDER BY row_id"):
+            yield json.loads(data)
+
+    def get_many(self, row_ids: Iterable[int]) -> list:
+        """Materializes several rows with one query; missing ids come back as None."""
+        row_ids = [int(i) for i in row_ids]
+        wanted = sorted({i for i in row_ids if 0 <= i < self._len})
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(wanted), 900):
+            chunk = wanted[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            for row_id, data in self._conn().execute(
+                f"SELECT row_id, data FROM metadata WHERE row_id IN ({placeholders})", chunk
+            ):
+                found[row_id] = json.loads(data)
+        return [found.get(i) for i in row_ids]
+
+    def find_by_key(self, key) -> list:
+        """Row ids whose key column (e.g. track_id) matches."""
+        return [row_id for (row_id,) in self._conn().execute(
+            "SELECT row_id FROM metadata WHERE key = ? ORDER BY row_id", (str(key),)
+        )]
+
+
+def load_metadata(json_path, key_field: Optional[str] = None):
+    """
+    Returns a MetadataStore for the `.sqlite` next to `json_path`, building it
+    from the JSON first when it is missing or older than the JSON (size and
+    mtime differ from what the store recorded). Falls back to the JSON list if
+    the store can't be built or opened.
+    """
+    json_path = Path(json_path)
+    db_path = metadata_store_path(json_path)
+    store = None
+    if db_path.exists():
+        try:
+            store = MetadataStore(db_path)
+            if json_path.exists():
+                signature = _source_signature(json_path)
+                if any(store.info(name) != value for name, value in signature.items()):
+                    print(f"[META] {db_path.name} is stale for {json_path.name}; rebuilding.")
+                    store = None
+        except sqlite3.Error as e:
+            print(f"[WARN] Failed to open metadata store {db_path}: {e}")
+            store = None
+
+    entries = None
+    if store is None and json_path.exists():
+        try:
+            with open(json_path, "r") as f:
+                content = f.read().strip()
+                entries = json.loads(content) if content else []
+            count = write_metadata_store(entries, db_path, key_field=key_field, source_path=json_path)
+            print(f"[META] Built {db_path.name} from {json_path.name} ({count} rows)")
+            store = MetadataStore(db_path)
+        except Exception as e:
+            print(f"[WARN] Failed to build metadata store {db_path}: {e}")
+
+    if store is not None:
+        print(f"[META] Using SQLite metadata store {db_path} ({len(store)} rows)")
+        return store
+    if entries is not None:
+        return entries
+    print(f"[WARN] Failed to load metadata from {json_path}")
+    return []
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Callable
+
+
+class BatchQueueFull(RuntimeError):
+    """Raised when a scheduler already has `max_queue` items waiting."""
+
+
+class MicroBatchScheduler:
+    """
+    Collects items submitted from any thread (or the event loop) and runs them
+    through `batch_fn(items) -> results` on one worker thread. Whatever is
+    queued when the worker becomes free goes out as the next batch (up to
+    `max_batch_size`), so a lone request is dispatched at once and items that
+    arrive during a forward pass share the next one. Callers that `reserve`
+    before preparing their inputs make the worker hold a batch for them, for
+    at most `max_wait_ms`. `stats` reports the batch-size distribution and how
+    long items waited before their batch started.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[list], list],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_queue: int = 1024,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_sec = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._pending = deque()
+        # Callers that announced items they are still preparing
+        self._expected = 0
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.batch_sizes = Counter()
+        # Queueing delay of the most recent items, in seconds
+        self._delays = deque(maxlen=2048)
+        self._stats_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batch-{self.name}", daemon=True)
+                self._thread.start()
+
+    def reserve(self):
+        """Announces a `submit_many(..., reserved=True)` to come; pair with `release` if it never happens."""
+        with self._cond:
+            self._expected += 1
+
+    def release(self):
+        with self._cond:
+            self._expected = max(0, self._expected - 1)
+            self._cond.notify_all()
+
+    def submit_many(self, items: list, reserved: bool = False) -> list:
+        """
+        One future per item; items from one caller may land in different
+        batches. Cancelling a future before its batch starts drops the item.
+        """
+        self._ensure_started()
+        futures = [Future() for _ in items]
+        now = time.perf_counter()
+        with self._cond:
+            if reserved:
+                self._expected = max(0, self._expected - 1)
+            if len(self._pending) + len(items) > self.max_queue:
+                self._cond.notify_all()
+                raise BatchQueueFull(f"{self.name} batch queue is full ({len(self._pending)} waiting)")
+            self._pending.extend(zip(items, futures, [now] * len(items)))
+            self._cond.notify_all()
+        return futures
+
+    def submit(self, item) -> Future:
+        return self.submit_many([item])[0]
+
+    def run(self, item):
+        """Blocking submit for worker threads."""
+        return self.submit(item).result()
+
+    async def run_async(self, item):
+        """Awaitable submit for the event loop."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self) -> list:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Hold the batch only while an announced caller is still preparing its items
+            deadline = time.monotonic() + self.max_wait_sec
+            while len(self._pending) < self.max_batch_size and self._expected > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                item = self._pending.popleft()
+                # False once cancelled (its caller gave up); also stops later cancels
+                if item[1].set_running_or_notify_cancel():
+                    batch.append(item)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            started_at = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            delays = [started_at - enqueued_at for _, _, enqueued_at in batch]
+            with self._stats_lock:
+                self._delays.extend(delays)
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                traceback.print_exc()
+                self.failures += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(items)
+                self.batch_sizes[len(items)] += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            delays = sorted(self._delays)
+            histogram = {str(size): count for size, count in sorted(self.batch_sizes.items())}
+
+        def percentile_ms(q):
+            return round(delays[min(len(delays) - 1, int(q * len(delays)))] * 1000, 2) if delays else None
+
+        return {
+            "queued": len(self._pending),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_sec * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "batch_size_histogram": histogram,
+            # Over the last `window` items
+            "queue_delay_ms": {
+                "mean": round(sum(delays) / len(delays) * 1000, 2) if delays else None,
+                "p50": percentile_ms(0.5),
+                "p95": percentile_ms(0.95),
+                "max": round(delays[-1] * 1000, 2) if delays else None,
+                "window": len(delays),
+            },
+        }
@@ -0,0 +1,35 @@
+import copy
+
+import torch
+import torch.nn as nn
+
+
+def quantize_for_cpu(model: nn.Module, label: str = "model", inplace: bool = False) -> nn.Module:
+    """
+    Int8 dynamic quantization of every nn.Linear (weights int8, activations
+    quantized per batch). Convolutions stay fp32, so conv-heavy backbones gain
+    less than transformer ones. CPU only.
+    """
+    engines = torch.backends.quantized.supported_engines
+    if "fbgemm" in engines:
+        torch.backends.quantized.engine = "fbgemm"
+    elif "qnnpack" in engines:
+        torch.backends.quantized.engine = "qnnpack"
+
+    before_mb = tensor_bytes(model) / (1024 * 1024)
+    target = model if inplace else copy.deepcopy(model)
+    quantized = torch.ao.quantization.quantize_dynamic(target.cpu().eval(), {nn.Linear}, dtype=torch.qint8, inplace=True)
+    print(f"[QUANT] {label}: Linear layers -> int8 ({before_mb:.1f} MB -> {tensor_bytes(quantized) / (1024 * 1024):.1f} MB in memory)")
+    return quantized
+
+
+def tensor_bytes(model: nn.Module) -> int:
+    """In-memory bytes of parameters and buffers, counting packed int8 Linear weights (which parameters() skips)."""
+    total = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module.weight(), module.bias()
+            total += weight.numel() * weight.element_size()
+            if bias is not None:
+                total += bias.numel() * bias.element_size()
+    return total
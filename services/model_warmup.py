@@ -0,0 +1,108 @@
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+import numpy as np
+import torch
+
+from configs.serving_configs import WARMUP_MODELS, WARMUP_MODEL_NAMES
+
+
+def _warm_clap():
+    from services.clap_singleton import get_clap_model
+    from services.clap_wrapper import CLAP_SR
+
+    model, device = get_clap_model()
+    with torch.no_grad():
+        model.get_audio_embedding_from_data([torch.zeros(CLAP_SR, device=device)], use_tensor=True)
+
+
+def _warm_ttmr():
+    from services.ttmrpp_singleton import get_ttmr_model
+    from services.ttmrpp_wrapper import N_SAMPLES
+
+    model, device = get_ttmr_model()
+    with torch.no_grad():
+        model.audio_forward(torch.zeros(1, N_SAMPLES, device=device))
+
+
+def _warm_demucs():
+    from services.stem_separator import separate_stems
+    from utils.audio_buffer import AudioBuffer
+
+    # One second of silence through the real separation path (resident model, apply_model)
+    separate_stems(AudioBuffer.from_array(np.zeros((2, 44100), dtype=np.float32), 44100))
+
+
+WARMUP_STEPS = {
+    "clap": _warm_clap,
+    "ttmr": _warm_ttmr,
+    "demucs": _warm_demucs,
+}
+
+
+class ModelWarmup:
+    """
+    Loads each model and runs one dummy forward in a background thread, so the
+    first real request doesn't pay for checkpoint loading. Tracks per-model
+    readiness and timings for /semantic/ready.
+    """
+
+    def __init__(self, model_names=WARMUP_MODEL_NAMES, enabled: bool = WARMUP_MODELS):
+        self.enabled = enabled
+        self.model_names = [name for name in model_names if name in WARMUP_STEPS]
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {
+            name: {"ready": False, "state": "pending" if enabled else "lazy", "load_sec": None, "error": None}
+            for name in self.model_names
+        }
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name in self.model_names:
+            self._update(name, state="loading")
+            print(f"[WARMUP] Loading {name}...")
+            start = time.perf_counter()
+            try:
+                WARMUP_STEPS[name]()
+            except Exception as e:
+                traceback.print_exc()
+                self._update(name, state="failed", error=str(e), load_sec=round(time.perf_counter() - start, 2))
+                print(f"[WARMUP] ❌ {name} failed: {e}")
+                continue
+            load_sec = round(time.perf_counter() - start, 2)
+            self._update(name, state="ready", ready=True, load_sec=load_sec)
+            print(f"[WARMUP] ✅ {name} ready in {load_sec}s")
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    @property
+    def ready(self) -> bool:
+        # Lazy mode has nothing to wait for: models load on first use as before
+        if not self.enabled:
+            return True
+        with self._lock:
+            return all(status["ready"] for status in self._status.values())
+
+    def status(self) -> dict:
+        with self._lock:
+            models = {name: dict(status) for name, status in self._status.items()}
+        return {
+            "ready": self.ready,
+            "warmup": "enabled" if self.enabled else "disabled",
+            "models": models,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_model_warmup() -> ModelWarmup:
+    return ModelWarmup()
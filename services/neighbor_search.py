@@ -0,0 +1,70 @@
+import numpy as np
+from contextlib import nullcontext
+from typing import Iterable
+
+
+def lookup_rows(metadata, ids: np.ndarray) -> list:
+    """
+    Metadata rows for an (n, k) id matrix, one list per query. Uses a single
+    bulk fetch when the metadata is a MetadataStore; ids of -1 (unfilled) are skipped.
+    """
+    if hasattr(metadata, "get_many"):
+        rows = metadata.get_many(ids.reshape(-1))
+        rows = [rows[i:i + ids.shape[1]] for i in range(0, len(rows), ids.shape[1])]
+        return [[row for row in query_rows if row is not None] for query_rows in rows]
+    return [
+        [metadata[i] for i in row if 0 <= i < len(metadata)]
+        for row in ids
+    ]
+
+
+class NeighborSearchService:
+    """
+    Vectorized neighbor lookup over the preloaded FAISS variants.
+
+    Takes a matrix of query vectors and any number of variants, and runs one
+    `index.search` per variant for the whole matrix instead of one call per
+    vector. Results keep the query order.
+    """
+
+    def __init__(self, variants: dict):
+        self.variants = variants
+
+    @classmethod
+    def from_app(cls, app) -> "NeighborSearchService":
+        return cls(getattr(app.state, "faiss_variants", {}))
+
+    def search(self, queries, variants: Iterable[str], k: int = 3) -> dict:
+        """
+        Returns {variant: {"ids": (n, k) int64, "distances": (n, k) float32,
+        "metadata": [[row metadata, ...] per query]}}. Rows FAISS could not fill
+        (id -1, e.g. k > ntotal) are dropped from "metadata".
+        """
+        queries = np.asarray(queries, dtype="float32")
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        queries = np.ascontiguousarray(queries)
+
+        results = {}
+        for variant in variants:
+            entry = self.variants.get(variant)
+            if entry is None or entry.get("index") is None:
+                raise ValueError(f"No FAISS index loaded for variant '{variant}'.")
+            index, metadata = entry["index"], entry.get("metadata") or []
+
+            # Variants that grow in place (the internal ingest index) carry the lock their adds take
+            with entry.get("lock") or nullcontext():
+                distances, ids = index.search(queries, k)
+            results[variant] = {
+                "ids": ids,
+                "distances": distances,
+                "metadata": lookup_rows(metadata, ids),
+            }
+        return results
+
+    def search_metadata(self, queries, variants: Iterable[str], k: int = 3) -> dict:
+        """Shortcut returning only {variant: [[metadata, ...] per query]}."""
+        return {
+            variant: result["metadata"]
+            for variant, result in self.search(queries, variants, k).items()
+        }
@@ -0,0 +1,89 @@
+import gc
+import os
+import signal
+import socket
+import time
+import uvicorn
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, on_worker_start, **uvicorn_kwargs):
+    # Default signal handling again; uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if on_worker_start is not None:
+        on_worker_start()
+    config = uvicorn.Config(app, **uvicorn_kwargs)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve_prefork(app, host: str, port: int, workers: int, preload=None, on_worker_start=None, **uvicorn_kwargs):
+    """
+    Pre-fork server: the parent binds the socket and runs `preload` (model
+    weights, FAISS indexes, metadata stores) once, then forks `workers` uvicorn
+    processes that accept on the shared socket. Everything loaded before the
+    fork is shared copy-on-write instead of being loaded once per worker.
+    Workers that die are restarted; SIGTERM/SIGINT stop them all.
+    """
+    sock = _bind_socket(host, port)
+
+    if preload is not None:
+        preload()
+    # Move everything loaded so far out of the GC's reach so collections in
+    # the workers don't write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, on_worker_start, **uvicorn_kwargs)
+            finally:
+                os._exit(0)
+        children[pid] = slot
+        print(f"[PREFORK] Worker {slot} started (pid {pid})")
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        if not stopping:
+            print(f"[PREFORK] Worker {slot} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(1)
+            spawn(slot)
+
+    sock.close()
+    print("[PREFORK] All workers stopped")
@@ -0,0 +1,85 @@
+import librosa
+import numpy as np
+from typing import Union
+from utils.audio_buffer import AudioBuffer, as_audio_buffer
+
+SPECTRAL_SR = 22050
+# Tempo and chroma metadata have always been computed at 16 kHz
+METADATA_SR = 16000
+N_FFT = 2048
+HOP_LENGTH = 512
+
+
+def analyze_clips(sources: dict, sr: int = SPECTRAL_SR) -> dict:
+    """
+    Spectral features for several clips from a single STFT each, at `sr`. Clips
+    of equal length (e.g. the four Demucs stems) are stacked and transformed in
+    one batched call. Returns {name: features} where features holds
+    duration_sec, rms, chroma (12,), onset_envelope and tempo_bpm.
+    """
+    waveforms = {name: as_audio_buffer(source).load(sr) for name, source in sources.items()}
+
+    by_length = {}
+    for name, y in waveforms.items():
+        by_length.setdefault(len(y), []).append(name)
+
+    features = {}
+    for length, names in by_length.items():
+        if length == 0:
+            features.update({name: _empty_features() for name in names})
+            continue
+        batch = np.stack([waveforms[name] for name in names])
+        for name, clip_features in zip(names, _analyze_batch(batch, sr)):
+            features[name] = clip_features
+    return features
+
+
+def analyze_clip(source: Union[str, AudioBuffer], sr: int = SPECTRAL_SR) -> dict:
+    return analyze_clips({"clip": source}, sr=sr)["clip"]
+
+
+def _analyze_batch(batch: np.ndarray, sr: int) -> list:
+    # One STFT for the whole batch: (clips, 1 + N_FFT/2, frames)
+    magnitude = np.abs(librosa.stft(batch, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    power = magnitude ** 2
+
+    # Time-domain RMS, as the energy thresholds were tuned on; rms(S=...) would see Hann-windowed frames
+    rms = librosa.feature.rms(y=batch, frame_length=N_FFT, hop_length=HOP_LENGTH)[:, 0, :]
+    chroma = librosa.feature.chroma_stft(S=power, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    # Same onset definition librosa.beat.beat_track uses on raw audio (log-power mel flux)
+    mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=power, sr=sr))
+    onset_envelope = librosa.onset.onset_strength(S=mel_db, sr=sr, hop_length=HOP_LENGTH)
+
+    duration = batch.shape[-1] / sr
+    results = []
+    for i in range(batch.shape[0]):
+        tempo, _ = librosa.beat.beat_track(onset_envelope=onset_envelope[i], sr=sr, hop_length=HOP_LENGTH)
+        results.append({
+            "duration_sec": float(duration),
+            "rms": float(rms[i].mean()),
+            "chroma": chroma[i].mean(axis=1),
+            "onset_envelope": onset_envelope[i],
+            "tempo_bpm": float(np.atleast_1d(tempo)[0]),
+        })
+    return results
+
+
+def _empty_features() -> dict:
+    return {
+        "duration_sec": 0.0,
+        "rms": 0.0,
+        "chroma": np.zeros(12, dtype=np.float32),
+        "onset_envelope": np.zeros(0, dtype=np.float32),
+        "tempo_bpm": 0.0,
+    }
+
+
+def energy_ratios(rms_by_stem: dict, min_energy_threshold: float = 1e-4) -> tuple:
+    """Vocal and instrumental share of the stem energy, ignoring negligible stems (silence or bleed)."""
+    filtered = {k: v if v > min_energy_threshold else 0 for k, v in rms_by_stem.items()}
+    total = sum(filtered.values())
+    if total == 0:
+        return 0.0, 0.0, total
+    vocal = filtered.get("vocals", 0)
+    instrumental = sum(filtered.get(s, 0) for s in ["drums", "bass", "other"])
+    return vocal / total, instrumental / total, total
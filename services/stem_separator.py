@@ -1,91 +1,122 @@
 import numpy as np
+import torch
 from pathlib import Path
-import librosa
-from demucs.separate import main as demucs_main
+from typing import Optional, Union
+from demucs.apply import apply_model
+from demucs.audio import convert_audio_channels
 import os
 from configs.index_configs import SEPARATED_DIR
+from services.demucs_singleton import get_demucs_model, DEFAULT_DEMUCS_MODEL
+from utils.audio_buffer import AudioBuffer, as_audio_buffer
 from utils.audio_utils import is_stem_ignorable
 
-def separate_stems(audio_path: str, model: str = "htdemucs", cache_dir: str = SEPARATED_DIR) -> dict:
+STEM_NAMES = ["vocals", "drums", "bass", "other"]
+# use segment 7 to reduce ram usage
+DEMUCS_SEGMENT = 7
+
+def separate_stems(
+    source: Union[str, AudioBuffer],
+    model: str = DEFAULT_DEMUCS_MODEL,
+    persist: bool = False,
+    cache_dir: str = SEPARATED_DIR,
+    track_name: Optional[str] = None,
+) -> dict:
     """
-    Separates the given audio file into stems using Demucs and caches results.
-    If stems already exist, it skips reprocessing.
+    Separates the given audio into stems with a resident Demucs model.
 
-    Returns a dict with paths to the stem files.
+    Returns a dict of stem name -> in-memory AudioBuffer. Nothing touches disk
+    unless `persist=True`, in which case the stems are also written as WAVs
+    under `cache_dir/model/track_name`.
     """
-    audio_path = Path(audio_path)
-    track_name = audio_path.stem
+    audio = as_audio_buffer(source)
+    demucs_model, device = get_demucs_model(model)
+
+    wav = torch.from_numpy(np.array(audio.load(demucs_model.samplerate, mono=False)))
+    wav = convert_audio_channels(wav, demucs_model.audio_channels)
+
+    # Same normalisation as demucs.separate, guarded against silent input
+    ref = wav.mean(0)
+    ref_mean, ref_std = ref.mean(), ref.std() + 1e-8
+    wav = (wav - ref_mean) / ref_std
+
+    print(f"[Demucs] Separating stems for: {track_name or audio.path or 'in-memory audio'}")
+    with torch.no_grad():
+        sources = apply_model(
+            demucs_model, wav[None],
+            device=device,
+            segment=DEMUCS_SEGMENT,
+            split=True,
+            overlap=0.25,
+            progress=False,
+        )[0]
+    sources = (sources * ref_std + ref_mean).cpu().numpy()
+
+    separated = {
+        name: sources[demucs_model.sources.index(name)]
+        for name in STEM_NAMES
+    }
+    stems = {
+        name: AudioBuffer.from_array(waveform, demucs_model.samplerate)
+        for name, waveform in separated.items()
+    }
+
+    if persist:
+        save_stems(stems, track_name or Path(audio.path or "stems").stem, model=model, cache_dir=cache_dir)
+
+    return stems
+
+def save_stems(stems: dict, track_name: str, model: str = DEFAULT_DEMUCS_MODEL, cache_dir: str = SEPARATED_DIR) -> dict:
+    """Writes in-memory stems to `cache_dir/model/track_name/<stem>.wav` and returns the paths."""
     stem_dir = Path(cache_dir) / model / track_name
+    os.makedirs(stem_dir, exist_ok=True)
 
-    # If stems already exist, skip separation
-    if all((stem_dir / f"{s}.wav").exists() for s in ["vocals", "drums", "bass", "other"]):
-        print(f"[Demucs] Stems already exist for: {track_name}")
-    else:
-        print(f"[Demucs] Separating stems for: {track_name}")
-        os.makedirs(stem_dir.parent, exist_ok=True)
-        # use segment 8 to reduce ram usage
-        demucs_main([
-            "--out", str(Path(cache_dir)),
-            "-n", model,
-            "--segment", "7",
-            str(audio_path)
-        ])
+    paths = {}
+    for name, buffer in stems.items():
+        path = stem_dir / f"{name}.wav"
+        with open(path, "wb") as f:
+            f.write(buffer.to_wav_bytes())
+        paths[name] = str(path)
 
-    return {
-        "vocals": str(stem_dir / "vocals.wav"),
-        "drums": str(stem_dir / "drums.wav"),
-        "bass": str(stem_dir / "bass.wav"),
-        "other": str(stem_dir / "other.wav")
-    }
+    print(f"[Demucs] Saved stems to: {stem_dir}")
+    return paths
 
 
-import librosa
-import numpy as np
+from services.spectral_features import SPECTRAL_SR, analyze_clip, analyze_clips, energy_ratios
+
+STEM_ANALYSIS_SR = SPECTRAL_SR
 
-def compute_rms_energy(path: str, sr: int = 22050) -> float:
+def compute_rms_energy(source: Union[str, AudioBuffer]) -> float:
     try:
-        y, _ = librosa.load(path, sr=sr)
-        if y is None or len(y) == 0:
-            return 0.0
-        rms = librosa.feature.rms(y=y)
-        return np.mean(rms)
+        return analyze_clip(source)["rms"]
     except Exception as e:
-        print(f"⚠️ Failed to compute RMS for {path}: {e}")
+        print(f"⚠️ Failed to compute RMS for {source}: {e}")
         return 0.0
 
-def classify_track_type(stems: dict) -> str:
+def classify_track_type(stems: dict, features: Optional[dict] = None) -> str:
+    # Stems may be paths or AudioBuffers; one batched STFT covers all of them unless `features` is given
+    if features is None:
+        try:
+            features = analyze_clips(stems)
+        except Exception as e:
+            print(f"⚠️ Failed to analyze stems: {e}")
+            features = {}
+
     energy = {
-        stem: compute_rms_energy(path)
-        for stem, path in stems.items()
+        stem: features[stem]["rms"] if stem in features else 0.0
+        for stem in stems
     }
 
     print("🔍 Stem energy breakdown:", energy)
 
-    # Filter out negligible stems (i.e., silence or bleed)
-    min_energy_threshold = 1e-4
-    filtered_energy = {k: v if v > min_energy_threshold else 0 for k, v in energy.items()}
-
-    total_energy = sum(filtered_energy.values())
+    vocal_ratio, instrumental_ratio, total_energy = energy_ratios(energy)
     if total_energy == 0:
         return "unknown"
 
-    vocal_energy = filtered_energy.get("vocals", 0)
-    instrumental_energy = sum(
-        filtered_energy.get(s, 0) for s in ["drums", "bass", "other"]
-    )
-
-    vocal_ratio = vocal_energy / total_energy if total_energy else 0
-    instrumental_ratio = instrumental_energy / total_energy if total_energy else 0
-
-    stem_is_ignorable = {}
-    for stem, path in stems.items():
-        try:
-            y, sr = librosa.load(path, sr=22050)
-            ignore = is_stem_ignorable(y, sr)
-            stem_is_ignorable[stem] = 1 if ignore else 0
-        except Exception as e:
-            print(f"⚠️ Failed to analyze stem {stem}: {e}")
-            stem_is_ignorable[stem] = 1
+    # Same RMS as the energy breakdown; stems that failed analysis count as ignorable
+    stem_is_ignorable = {
+        stem: 1 if stem not in features or is_stem_ignorable(None, STEM_ANALYSIS_SR, rms=features[stem]["rms"]) else 0
+        for stem in stems
+    }
 
     print(f"🎧 Vocal Ratio: {vocal_ratio:.3f}, Instrumental Ratio: {instrumental_ratio:.3f}")
 
@@ -3,13 +3,15 @@ import json
 import numpy as np
 import faiss
 from typing import Optional, List, Dict
-from sentence_transformers import SentenceTransformer
+from services.faiss_index_factory import create_index, apply_search_params, DEFAULT_INDEX_SPEC
+from services.text_embedding_engine import get_text_embedding_engine
 
 class TextEmbeddingIndex:
-    def __init__(self, faiss_path: str, metadata_path: str):
+    def __init__(self, faiss_path: str, metadata_path: str, index_spec: str = DEFAULT_INDEX_SPEC, search_params: Optional[str] = None):
         self.faiss_path = str(faiss_path)
         self.metadata_path = str(metadata_path)
-        
+        # Shared by every index in the process; the model loads on the first encode
+        self.engine = get_text_embedding_engine()
 
         # Ensure parent directories exist
         os.makedirs(os.path.dirname(self.faiss_path), exist_ok=True)
@@ -20,7 +22,7 @@ class TextEmbeddingIndex:
             self.index = faiss.read_index(self.faiss_path)
             print(f"[FAISS] ✅ Loaded text index from {self.faiss_path}")
         else:
-            self.index = faiss.IndexFlatL2(384)  # all-MiniLM-L6-v2 embedding size
+            self.index = create_index(self.engine.dim, index_spec)  # 384 for all-MiniLM-L6-v2
             print(f"[FAISS] 🆕 Created new text index at {self.faiss_path}")
 
         # Initialize or load metadata
@@ -37,16 +39,27 @@ class TextEmbeddingIndex:
             self.metadata = []
             print(f"[META] 🆕 Created new metadata list for {self.metadata_path}")
 
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        apply_search_params(self.index, search_params)
 
     def embed_text_blob(self, text_blob: str) -> List[float]:
-        return self.model.encode(text_blob.strip()).astype(np.float32).tolist()
+        return self.engine.encode_one(text_blob).tolist()
+
+    def embed_many(self, text_blobs: List[str]) -> np.ndarray:
+        return self.engine.encode(text_blobs)
 
     def add_entry(self, text_blob: str, metadata: Optional[dict] = None) -> List[float]:
-        embedding = np.array([self.embed_text_blob(text_blob)], dtype=np.float32)
-        self.index.add(embedding)
-        self.metadata.append(metadata or {})
-        return embedding[0].tolist()
+        return self.add_entries([text_blob], [metadata])[0].tolist()
+
+    def add_entries(self, text_blobs: List[str], metadatas: Optional[List[Optional[dict]]] = None) -> np.ndarray:
+        """Encodes all blobs in one batch and adds them with one FAISS call; returns the (n, dim) vectors."""
+        metadatas = metadatas or [None] * len(text_blobs)
+        if len(metadatas) != len(text_blobs):
+            raise ValueError(f"Got {len(text_blobs)} text blobs but {len(metadatas)} metadata entries")
+        embeddings = self.embed_many(text_blobs)
+        if len(embeddings):
+            self.index.add(embeddings)
+            self.metadata.extend(metadata or {} for metadata in metadatas)
+        return embeddings
 
     def save(self):
         faiss.write_index(self.index, self.faiss_path)
@@ -55,10 +68,17 @@ class TextEmbeddingIndex:
         print(f"[SAVE] Index and metadata saved.")
 
     def query(self, query_text: str, k: int = 5) -> List[dict]:
-        embedding = np.array([self.embed_text_blob(query_text)], dtype=np.float32)
-        distances, indices = self.index.search(embedding, k)
-        return [self.metadata[i] for i in indices[0] if i < len(self.metadata)]
-    
+        return self.query_many([query_text], k)[0]
+
+    def query_many(self, query_texts: List[str], k: int = 5) -> List[List[dict]]:
+        """Top-k metadata per query, from one batched encode and one FAISS search."""
+        if not query_texts:
+            return []
+        embeddings = self.embed_many(query_texts)
+        distances, indices = self.index.search(embeddings, k)
+        # FAISS pads with -1 when the index holds fewer than k vectors
+        return [[self.metadata[i] for i in row if 0 <= i < len(self.metadata)] for row in indices]
+
     def generate_text_blob(self, entry: dict) -> str:
         """
         Generates a freeform, natural-language-style text blob from semantic metadata.
@@ -0,0 +1,132 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from configs.model_configs import (
+    TEXT_EMBEDDING_MODEL, TEXT_EMBEDDING_DIM, TEXT_EMBEDDING_BATCH_SIZE, TEXT_EMBEDDING_CACHE_SIZE,
+)
+
+
+def normalize_text(text: str) -> str:
+    """Cache key and encoder input: surrounding whitespace stripped, inner runs collapsed."""
+    return " ".join(str(text).split())
+
+
+class VectorLRU:
+    """Thread-safe LRU of key -> read-only float32 vector, with hit/miss counts."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys) -> dict:
+        """{key: vector} for the keys present; counts one hit or miss per key asked for."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = vector
+                self.hits += 1
+        return found
+
+    def put_many(self, keys, vectors):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                vector = np.array(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "cache_entries": size,
+            "cache_capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_sentence_model(model_name: str = TEXT_EMBEDDING_MODEL):
+    """Lazy load the sentence-transformers model only when first needed"""
+    from sentence_transformers import SentenceTransformer
+
+    print(f"[TEXT] Loading {model_name} on demand...")
+    model = SentenceTransformer(model_name)
+    print("[TEXT] Model loaded successfully.")
+    return model
+
+
+class TextEmbeddingEngine:
+    """
+    Process-wide text encoder: one model, batched `encode`, and an LRU of
+    normalized text -> float32 vector. Repeated strings (and duplicates within
+    a batch) are encoded once; results come back as one (n, dim) array.
+    """
+
+    def __init__(
+        self,
+        model_name: str = TEXT_EMBEDDING_MODEL,
+        dim: int = TEXT_EMBEDDING_DIM,
+        batch_size: int = TEXT_EMBEDDING_BATCH_SIZE,
+        cache_size: int = TEXT_EMBEDDING_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.batch_size = batch_size
+        self.cache = VectorLRU(cache_size)
+
+    @property
+    def model(self):
+        return get_sentence_model(self.model_name)
+
+    def encode(self, texts: list) -> np.ndarray:
+        """(len(texts), dim) float32 embeddings, C-contiguous and ready for FAISS."""
+        keys = [normalize_text(text) for text in texts]
+        out = np.empty((len(keys), self.dim), dtype=np.float32)
+        if not keys:
+            return out
+
+        unique = list(dict.fromkeys(keys))
+        found = self.cache.get_many(unique)
+        missing = [key for key in unique if key not in found]
+        if missing:
+            vectors = self.model.encode(
+                missing, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False,
+            ).astype(np.float32, copy=False)
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"{self.model_name} returns {vectors.shape[1]}-d vectors, TEXT_EMBEDDING_DIM is {self.dim}")
+            found.update(zip(missing, vectors))
+            self.cache.put_many(missing, vectors)
+
+        for i, key in enumerate(keys):
+            out[i] = found[key]
+        return out
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, **self.cache.stats()}
+
+
+@lru_cache(maxsize=1)
+def get_text_embedding_engine() -> TextEmbeddingEngine:
+    return TextEmbeddingEngine()
@@ -0,0 +1,99 @@
+from functools import lru_cache
+
+import numpy as np
+import torch
+
+from configs.serving_configs import (
+    TEXT_SEARCH_CACHE_SIZE, TEXT_SEARCH_MAX_BATCH, TEXT_SEARCH_MAX_WAIT_MS, TEXT_SEARCH_CANDIDATES,
+)
+from services.micro_batcher import MicroBatchScheduler
+from services.text_embedding_engine import VectorLRU, normalize_text
+from services.ttmrpp_singleton import get_ttmr_model
+
+
+def _encode_texts(texts: list) -> list:
+    """One padded TTMR++ text_forward for a whole batch of distinct queries."""
+    model, _ = get_ttmr_model()
+    unique = list(dict.fromkeys(texts))
+    with torch.inference_mode():
+        z_text = model.text_forward(unique)
+    vectors = dict(zip(unique, z_text.detach().cpu().float().numpy()))
+    return [vectors[text] for text in texts]
+
+
+class TTMRTextEncoder:
+    """
+    TTMR++ text embeddings for search queries: an LRU of normalized query ->
+    vector in front of a micro-batch scheduler, so popular queries skip the
+    model and concurrent misses share one RoBERTa forward.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = TEXT_SEARCH_CACHE_SIZE,
+        max_batch_size: int = TEXT_SEARCH_MAX_BATCH,
+        max_wait_ms: float = TEXT_SEARCH_MAX_WAIT_MS,
+    ):
+        self.cache = VectorLRU(cache_size)
+        self.scheduler = MicroBatchScheduler("ttmr-text", _encode_texts, max_batch_size, max_wait_ms)
+
+    async def encode(self, query: str) -> tuple:
+        """(vector, cached) for one query."""
+        key = normalize_text(query)
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key], True
+        vector = await self.scheduler.run_async(key)
+        self.cache.put_many([key], [vector])
+        return vector, False
+
+    def stats(self) -> dict:
+        return {"cache": self.cache.stats(), "batching": self.scheduler.stats()}
+
+
+@lru_cache(maxsize=1)
+def get_ttmr_text_encoder() -> TTMRTextEncoder:
+    return TTMRTextEncoder()
+
+
+def search_tracks(variant: dict, query_vector: np.ndarray, k: int, candidates: int = TEXT_SEARCH_CANDIDATES) -> list:
+    """
+    Top-k tracks of a {"index", "metadata"} variant for a text embedding.
+    The index is L2 over unnormalized audio vectors, so a wider L2 candidate
+    set is re-ranked by cosine similarity; indexes that can't reconstruct
+    vectors keep the L2 order.
+    """
+    index, metadata = variant["index"], variant.get("metadata") or []
+    if index.ntotal == 0:
+        return []
+    query = np.ascontiguousarray(query_vector, dtype="float32").reshape(1, -1)
+    distances, ids = index.search(query, min(max(k, candidates), index.ntotal))
+    valid = ids[0] >= 0
+    ids, distances = ids[0][valid], distances[0][valid]
+
+    try:
+        vectors = index.reconstruct_batch(ids)
+    except (RuntimeError, AttributeError):
+        scores, order = -distances, np.arange(len(ids))
+        score_name = "l2_distance"
+    else:
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        scores = (vectors @ query[0]) / np.maximum(norms, 1e-12)
+        order = np.argsort(-scores, kind="stable")
+        score_name = "cosine"
+
+    top = order[:k]
+    top_ids = ids[top]
+    if hasattr(metadata, "get_many"):
+        rows = metadata.get_many(top_ids)
+    else:
+        rows = [metadata[i] if i < len(metadata) else None for i in top_ids]
+
+    results = []
+    for i, row in zip(top, rows):
+        # Vectors past the end of the metadata have nothing to show
+        if row is None:
+            continue
+        score = float(-scores[i]) if score_name == "l2_distance" else float(scores[i])
+        results.append({"rank": len(results) + 1, score_name: round(score, 4), "metadata": row})
+    return results
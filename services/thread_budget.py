@@ -0,0 +1,88 @@
+import threading
+
+from configs.thread_configs import (
+    TORCH_THREADS, TORCH_INTEROP_THREADS, FAISS_THREADS, NUMBA_THREADS, BLAS_THREADS
+)
+
+_lock = threading.Lock()
+_blas_limiter = None
+
+
+def apply_thread_budget(
+    torch_threads: int = TORCH_THREADS,
+    interop_threads: int = TORCH_INTEROP_THREADS,
+    faiss_threads: int = FAISS_THREADS,
+    numba_threads: int = NUMBA_THREADS,
+    blas_threads: int = BLAS_THREADS,
+) -> dict:
+    """
+    Sets every library's thread pool from one budget. Call it after all model
+    and library imports (vendored code such as mtrpp's eval_utils used to set
+    torch threads at import time), i.e. from a startup hook or a forked worker.
+    torch's intra-op count is process-wide and shared by every model, so it is
+    set once here and never toggled per call.
+    """
+    global _blas_limiter
+    import torch
+
+    with _lock:
+        torch.set_num_threads(max(1, torch_threads))
+        try:
+            torch.set_num_interop_threads(max(1, interop_threads))
+        except RuntimeError:
+            # Only settable before the first inter-op parallel work in this process
+            print(f"[THREADS] torch inter-op threads already fixed at {torch.get_num_interop_threads()}")
+
+        try:
+            import faiss
+            faiss.omp_set_num_threads(max(1, faiss_threads))
+        except ImportError:
+            pass
+
+        try:
+            import numba
+            numba.set_num_threads(max(1, min(numba_threads, numba.config.NUMBA_NUM_THREADS)))
+        except ImportError:
+            pass
+
+        try:
+            from threadpoolctl import threadpool_limits
+            _blas_limiter = threadpool_limits(limits=max(1, blas_threads), user_api="blas")
+        except ImportError:
+            pass
+
+    report = thread_report()
+    print(f"[THREADS] Budget applied: {report['summary']}")
+    return report
+
+
+def thread_report() -> dict:
+    """What each library will actually use right now."""
+    import torch
+
+    summary = {
+        "torch_intra_op": torch.get_num_threads(),
+        "torch_inter_op": torch.get_num_interop_threads(),
+    }
+    try:
+        import faiss
+        summary["faiss_omp"] = faiss.omp_get_max_threads()
+    except ImportError:
+        pass
+    try:
+        import numba
+        summary["numba"] = numba.get_num_threads()
+    except ImportError:
+        pass
+
+    pools = []
+    try:
+        from threadpoolctl import threadpool_info
+        pools = [
+            {"api": info.get("user_api"), "library": info.get("internal_api"), "threads": info.get("num_threads"), "path": info.get("filepath")}
+            for info in threadpool_info()
+        ]
+    except ImportError:
+        pass
+
+    return {"summary": summary, "native_pools": pools}
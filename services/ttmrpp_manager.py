@@ -3,4 +3,4 @@ from services.ttmrpp_wrapper import TTMRPPWrapper
 
 @lru_cache(maxsize=8)
 def get_ttmr(index_path: str, metadata_path: str, read_only: bool = False) -> TTMRPPWrapper:
-    return TTMRPPWrapper(index_path, metadata_path, read_only)
\ No newline at end of file
+    return TTMRPPWrapper(faiss_path=index_path, metadata_path=metadata_path, read_only=read_only)
\ No newline at end of file
@@ -2,6 +2,9 @@
 import os
 import torch
 from functools import lru_cache
+from typing import Optional
+from configs.model_configs import TTMR_QUANTIZE
+from services.model_quantization import quantize_for_cpu
 from external.music_text_representation_pp.mtrpp.utils.eval_utils import load_ttmr_pp
 
 # 🔐 Optional fallback download logic
@@ -13,21 +16,31 @@ if not os.path.exists("models/ttmrpp/best.pth"):
     except Exception as e:
         print(f"[TTMR++] Failed to auto-download checkpoint: {e}")
 
-@lru_cache(maxsize=1)
-def get_ttmr_model():
-    """Lazy load TTMR++ model only when first needed"""
-    print("[TTMR++] Loading shared model...")
+def load_ttmr_model(quantize: bool = False):
+    """Builds a fresh TTMR++ model; `quantize` swaps its Linear layers for int8 (CPU only)"""
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model, _, _ = load_ttmr_pp("models/ttmrpp", model_types="best")
     model = model.to(device).eval()
+    if quantize and device.type == "cpu":
+        model = quantize_for_cpu(model, "TTMR++", inplace=True)
+    return model, device
+
+@lru_cache(maxsize=2)
+def _shared_ttmr_model(quantize: bool):
+    print("[TTMR++] Loading shared model...")
+    model, device = load_ttmr_model(quantize=quantize)
     print("[TTMR++] Model loaded.")
     return model, device
 
+def get_ttmr_model(quantize: Optional[bool] = None):
+    """Lazy load TTMR++ model only when first needed; one shared instance per `quantize` (default TTMR_QUANTIZE)"""
+    return _shared_ttmr_model(TTMR_QUANTIZE if quantize is None else quantize)
+
 # Lazy loading - models only loaded when first accessed
-def get_ttmr_device():
-    _, device = get_ttmr_model()
+def get_ttmr_device(quantize: Optional[bool] = None):
+    _, device = get_ttmr_model(quantize)
     return device
 
-def get_ttmr_model_instance():
-    model, _ = get_ttmr_model()
+def get_ttmr_model_instance(quantize: Optional[bool] = None):
+    model, _ = get_ttmr_model(quantize)
     return model
\ No newline at end of file
@@ -5,14 +5,15 @@ import torch
 import numpy as np
 import json
 import faiss
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Union
 from external.music_text_representation_pp.mtrpp.utils.eval_utils import load_ttmr_pp
 from external.music_text_representation_pp.mtrpp.utils.audio_utils import (
-    int16_to_float32, float32_to_int16,
-    load_audio, STR_CH_FIRST
+    int16_to_float32, float32_to_int16
 )
 
 from services.ttmrpp_singleton import get_ttmr_model_instance, get_ttmr_device
+from utils.audio_buffer import AudioBuffer, as_audio_buffer
+from services.faiss_index_factory import create_index, DEFAULT_INDEX_SPEC
 
 
 SR = 22050
@@ -28,13 +29,17 @@ class TTMRPPWrapper:
         faiss_path=None,
         metadata_path=None,
         read_only: bool = False,
+        index_spec: str = DEFAULT_INDEX_SPEC,
         model_dir: str = "models/ttmrpp",
         model_type: str = "best",
         gpu: int = 0,
+        quantize: Optional[bool] = None,
     ):
         # Lazy loading - models loaded on first use
         self._model = None
         self._device = None
+        # Which shared model instance to use (None: TTMR_QUANTIZE)
+        self.quantize = quantize
         self.read_only = read_only
         self.index = None
         self.metadata = []
@@ -65,7 +70,7 @@ class TTMRPPWrapper:
                 )
             else:
                 print(f"[faiss] Creating new FAISS index at {faiss_path}")
-                self.index = faiss.IndexFlatL2(128)
+                self.index = create_index(128, index_spec)
 
         if metadata_path:
             metadata_path = Path(metadata_path)
@@ -84,14 +89,14 @@ class TTMRPPWrapper:
     def model(self):
         """Lazy load TTMR++ model on first access"""
         if self._model is None:
-            self._model = get_ttmr_model_instance()
+            self._model = get_ttmr_model_instance(self.quantize)
         return self._model
 
     @property
     def device(self):
         """Lazy load device on first access"""
         if self._device is None:
-            self._device = get_ttmr_device()
+            self._device = get_ttmr_device(self.quantize)
         return self._device
 
     def _load_model(self, save_dir: str, model_type: str):
@@ -114,10 +119,8 @@ class TTMRPPWrapper:
         model, _, _ = load_ttmr_pp(save_dir, model_types=model_type)
         return model
 
-    def _load_wav_tensor(self, audio_path: str) -> torch.Tensor:
-        audio, _ = load_audio(audio_path, STR_CH_FIRST, SR, downmix_to_mono=True)
-        if len(audio.shape) == 2:
-            audio = audio.squeeze(0)
+    def _load_wav_tensor(self, source: Union[str, AudioBuffer]) -> torch.Tensor:
+        audio = as_audio_buffer(source).load(SR)
         audio = int16_to_float32(float32_to_int16(audio))
         ceil = int(audio.shape[-1] // N_SAMPLES)
         audio_tensor = torch.from_numpy(
@@ -125,11 +128,30 @@ class TTMRPPWrapper:
         )
         return audio_tensor
 
-    def get_audio_embedding(self, audio_path: str) -> torch.Tensor:
-        audio_tensor = self._load_wav_tensor(audio_path).to(self.device)
+    def prepare_clip(self, source: Union[str, AudioBuffer]) -> torch.Tensor:
+        """The clip's 10s chunks, ready for `embed_chunks`."""
+        return self._load_wav_tensor(source)
+
+    def get_audio_embedding(self, source: Union[str, AudioBuffer]) -> torch.Tensor:
+        return self.get_audio_embeddings_batch([source])[0]
+
+    def get_audio_embeddings_batch(self, sources: list[Union[str, AudioBuffer]]) -> list[torch.Tensor]:
+        """
+        Embeds several clips with one audio_forward: every clip's 10s chunks are
+        stacked into a single batch, then averaged back per clip.
+        """
+        if not sources:
+            return []
+
+        return self.embed_chunks([self._load_wav_tensor(source) for source in sources])
+
+    def embed_chunks(self, chunks: list[torch.Tensor]) -> list[torch.Tensor]:
+        """One audio_forward over the 10s chunks of several clips (from `_load_wav_tensor`), averaged per clip."""
+        counts = [c.shape[0] for c in chunks]
+        audio_tensor = torch.cat(chunks).to(self.device)
         with torch.no_grad():
             z_audio = self.model.audio_forward(audio_tensor)
-        return z_audio.mean(0).detach().cpu().float()
+        return [z.mean(0).detach().cpu().float() for z in torch.split(z_audio, counts)]
 
     def get_text_embedding(self, text: str) -> torch.Tensor:
         with torch.no_grad():
@@ -147,7 +169,7 @@ class TTMRPPWrapper:
         if self.metadata is None:
             raise ValueError("No metadata loaded. Pass `metadata_path` to the constructor.")
         neighbor_info = self.query_neighbors(embedding, k)
-        return [self.metadata[i] for i, _ in neighbor_info if i < len(self.metadata)]
+        return [self.metadata[i] for i, _ in neighbor_info if 0 <= i < len(self.metadata)]
 
     def add_embedding_to_index(self, embedding: list[float], metadata: Optional[dict] = None):
         if self.read_only:
@@ -0,0 +1,145 @@
+import os
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from configs.serving_configs import MAX_UPLOAD_MB, UPLOAD_CHUNK_BYTES
+from services.analysis_cache import new_content_hasher
+
+# Boundaries, part headers and the other form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadRejected(Exception):
+    """The upload can't be accepted; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+@dataclass
+class StreamedUpload:
+    path: str
+    filename: str
+    content_type: str
+    content_hash: str
+    size: int
+
+
+async def receive_upload(
+    request: Request,
+    field: str = "file",
+    allowed_types: tuple = ("audio/mpeg", "audio/wav", "audio/x-wav"),
+    max_bytes: int = MAX_UPLOAD_MB * 1024 * 1024,
+) -> StreamedUpload:
+    """
+    Parses a multipart body straight off `request.stream()`: the file part is
+    written to a named temp file and hashed as it arrives, so the body is never
+    spooled and copied first. Oversized uploads are refused from Content-Length
+    before anything is read, or as soon as the file grows past `max_bytes`.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise UploadRejected(413, f"File exceeds the {MAX_UPLOAD_MB} MB upload limit.")
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadRejected(400, "Expected a multipart/form-data upload.")
+
+    hasher = new_content_hasher()
+    state = {"headers": {}, "header_field": b"", "header_value": b"", "target": None, "error": None}
+    upload = {"file": None, "path": None, "filename": None, "content_type": None, "size": 0}
+    buffered = []
+
+    def on_part_begin():
+        state["headers"], state["target"] = {}, None
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"], state["header_value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        if disposition.get(b"name", b"").decode() != field or b"filename" not in disposition or upload["file"] is not None:
+            return
+        part_type = state["headers"].get(b"content-type", b"").decode("latin-1").strip()
+        if part_type not in allowed_types:
+            state["error"] = UploadRejected(400, "Only MP3 or WAV files are supported.")
+            return
+        filename = disposition[b"filename"].decode("utf-8", "replace")
+        upload["filename"], upload["content_type"] = filename, part_type
+        # Extract extension based on the filename (real suffix)
+        upload["file"] = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[-1].lower())
+        upload["path"] = upload["file"].name
+        state["target"] = upload["file"]
+
+    def on_part_data(data, start, end):
+        if state["target"] is None or state["error"] is not None:
+            return
+        chunk = data[start:end]
+        upload["size"] += len(chunk)
+        if upload["size"] > max_bytes:
+            state["error"] = UploadRejected(413, f"File exceeds the {MAX_UPLOAD_MB} MB upload limit.")
+            return
+        hasher.update(chunk)
+        buffered.append(chunk)
+
+    def on_part_end():
+        state["target"] = None
+
+    def write_buffered():
+        upload["file"].write(b"".join(buffered))
+        buffered.clear()
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if state["error"] is not None:
+                raise state["error"]
+            if sum(len(b) for b in buffered) >= UPLOAD_CHUNK_BYTES:
+                await run_in_threadpool(write_buffered)
+        parser.finalize()
+        if upload["file"] is None:
+            raise UploadRejected(400, f"Missing '{field}' file field.")
+        if buffered:
+            await run_in_threadpool(write_buffered)
+        upload["file"].close()
+    except Exception:
+        if upload["file"] is not None:
+            upload["file"].close()
+            os.remove(upload["path"])
+        raise
+
+    return StreamedUpload(
+        path=upload["path"],
+        filename=upload["filename"],
+        content_type=upload["content_type"],
+        content_hash=hasher.hexdigest(),
+        size=upload["size"],
+    )
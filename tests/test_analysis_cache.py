@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+pytest.importorskip("xxhash")
+
+from services.analysis_cache import AnalysisCache, analysis_key
+
+PAYLOAD = b"x" * 1000
+
+
+def _cache(tmp_path, max_disk_bytes):
+    return AnalysisCache(cache_dir=tmp_path, max_memory_bytes=0, max_disk_bytes=max_disk_bytes)
+
+
+def _age(cache, key, artifact, seconds_ago):
+    path = cache._path(key, artifact)
+    mtime = path.stat().st_mtime - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def _disk_bytes(root):
+    return sum(p.stat().st_size for p in root.glob("*/*/*.pkl"))
+
+
+def test_disk_eviction_drops_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_disk_bytes=3500)
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, "stems", PAYLOAD)
+        _age(cache, key, "stems", seconds_ago=100 - i * 10)
+    # A hit makes the oldest entry the most recently used
+    assert cache.get("aa01", "stems") == PAYLOAD
+
+    cache.put("dd04", "stems", PAYLOAD)
+
+    assert cache.get("bb02", "stems") is None
+    assert cache.get("aa01", "stems") == PAYLOAD
+    assert cache.get("dd04", "stems") == PAYLOAD
+    assert _disk_bytes(tmp_path) <= 3500
+
+
+def test_disk_cap_holds_across_workers_sharing_the_directory(tmp_path):
+    # Two pre-fork workers: each one's writes count against the other's budget
+    workers = [_cache(tmp_path, max_disk_bytes=5000), _cache(tmp_path, max_disk_bytes=5000)]
+    for i in range(12):
+        workers[i % 2].put(f"{i:04x}aa", "embeddings", PAYLOAD)
+        assert _disk_bytes(tmp_path) <= 5000
+
+    assert workers[0].stats()["disk_entries"] <= 5
+    # Newest entries survive whichever worker wrote them
+    assert workers[1].get("000baa", "embeddings") == PAYLOAD
+    assert workers[1].get("000aaa", "embeddings") == PAYLOAD
+
+
+def test_analysis_key_depends_on_preview_window():
+    assert analysis_key("abc", 30) == analysis_key("abc", 30)
+    assert analysis_key("abc", 30) != analysis_key("abc", 15)
+    assert analysis_key("abc", 30) != analysis_key("abd", 30)
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+sf = pytest.importorskip("soundfile")
+pytest.importorskip("librosa")
+
+from services.artifact_store import ArtifactStore
+from utils.audio_buffer import AudioBuffer
+
+
+def _tone(seconds=1.0, sr=22050):
+    t = np.arange(int(seconds * sr)) / sr
+    return AudioBuffer.from_array(0.3 * np.sin(2 * np.pi * 440 * t).astype("float32"), sr)
+
+
+def _age(path, seconds_ago):
+    mtime = path.stat().st_mtime - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def _disk_bytes(root):
+    return sum(p.stat().st_size for p in root.glob("*/*") if p.suffix in (".flac", ".ogg"))
+
+
+def test_put_and_transcode(tmp_path):
+    store = ArtifactStore(root=tmp_path, max_disk_bytes=10 * 1024 * 1024)
+    ref = store.put_audio("abcdef01-vocals", _tone())
+    assert ref["artifact_id"] == "abcdef01-vocals"
+    assert ref["url"].startswith("/semantic/artifacts/abcdef01-vocals?format=")
+
+    flac = store.get_file("abcdef01-vocals", "flac")
+    assert sf.info(str(flac)).samplerate == 22050
+    opus = store.get_file("abcdef01-vocals", "opus")
+    # libopus has no 22.05 kHz mode
+    assert opus.suffix == ".ogg" and sf.info(str(opus)).samplerate == 48000
+    assert store.get_file("ffffffff-drums", "flac") is None
+    with pytest.raises(ValueError):
+        store.path("../etc-passwd", "flac")
+
+
+def test_eviction_is_lru_and_shared_across_workers(tmp_path):
+    # Two pre-fork workers sharing one directory
+    first, second = ArtifactStore(root=tmp_path), ArtifactStore(root=tmp_path)
+    first.put_audio("aaaaaaaa-bass", _tone())
+    flac_size = first.path("aaaaaaaa-bass").stat().st_size
+    cap = int(2.5 * flac_size)
+    first.max_disk_bytes = second.max_disk_bytes = cap
+
+    _age(first.path("aaaaaaaa-bass"), 100)
+    second.put_audio("bbbbbbbb-bass", _tone())
+    _age(second.path("bbbbbbbb-bass"), 50)
+    # A cached entry pointing at the oldest artifact keeps it alive
+    assert first.retain("aaaaaaaa-bass")
+
+    second.put_audio("cccccccc-bass", _tone())
+
+    assert not first.path("bbbbbbbb-bass").exists()
+    assert first.path("aaaaaaaa-bass").exists() and first.path("cccccccc-bass").exists()
+    assert not first.retain("bbbbbbbb-bass")
+    assert _disk_bytes(tmp_path) <= cap
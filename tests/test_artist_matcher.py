@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from services.artist_matcher import ArtistNameIndex, fuzz, normalize_name
+
+KNOWN = [
+    "Beyoncé", "The Beatles", "Sigur Rós", "Björk", "AC/DC", "Guns N' Roses", "The Rolling Stones",
+    "Daft Punk", "Aphex Twin", "Boards of Canada", "Massive Attack", "Portishead", "Radiohead",
+    "The National", "The Smiths", "Joy Division", "New Order", "Kendrick Lamar", "Kanye West",
+    "Frank Ocean", "Tame Impala", "Fleetwood Mac", "Led Zeppelin", "Pink Floyd", "Black Sabbath",
+]
+
+
+def _fixture_names(n=600, seed=0):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ra", "ne", "tu", "sho", "vin", "del", "ar", "bel", "co", "zy", "gra", "fen"]
+    words = ["the", "band", "and", "orchestra", "trio", "boys", "club", "sound"]
+    names = list(KNOWN)
+    while len(names) < n:
+        name = " ".join(
+            "".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).capitalize()
+            for _ in range(rng.randint(1, 2))
+        )
+        if rng.random() < 0.3:
+            name = f"{rng.choice(words).capitalize()} {name}"
+        names.append(name)
+    return list(dict.fromkeys(names))
+
+
+def _typo(name, rng):
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    op = rng.choice(["drop", "swap", "double"])
+    if op == "drop":
+        del chars[i]
+    elif op == "swap":
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        chars.insert(i, chars[i])
+    return "".join(chars)
+
+
+def _brute_force_best(names, query):
+    normalized = normalize_name(query)
+    return max(fuzz.WRatio(normalized, normalize_name(name)) for name in names)
+
+
+def _queries(names, seed=1):
+    rng = random.Random(seed)
+    queries = ["beyonce", "SIGUR ROS", "bjork", "acdc", "Guns and Roses", "rolling stones", "daft-punk", "aphex twins"]
+    queries += [_typo(name, rng) for name in rng.sample(names, 60) if len(name) > 4]
+    return queries
+
+
+def test_trigram_blocking_finds_the_brute_force_best_match():
+    names = _fixture_names()
+    index = ArtistNameIndex(names, max_candidates=20)
+
+    for query in _queries(names):
+        match = index.match(query)
+        assert match is not None, query
+        assert match[1] == _brute_force_best(names, query), query
+
+
+def test_known_names_resolve_despite_accents_and_typos():
+    index = ArtistNameIndex(_fixture_names(), max_candidates=20)
+
+    assert index.match("beyonce") == ("Beyoncé", 100)
+    assert index.match("Sigur Ros")[0] == "Sigur Rós"
+    assert index.match("Radiohaed")[0] == "Radiohead"
+    assert index.match("Fleetwod Mac")[0] == "Fleetwood Mac"
+    assert index.match("zzzz qqqq", score_cutoff=90) is None
+
+
+def test_match_many_scores_repeated_queries_once(monkeypatch):
+    index = ArtistNameIndex(_fixture_names(), max_candidates=20)
+    calls = []
+    original = index.match
+    monkeypatch.setattr(index, "match", lambda query, score_cutoff=0: calls.append(query) or original(query, score_cutoff))
+
+    resolved = index.match_many(["Portishaed", "portishaed", "PORTISHAED", "Massive Atack"])
+    assert resolved["Portishaed"][0] == resolved["PORTISHAED"][0] == "Portishead"
+    assert resolved["Massive Atack"][0] == "Massive Attack"
+    assert len(calls) == 2
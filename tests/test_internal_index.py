@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from services.build_journal import BuildJournal
+from services.internal_index import InternalIndexIngestor, CLAP_DIM, INGEST_KEY
+
+
+def _records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "vector": rng.standard_normal(CLAP_DIM).astype("float32").tolist(),
+            "row": {"title": f"track-{i}", INGEST_KEY: f"id-{seed}-{i}", "content_hash": f"hash-{seed}-{i}"},
+        }
+        for i in range(n)
+    ]
+
+
+def _write_wal(path, records, torn_tail=True):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        if torn_tail:
+            # An append that was cut off mid-line by the crash
+            f.write('{"vector": [0.1, 0.2')
+
+
+def _ingestor(tmp_path, **kwargs):
+    return InternalIndexIngestor(
+        wal_path=tmp_path / "internal.wal.jsonl",
+        journal_dir=tmp_path / "journal",
+        index_path=tmp_path / "internal_index.faiss",
+        metadata_path=tmp_path / "internal_metadata.json",
+        flush_interval_sec=3600,
+        fsync=False,
+        compact_every=1000,
+        **kwargs,
+    )
+
+
+def test_start_replays_wal_left_by_crash(tmp_path):
+    records = _records(5)
+    _write_wal(tmp_path / "internal.wal.jsonl", records)
+
+    ingestor = _ingestor(tmp_path)
+    ingestor.start()
+    try:
+        snapshot = ingestor.snapshot
+        assert snapshot["index"].ntotal == 5
+        assert [row[INGEST_KEY] for row in snapshot["metadata"]] == [r["row"][INGEST_KEY] for r in records]
+        assert (tmp_path / "internal.wal.jsonl").stat().st_size == 0
+
+        hits = ingestor.search(records[3]["vector"], k=1)
+        assert hits[0]["metadata"]["title"] == "track-3"
+        # Replayed uploads count as indexed
+        assert ingestor.add(records[0]["vector"], {"title": "again"}, content_hash="hash-0-0") is None
+    finally:
+        ingestor.stop()
+
+    with open(tmp_path / "internal_metadata.json") as f:
+        assert [row["title"] for row in json.load(f)] == [f"track-{i}" for i in range(5)]
+    assert faiss.read_index(str(tmp_path / "internal_index.faiss")).ntotal == 5
+
+
+def test_replay_skips_records_committed_before_the_crash(tmp_path):
+    committed, uncommitted = _records(3, seed=1), _records(2, seed=2)
+    journal = BuildJournal(tmp_path / "journal", key_field=INGEST_KEY)
+    journal.append(np.array([r["vector"] for r in committed], dtype="float32"), [r["row"] for r in committed])
+    # Crash between the segment commit and the log truncate
+    _write_wal(tmp_path / "internal.wal.jsonl", committed + uncommitted, torn_tail=False)
+
+    ingestor = _ingestor(tmp_path)
+    ingestor.start()
+    try:
+        metadata = ingestor.snapshot["metadata"]
+        assert ingestor.snapshot["index"].ntotal == 5
+        assert [row[INGEST_KEY] for row in metadata] == [r["row"][INGEST_KEY] for r in committed + uncommitted]
+        assert ingestor.stats["already_committed"] == 3
+        assert ingestor.stats["flushed"] == 2
+    finally:
+        ingestor.stop()
+
+
+def test_trained_spec_waits_for_enough_vectors(tmp_path):
+    _write_wal(tmp_path / "internal.wal.jsonl", _records(8, seed=3), torn_tail=False)
+
+    ingestor = _ingestor(tmp_path, index_spec="IVF4,Flat", train_min_vectors=200)
+    ingestor.start()
+    try:
+        flat = ingestor.snapshot["index"]
+        assert isinstance(flat, faiss.IndexFlat) and flat.ntotal == 8
+
+        for record in _records(200, seed=4):
+            ingestor.add(record["vector"], record["row"], content_hash=record["row"]["content_hash"])
+        ingestor.flush()
+        # The background writer may have committed part of it; pick up every segment
+        ingestor.refresh()
+        index = ingestor.snapshot["index"]
+        assert not isinstance(index, faiss.IndexFlat)
+        assert index.ntotal == len(ingestor.snapshot["metadata"]) == 208
+    finally:
+        ingestor.stop()
+
+
+def test_only_the_writer_trains(tmp_path):
+    _write_wal(tmp_path / "internal.wal.jsonl", _records(208, seed=5), torn_tail=False)
+
+    writer = _ingestor(tmp_path, index_spec="IVF4,Flat", train_min_vectors=200)
+    writer.start()
+    reader = _ingestor(tmp_path, index_spec="IVF4,Flat", train_min_vectors=200)
+    reader.start()
+    try:
+        assert reader.status()["writer"] is False
+        assert not isinstance(writer.snapshot["index"], faiss.IndexFlat)
+        assert isinstance(reader.snapshot["index"], faiss.IndexFlat)
+        assert reader.snapshot["index"].ntotal == 208
+    finally:
+        reader.stop()
+        writer.stop()
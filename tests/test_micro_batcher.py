@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from services.micro_batcher import BatchQueueFull, MicroBatchScheduler
+
+
+class BlockingBatch:
+    """batch_fn that records batches and holds the worker until `go` is set."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.go = threading.Event()
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.started.set()
+        self.go.wait(5)
+        return [item * 10 for item in items]
+
+
+def _busy_scheduler(max_queue):
+    """Scheduler whose worker is stuck on a first batch, so new items stay pending."""
+    batch_fn = BlockingBatch()
+    scheduler = MicroBatchScheduler("test", batch_fn, max_batch_size=1, max_wait_ms=0, max_queue=max_queue)
+    first = scheduler.submit(0)
+    assert batch_fn.started.wait(5)
+    return scheduler, batch_fn, first
+
+
+def test_full_queue_rejects_without_queueing():
+    scheduler, batch_fn, first = _busy_scheduler(max_queue=2)
+    queued = scheduler.submit_many([1, 2])
+    with pytest.raises(BatchQueueFull):
+        scheduler.submit(3)
+    assert scheduler.stats()["queued"] == 2
+
+    batch_fn.go.set()
+    assert [f.result(5) for f in [first] + queued] == [0, 10, 20]
+    assert [3] not in batch_fn.batches
+
+
+def test_cancelled_items_are_dropped_before_their_batch():
+    scheduler, batch_fn, first = _busy_scheduler(max_queue=8)
+    dropped = scheduler.submit_many([1, 2])
+    kept = scheduler.submit(3)
+    assert all(future.cancel() for future in dropped)
+
+    batch_fn.go.set()
+    assert kept.result(5) == 30
+    assert first.result(5) == 0
+    assert batch_fn.batches == [[0], [3]]
+
+
+def _recording_scheduler(**kwargs):
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    return MicroBatchScheduler("test", batch_fn, **kwargs), batches
+
+
+def test_batches_are_capped_at_max_batch_size():
+    batch_fn = BlockingBatch()
+    scheduler = MicroBatchScheduler("test", batch_fn, max_batch_size=2, max_wait_ms=0)
+    first = scheduler.submit(0)
+    assert batch_fn.started.wait(5)
+    queued = scheduler.submit_many([1, 2, 3, 4, 5])
+
+    batch_fn.go.set()
+    assert [f.result(5) for f in [first] + queued] == [0, 10, 20, 30, 40, 50]
+    assert batch_fn.batches == [[0], [1, 2], [3, 4], [5]]
+    assert scheduler.stats()["batch_size_histogram"] == {"1": 2, "2": 2}
+
+
+def test_full_batch_goes_out_without_waiting_for_reservations():
+    scheduler, batches = _recording_scheduler(max_batch_size=2, max_wait_ms=5000)
+    scheduler.reserve()
+    started = time.monotonic()
+    futures = scheduler.submit_many([1, 2])
+
+    assert [f.result(5) for f in futures] == [10, 20]
+    assert time.monotonic() - started < 2
+    assert batches == [[1, 2]]
+    scheduler.release()
+
+
+def test_reservation_holds_the_batch_for_at_most_max_wait_ms():
+    scheduler, batches = _recording_scheduler(max_batch_size=8, max_wait_ms=300)
+    scheduler.reserve()
+    scheduler.reserve()
+    started = time.monotonic()
+    alone = scheduler.submit(1)
+    # The first reservation turns into items while the batch is held
+    joined = scheduler.submit_many([2, 3], reserved=True)
+
+    assert alone.result(5) == 10 and [f.result(5) for f in joined] == [20, 30]
+    assert 0.25 <= time.monotonic() - started < 3
+    assert batches == [[1, 2, 3]]
+    scheduler.release()
+
+
+def test_unreleased_reservation_only_delays_batches():
+    scheduler, batches = _recording_scheduler(max_batch_size=8, max_wait_ms=500)
+    # A caller that reserved and then died before submitting or releasing
+    scheduler.reserve()
+
+    for item in (1, 2):
+        started = time.monotonic()
+        assert scheduler.submit(item).result(5) == item * 10
+        assert 0.4 <= time.monotonic() - started < 3
+
+    scheduler.release()
+    started = time.monotonic()
+    assert scheduler.submit(3).result(5) == 30
+    assert time.monotonic() - started < 0.3
+    assert batches == [[1], [2], [3]]
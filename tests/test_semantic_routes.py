@@ -0,0 +1,120 @@
+import os
+import threading
+
+import pytest
+
+# llm_tagger builds its client at import time; the test never calls it
+os.environ.setdefault("TOGETHER_API_KEY", "test")
+pytest.importorskip("httpx")
+semantic = pytest.importorskip("routes.semantic")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.micro_batcher import MicroBatchScheduler
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(semantic, "get_analysis_cache", lambda: None)
+    app = FastAPI()
+    app.include_router(semantic.router, prefix="/semantic")
+    return TestClient(app)
+
+
+def _upload(client):
+    return client.post(
+        "/semantic/analyze/hybrid",
+        files={"file": ("track.wav", b"RIFF0000WAVEfmt ", "audio/wav")},
+    )
+
+
+def test_analyze_answers_503_when_audio_batch_queue_is_full(client, monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    scheduler = MicroBatchScheduler("clap-audio", hold, max_batch_size=1, max_wait_ms=0, max_queue=1)
+    scheduler.submit("running")
+    assert started.wait(5)
+    scheduler.submit("waiting")
+
+    async def saturated_pipeline(request, file_path, **kwargs):
+        # What AudioEmbeddingScheduler.embed hits once the queue is at max_queue
+        scheduler.submit_many(["clip"])
+
+    monkeypatch.setattr(semantic, "process_audio_hybrid", saturated_pipeline)
+    try:
+        response = _upload(client)
+    finally:
+        release.set()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "busy" in response.json()["error"]
+
+
+@pytest.fixture
+def artifact_client(client, monkeypatch, tmp_path):
+    import numpy as np
+
+    from services.artifact_store import ArtifactStore
+    from utils.audio_buffer import AudioBuffer
+
+    store = ArtifactStore(root=tmp_path)
+    t = np.arange(22050) / 22050
+    store.put_audio("abcdef01-vocals", AudioBuffer.from_array((0.3 * np.sin(2 * np.pi * 440 * t)).astype("float32"), 22050))
+    monkeypatch.setattr(semantic, "get_artifact_store", lambda: store)
+    return client, store
+
+
+def test_artifact_range_request_returns_partial_content(artifact_client):
+    client, store = artifact_client
+    full = store.path("abcdef01-vocals", "flac").read_bytes()
+
+    response = client.get("/semantic/artifacts/abcdef01-vocals?format=flac", headers={"Range": "bytes=0-99"})
+
+    assert response.status_code == 206
+    assert response.content == full[:100]
+    assert response.headers["Content-Range"] == f"bytes 0-99/{len(full)}"
+    assert response.headers["Content-Type"] == "audio/flac"
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_artifact_formats(artifact_client):
+    client, _ = artifact_client
+
+    opus = client.get("/semantic/artifacts/abcdef01-vocals?format=opus")
+    assert opus.status_code == 200
+    assert opus.headers["Content-Type"] == "audio/ogg"
+    assert opus.content[:4] == b"OggS"
+
+    assert client.get("/semantic/artifacts/abcdef01-vocals?format=mp3").status_code == 400
+    assert client.get("/semantic/artifacts/not-an-id!?format=flac").status_code == 400
+    assert client.get("/semantic/artifacts/ffffffff-drums?format=flac").status_code == 404
+
+
+def test_text_search_clamps_k(client, monkeypatch):
+    import faiss
+    import numpy as np
+
+    class FixedEncoder:
+        async def encode(self, query):
+            return np.array([1.0, 0.0], dtype="float32"), False
+
+    index = faiss.IndexFlatL2(2)
+    index.add(np.random.default_rng(0).standard_normal((8, 2)).astype("float32"))
+    client.app.state.faiss_variants = {"tagging_ttmr": {"index": index, "metadata": [{"title": str(i)} for i in range(8)]}}
+    monkeypatch.setattr(semantic, "get_ttmr_text_encoder", lambda: FixedEncoder())
+    monkeypatch.setattr(semantic, "TEXT_SEARCH_MAX_K", 5)
+
+    too_many = client.get("/semantic/search/text", params={"q": "dark ambient", "k": 500}).json()
+    assert too_many["k"] == 5 and len(too_many["results"]) == 5
+    assert [r["rank"] for r in too_many["results"]] == [1, 2, 3, 4, 5]
+
+    too_few = client.get("/semantic/search/text", params={"q": "dark ambient", "k": 0}).json()
+    assert too_few["k"] == 1 and len(too_few["results"]) == 1
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+sf = pytest.importorskip("soundfile")
+
+from services.spectral_features import METADATA_SR, SPECTRAL_SR, analyze_clip, energy_ratios
+from services.stem_separator import classify_track_type
+from utils.audio_utils import is_stem_ignorable
+
+SR = 44100
+DURATION_SEC = 6
+
+
+def _tone(freq, amplitude, tremolo_hz=0.0):
+    t = np.arange(SR * DURATION_SEC) / SR
+    envelope = 1.0 if not tremolo_hz else 0.6 + 0.4 * np.sin(2 * np.pi * tremolo_hz * t)
+    return amplitude * envelope * np.sin(2 * np.pi * freq * t)
+
+
+def _drums(amplitude, bpm=120):
+    rng = np.random.default_rng(0)
+    y = np.zeros(SR * DURATION_SEC)
+    hit = amplitude * rng.standard_normal(SR // 10) * np.exp(-np.linspace(0, 8, SR // 10))
+    for start in range(0, len(y) - len(hit), int(SR * 60 / bpm)):
+        y[start:start + len(hit)] += hit
+    return y
+
+
+def _noise(amplitude, seed=1):
+    return amplitude * np.random.default_rng(seed).standard_normal(SR * DURATION_SEC)
+
+
+STEM_SETS = {
+    "song": {"vocals": _tone(440, 0.3, tremolo_hz=5), "drums": _drums(0.5), "bass": _tone(55, 0.3), "other": _noise(0.05)},
+    "acapella": {"vocals": _tone(330, 0.4, tremolo_hz=3), "drums": _noise(0.002), "bass": _noise(0.001, seed=2), "other": _noise(0.003, seed=3)},
+    "instrumental": {"vocals": _noise(0.004), "drums": _drums(0.4), "bass": _tone(82, 0.25), "other": _tone(660, 0.1, tremolo_hz=2)},
+    "silent": {stem: np.zeros(SR * DURATION_SEC) for stem in ["vocals", "drums", "bass", "other"]},
+}
+
+
+def _write_stems(tmp_path, stems):
+    paths = {}
+    for stem, y in stems.items():
+        paths[stem] = str(tmp_path / f"{stem}.wav")
+        sf.write(paths[stem], y.astype("float32"), SR)
+    return paths
+
+
+# Per-stem reference: what compute_rms_energy / is_stem_ignorable did before the shared STFT
+def _reference_rms(path):
+    y, _ = librosa.load(path, sr=SPECTRAL_SR)
+    return float(np.mean(librosa.feature.rms(y=y)))
+
+
+def _reference_track_type(paths):
+    energy = {stem: _reference_rms(path) for stem, path in paths.items()}
+    vocal_ratio, instrumental_ratio, total = energy_ratios(energy)
+    if total == 0:
+        return "unknown", {}
+    if vocal_ratio > 0.2 and instrumental_ratio > 0.2:
+        track_type = "song"
+    elif vocal_ratio > 0.5:
+        track_type = "acapella"
+    elif instrumental_ratio > 0.5:
+        track_type = "instrumental"
+    else:
+        track_type = "unknown"
+    ignorable = {}
+    for stem, path in paths.items():
+        y, sr = librosa.load(path, sr=SPECTRAL_SR)
+        ignorable[stem] = 1 if is_stem_ignorable(y, sr) else 0
+    return track_type, ignorable
+
+
+@pytest.mark.parametrize("name", ["song", "acapella", "instrumental"])
+def test_batched_rms_matches_per_stem_rms(tmp_path, name):
+    paths = _write_stems(tmp_path, STEM_SETS[name])
+    for stem, path in paths.items():
+        assert analyze_clip(path)["rms"] == pytest.approx(_reference_rms(path), rel=1e-4, abs=1e-7), stem
+
+
+@pytest.mark.parametrize("name", list(STEM_SETS))
+def test_track_type_decisions_are_unchanged(tmp_path, name):
+    paths = _write_stems(tmp_path, STEM_SETS[name])
+    track_type, ignorable = _reference_track_type(paths)
+
+    result = classify_track_type(paths)
+    if track_type == "unknown" and not ignorable:
+        assert result == "unknown"
+        return
+    assert result["track_type"] == track_type == name
+    assert result["stem_is_ignorable"] == ignorable
+
+
+def test_metadata_features_stay_at_16k(tmp_path):
+    path = _write_stems(tmp_path, {"drums": _drums(0.5)})["drums"]
+    y, sr = librosa.load(path, sr=16000)
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr).mean(axis=1)
+
+    features = analyze_clip(path, sr=METADATA_SR)
+    assert features["duration_sec"] == pytest.approx(DURATION_SEC)
+    assert features["tempo_bpm"] == pytest.approx(float(np.atleast_1d(tempo)[0]))
+    np.testing.assert_allclose(features["chroma"], chroma, rtol=1e-4, atol=1e-6)
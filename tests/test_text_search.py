@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+text_search = pytest.importorskip("services.text_search")
+
+search_tracks = text_search.search_tracks
+
+QUERY = np.array([1.0, 0.0, 0.0], dtype="float32")
+# name -> vector; norms differ, so L2 order and cosine order disagree
+TRACKS = {
+    "near-but-off-axis": [0.5, 0.5, 0.0],    # L2 1st, cosine 0.707
+    "loud-on-axis": [6.0, 0.6, 0.0],         # L2 far, cosine 0.995
+    "quiet-on-axis": [0.2, 0.01, 0.0],       # L2 2nd, cosine 0.999
+    "orthogonal": [0.0, 1.0, 0.0],           # cosine 0
+    "opposite": [-2.0, 0.0, 0.0],            # cosine -1
+}
+
+
+def _variant(index=None, metadata=None):
+    vectors = np.array(list(TRACKS.values()), dtype="float32")
+    if index is None:
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+    else:
+        index.add_with_ids(vectors, np.arange(len(vectors)))
+    if metadata is None:
+        metadata = [{"title": name} for name in TRACKS]
+    return {"index": index, "metadata": metadata}
+
+
+def _titles(results):
+    return [result["metadata"]["title"] for result in results]
+
+
+def test_candidates_are_reranked_by_cosine():
+    results = search_tracks(_variant(), QUERY, k=3, candidates=5)
+
+    assert _titles(results) == ["quiet-on-axis", "loud-on-axis", "near-but-off-axis"]
+    assert [r["rank"] for r in results] == [1, 2, 3]
+    assert [r["cosine"] for r in results] == sorted((r["cosine"] for r in results), reverse=True)
+    assert results[0]["cosine"] == pytest.approx(0.9988, abs=1e-4)
+
+
+def test_rerank_only_sees_the_l2_candidates():
+    # The two L2-nearest vectors make the pool; the far, well-aligned one never enters it
+    results = search_tracks(_variant(), QUERY, k=2, candidates=2)
+    assert _titles(results) == ["quiet-on-axis", "near-but-off-axis"]
+
+
+def test_k_is_clamped_to_the_index():
+    results = search_tracks(_variant(), QUERY, k=50, candidates=1)
+    assert len(results) == len(TRACKS)
+    assert _titles(results)[-1] == "opposite"
+
+    assert search_tracks(_variant(), QUERY, k=1, candidates=200)[0]["metadata"]["title"] == "quiet-on-axis"
+    assert search_tracks({"index": faiss.IndexFlatL2(3), "metadata": []}, QUERY, k=5) == []
+
+
+def test_rows_missing_from_metadata_are_skipped():
+    metadata = [{"title": name} for name in list(TRACKS)[:2]]
+    results = search_tracks(_variant(metadata=metadata), QUERY, k=5)
+    assert _titles(results) == ["loud-on-axis", "near-but-off-axis"]
+    assert [r["rank"] for r in results] == [1, 2]
+
+
+def test_index_without_reconstruct_keeps_l2_order():
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(3))
+    results = search_tracks(_variant(index=index), QUERY, k=3)
+
+    assert _titles(results) == ["near-but-off-axis", "quiet-on-axis", "orthogonal"]
+    assert all("l2_distance" in r for r in results)
+    assert results[0]["l2_distance"] == pytest.approx(0.5, abs=1e-4)
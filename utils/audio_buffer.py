@@ -0,0 +1,151 @@
+import io
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+
+class AudioBuffer:
+    """
+    Request-scoped audio holder that decodes its source once and hands out
+    cached mono / multichannel views per sample rate.
+
+    Every service that used to call `librosa.load(path, sr=...)` can take an
+    AudioBuffer instead and read `buffer.load(sr)`, so a preview or stem is
+    decoded a single time no matter how many stages consume it.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        waveform: Optional[np.ndarray] = None,
+        sr: Optional[int] = None,
+        offset: float = 0.0,
+        duration: Optional[float] = None,
+    ):
+        if path is None and waveform is None:
+            raise ValueError("AudioBuffer needs either a path or a waveform.")
+        if waveform is not None and sr is None:
+            raise ValueError("AudioBuffer waveform requires its sample rate.")
+
+        self.path = str(path) if path is not None else None
+        self._offset = offset
+        self._duration = duration
+        self._native = None
+        self._native_sr = None
+        self._views = {}
+        self._lock = threading.Lock()
+
+        if waveform is not None:
+            self._set_native(waveform, sr)
+
+    @classmethod
+    def from_path(cls, path: Union[str, Path], offset: float = 0.0, duration: Optional[float] = None) -> "AudioBuffer":
+        return cls(path=path, offset=offset, duration=duration)
+
+    @classmethod
+    def from_array(cls, waveform: np.ndarray, sr: int) -> "AudioBuffer":
+        return cls(waveform=waveform, sr=sr)
+
+    def _set_native(self, waveform: np.ndarray, sr: int):
+        waveform = np.asarray(waveform, dtype=np.float32)
+        if waveform.ndim == 1:
+            waveform = waveform[np.newaxis, :]
+        self._native = waveform
+        self._native_sr = int(sr)
+
+    def _decode(self):
+        # Single decode at the file's native rate, channels preserved
+        print(f"[AudioBuffer] Decoding {self.path}")
+        y, sr = librosa.load(self.path, sr=None, mono=False, offset=self._offset, duration=self._duration)
+        self._set_native(y, sr)
+
+    @property
+    def native_sr(self) -> int:
+        with self._lock:
+            if self._native is None:
+                self._decode()
+            return self._native_sr
+
+    @property
+    def duration(self) -> float:
+        with self._lock:
+            if self._native is None:
+                self._decode()
+            return self._native.shape[-1] / self._native_sr
+
+    def load(self, sr: Optional[int] = None, mono: bool = True) -> np.ndarray:
+        """
+        Returns the audio at `sr` (native rate if None) as float32.
+        Mono views are 1-D, multichannel views are (channels, samples).
+        Views are cached, so treat the returned array as read-only.
+        """
+        with self._lock:
+            if self._native is None:
+                self._decode()
+
+            target_sr = int(sr) if sr else self._native_sr
+            key = (target_sr, mono)
+            if key in self._views:
+                return self._views[key]
+
+            if mono:
+                y = librosa.to_mono(self._native) if self._native.shape[0] > 1 else self._native[0]
+            else:
+                y = self._native
+
+            if target_sr != self._native_sr:
+                y = librosa.resample(y, orig_sr=self._native_sr, target_sr=target_sr)
+
+            y = np.ascontiguousarray(y, dtype=np.float32)
+            y.setflags(write=False)
+            self._views[key] = y
+            return y
+
+    def to_wav_bytes(self, sr: Optional[int] = None) -> bytes:
+        """Encodes the (multichannel) audio as an in-memory 16-bit WAV."""
+        y = np.clip(self.load(sr, mono=False), -1.0, 1.0)
+        out = io.BytesIO()
+        sf.write(out, y.T, sr or self.native_sr, format="WAV", subtype="PCM_16")
+        return out.getvalue()
+
+    def __getstate__(self):
+        # Pickle as 16-bit PCM (what Demucs used to write to disk); views and the lock are rebuilt lazily
+        native = None
+        if self._native is not None:
+            native = (np.clip(self._native, -1.0, 1.0) * 32767.0).astype(np.int16)
+        return {
+            "path": self.path,
+            "offset": self._offset,
+            "duration": self._duration,
+            "native": native,
+            "native_sr": self._native_sr,
+        }
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._offset = state["offset"]
+        self._duration = state["duration"]
+        self._native = None
+        self._native_sr = None
+        self._views = {}
+        self._lock = threading.Lock()
+        if state["native"] is not None:
+            self._set_native(state["native"].astype(np.float32) / 32767.0, state["native_sr"])
+
+    def release(self):
+        """Drops the decoded audio and every cached view."""
+        with self._lock:
+            self._views.clear()
+            if self.path is not None:
+                self._native = None
+
+
+def as_audio_buffer(source: Union[str, Path, AudioBuffer]) -> AudioBuffer:
+    """Accepts a path or an AudioBuffer so services can take either."""
+    if isinstance(source, AudioBuffer):
+        return source
+    return AudioBuffer.from_path(source)
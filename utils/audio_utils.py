@@ -1,6 +1,11 @@
+import json
 import os
-from pydub import AudioSegment
+import subprocess
+from typing import Optional
+
 import librosa
+import soundfile as sf
+from utils.audio_buffer import AudioBuffer
 
 # utils.py or inline in your script
 def get_audio_path(audio_dir, track_id):
@@ -14,37 +19,55 @@ def get_audio_path(audio_dir, track_id):
     return os.path.join(audio_dir, '{:03d}'.format(tid // 1000), '{:06d}.mp3'.format(tid))
 
 
-# extract a 30 second preview from the center of the track
-def extract_preview_segment(full_path: str, output_path: str, segment_duration_sec: int = 30):
-    audio = AudioSegment.from_file(full_path)
-    duration_ms = len(audio)
-    segment_ms = segment_duration_sec * 1000
+def probe_audio(full_path: str) -> dict:
+    """Track duration and native sample rate read from the file headers, without decoding any audio."""
+    try:
+        info = sf.info(full_path)
+        return {"duration_sec": info.frames / info.samplerate, "sample_rate": info.samplerate}
+    except RuntimeError:
+        pass  # a format this libsndfile build can't open
 
-    # Center crop if possible, else take from start
-    if duration_ms > segment_ms:
-        start = (duration_ms - segment_ms) // 2
-    else:
-        start = 0
+    try:
+        probe = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=sample_rate:format=duration",
+             "-of", "json", str(full_path)],
+            capture_output=True, text=True, check=True, timeout=30,
+        )
+        info = json.loads(probe.stdout)
+        return {"duration_sec": float(info["format"]["duration"]), "sample_rate": int(info["streams"][0]["sample_rate"])}
+    except (OSError, subprocess.SubprocessError, KeyError, IndexError, ValueError):
+        # No ffprobe either: audioread still only reads what it needs for the length
+        return {"duration_sec": librosa.get_duration(path=full_path), "sample_rate": librosa.get_samplerate(full_path)}
 
-    preview = audio[start:start + segment_ms]
-    preview.export(output_path, format="mp3")
 
+# load a 30 second preview from the center of the track
+def load_preview_segment(full_path: str, segment_duration_sec: int = 30, duration_sec: Optional[float] = None) -> AudioBuffer:
+    """
+    Returns an AudioBuffer over the center window of the track. Only the track
+    length is read up front (from the headers, see `probe_audio`, unless the
+    caller already has it); the window itself is decoded straight to PCM on
+    first use, with no re-encode.
+    """
+    if duration_sec is None:
+        duration_sec = probe_audio(full_path)["duration_sec"]
+
+    # Center crop if possible, else take from start
+    if duration_sec > segment_duration_sec:
+        offset = (duration_sec - segment_duration_sec) / 2
+    else:
+        offset = 0.0
 
-import numpy as np
+    return AudioBuffer.from_path(full_path, offset=offset, duration=segment_duration_sec)
 
 
-def is_stem_ignorable(y, sr, rms_thresh=0.01):
-    if y is None or len(y) == 0:
-        return True
 
-    rms = librosa.feature.rms(y=y).mean()
+def is_stem_ignorable(y, sr, rms_thresh=0.01, rms=None):
+    # `rms` lets callers reuse the value from services.spectral_features
+    if rms is None:
+        if y is None or len(y) == 0:
+            return True
+        rms = librosa.feature.rms(y=y).mean()
 
     print(f"[Stem Check] RMS: {rms:.5f}")
 
     return rms < rms_thresh
-
-import base64
-
-def encode_audio_base64(file_path):
-    with open(file_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
\ No newline at end of file